@@ -0,0 +1,200 @@
+"""Offline benchmarks of the bot and the Music cog.
+
+    python -m benchmarks --guilds 1000 10000 100000 --players 100 --iterations 1000
+
+Every guild count runs in its own process, the configuration is read once per
+process and the memory of a 100k guilds run should not leak into the next one.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+from .gateway import snowflake
+from .harness import Harness
+
+
+@dataclass
+class Result:
+    name: str
+    timings: list[float] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return len(self.timings) / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, percent: float) -> float:
+        if len(self.timings) < 2:
+            return self.timings[0] if self.timings else 0.0
+        return statistics.quantiles(self.timings, n=100, method="inclusive")[int(percent) - 1]
+
+    def row(self) -> str:
+        return (
+            f"{self.name:<24} {len(self.timings):>7} {self.throughput:>12.1f} "
+            f"{self.percentile(50) * 1000:>10.3f} {self.percentile(99) * 1000:>10.3f}"
+        )
+
+
+async def measure(name: str, iterations: int, operation: Callable[[int], Awaitable[object]]) -> Result:
+    result = Result(name)
+    start = time.perf_counter()
+    for i in range(iterations):
+        t = time.perf_counter()
+        await operation(i)
+        result.timings.append(time.perf_counter() - t)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+async def run(guilds: int, players: int, iterations: int, playlist_size: int, seed: int) -> None:
+    rng = random.Random(seed)
+
+    started = time.perf_counter()
+    harness = Harness(guilds=guilds, players=players, playlist_size=playlist_size)
+    try:
+        await harness.start()
+        await scenarios(harness, guilds, iterations, rng, started)
+    finally:
+        await harness.close()
+
+
+async def scenarios(harness: Harness, guilds: int, iterations: int, rng: random.Random, started: float) -> None:
+    # Only importable once the harness moved to its own configuration
+    import wavelink
+
+    from core import Context
+
+    print(f"[BENCH] {guilds} guilds and {harness.player_count} players ready in {time.perf_counter() - started:.2f}s")
+
+    errors: list[BaseException] = []
+
+    async def on_command_error(ctx: Context, error: BaseException) -> None:
+        errors.append(error)
+
+    harness.bot.add_listener(on_command_error, "on_command_error")
+
+    bot, gateway = harness.bot, harness.gateway
+    guild_ids = gateway.guild_ids
+    player_guilds = guild_ids[: harness.player_count]
+
+    def random_guild() -> int:
+        return rng.choice(guild_ids)
+
+    def random_player_guild() -> int:
+        return player_guilds[rng.randrange(len(player_guilds))]
+
+    def command(guild_id: int, content: str):
+        return bot.process_commands(gateway.message(guild_id, harness.listeners[guild_id], f"p!{content}"))
+
+    async def dispatch(i: int) -> None:
+        guild_id = random_guild()
+        await bot.on_message(gateway.message(guild_id, snowflake(), f"just chatting {i}"))
+
+    prefix_guilds = rng.sample(guild_ids, min(iterations, len(guild_ids)))
+    prefix_messages = [gateway.message(guild_id, snowflake(), "hello") for guild_id in prefix_guilds]
+
+    async def prefix(i: int) -> None:
+        await bot.get_prefix(prefix_messages[i % len(prefix_messages)])
+
+    async def play(i: int) -> None:
+        await command(random_player_guild(), f"play song {i}")
+
+    async def playplaylist(i: int) -> None:
+        await command(random_player_guild(), f"playplaylist playlist {i}")
+
+    async def queue(i: int) -> None:
+        await command(random_player_guild(), "queue")
+
+    # Picked beforehand, so every guild can be given the tracks its ends will start
+    ended = [random_player_guild() for _ in range(iterations)]
+
+    async def fill_queues() -> None:
+        # Measure the common case of a track ending with more tracks queued
+        filler = (await wavelink.Playable.search("filler"))[0]  # type: ignore
+        filler.extras = {"requester_id": 0}
+        for guild_id, count in Counter(ended).items():
+            player = harness.player(guild_id)
+            player.queue.put([filler] * max(0, count - player.queue.count))
+            if not player.playing:
+                await player.play(player.queue.get())
+                player.queue.put(filler)
+
+    async def track_end(i: int) -> None:
+        guild_id = ended[i]
+        player = harness.player(guild_id)
+        # The listener is registered right away, before the end is sent
+        started = bot.wait_for("wavelink_track_start", check=lambda payload: payload.player is player, timeout=5)
+        # Ended by Lavalink, so wavelink forgets the current track before the Music cog hears of it
+        await harness.lavalink.finish(guild_id)
+        await started
+        assert player.playing, f"the next track of guild {guild_id} did not start"
+
+    results = [
+        await measure("prefix (cold)", len(prefix_messages), prefix),
+        await measure("prefix (warm)", len(prefix_messages), prefix),
+        await measure("message dispatch", iterations, dispatch),
+        await measure("play enqueue", iterations, play),
+        await measure("playplaylist enqueue", max(1, iterations // 10), playplaylist),
+        await measure("queue render", iterations, queue),
+    ]
+    await fill_queues()
+    results.append(await measure("track end", iterations, track_end))
+
+    print(f"{'scenario':<24} {'ops':>7} {'ops/s':>12} {'p50 (ms)':>10} {'p99 (ms)':>10}")
+    for result in results:
+        print(result.row())
+
+    requests = gateway.state.http.requests  # type: ignore
+    print(f"[BENCH] Discord requests: {sum(requests.values())}, Lavalink requests: {harness.lavalink.requests}")
+    print("\n".join(f"    {route}: {count}" for route, count in sorted(requests.items())))
+    if errors:
+        print(f"[BENCH] {len(errors)} command(s) failed, first error: {errors[0]!r}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    parser.add_argument("--guilds", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--players", type=int, default=100, help="Guilds with a connected player")
+    parser.add_argument("--iterations", type=int, default=1_000)
+    parser.add_argument("--playlist-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if len(args.guilds) > 1:
+        for guilds in args.guilds:
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks",
+                    "--guilds",
+                    str(guilds),
+                    "--players",
+                    str(args.players),
+                    "--iterations",
+                    str(args.iterations),
+                    "--playlist-size",
+                    str(args.playlist_size),
+                    "--seed",
+                    str(args.seed),
+                ],
+                check=True,
+            )
+        return
+
+    print(f"\n[BENCH] {args.guilds[0]} guilds")
+    asyncio.run(run(args.guilds[0], args.players, args.iterations, args.playlist_size, args.seed))
+
+
+if __name__ == "__main__":
+    main()
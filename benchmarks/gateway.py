@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import itertools
+import time
+from typing import TYPE_CHECKING, Any
+
+import discord
+from discord.http import HTTPClient, Route
+
+if TYPE_CHECKING:
+    from core import Bot
+
+ADMINISTRATOR = str(discord.Permissions.all().value)
+DISCORD_EPOCH = 1420070400000
+
+
+class Snowflakes:
+    def __init__(self) -> None:
+        self._increment = itertools.count()
+
+    def __call__(self) -> int:
+        return ((int(time.time() * 1000) - DISCORD_EPOCH) << 22) | (next(self._increment) & 0x3FFFFF)
+
+
+snowflake = Snowflakes()
+
+
+def user_payload(user_id: int, *, bot: bool = False) -> dict[str, Any]:
+    return {
+        "id": str(user_id),
+        "username": f"user{user_id % 100_000}",
+        "discriminator": "0",
+        "global_name": None,
+        "avatar": None,
+        "bot": bot,
+    }
+
+
+def member_payload(user_id: int, *, bot: bool = False) -> dict[str, Any]:
+    return {
+        "user": user_payload(user_id, bot=bot),
+        "roles": [],
+        "joined_at": "2024-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def channel_payload(channel_id: int, type: discord.ChannelType) -> dict[str, Any]:
+    payload: dict[str, Any] = {"id": str(channel_id), "type": type.value, "name": type.name, "position": 0}
+    if type is discord.ChannelType.voice:
+        payload["bitrate"] = 64000
+        payload["user_limit"] = 0
+    return payload
+
+
+class FakeHTTP(HTTPClient):
+    """Discord REST client answering every request locally.
+
+    Messages sent by the bot are echoed back like Discord does, everything else
+    returns an empty payload. Requests are counted per route.
+    """
+
+    def __init__(self, bot: Bot) -> None:
+        super().__init__(bot.loop)
+        self.bot = bot
+        self.requests: dict[str, int] = {}
+
+    async def request(self, route: Route, *, files=None, form=None, **kwargs: Any) -> Any:
+        self.requests[route.key] = self.requests.get(route.key, 0) + 1
+
+        if route.method in ("POST", "PATCH") and route.path.endswith(("/messages", "/messages/{message_id}")):
+            payload = kwargs.get("json") or {}
+            if form:
+                payload = next((f["value"] for f in form if f["name"] == "payload_json"), {})
+                if isinstance(payload, str):
+                    payload = discord.utils._from_json(payload)
+            return self._message(route, payload)
+
+        return None
+
+    def _message(self, route: Route, payload: dict[str, Any]) -> dict[str, Any]:
+        assert self.bot.user is not None
+        return {
+            "id": str(snowflake()),
+            "channel_id": str(route.channel_id),
+            "author": user_payload(self.bot.user.id, bot=True),
+            "content": payload.get("content") or "",
+            "timestamp": "2024-01-01T00:00:00+00:00",
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": payload.get("embeds") or [],
+            "components": payload.get("components") or [],
+            "pinned": False,
+            "type": 0,
+        }
+
+
+class FakeShardSocket:
+    """The gateway connection of a shard, answers voice state updates like Discord does."""
+
+    def __init__(self, gateway: FakeGateway, shard_id: int = 0) -> None:
+        self.gateway = gateway
+        self.shard_id = shard_id
+        self.sequence = 0
+        self.latency = 0.0
+
+    def is_closed(self) -> bool:
+        return False
+
+    def is_ratelimited(self) -> bool:
+        return False
+
+    async def change_presence(self, **kwargs: Any) -> None:
+        pass
+
+    async def voice_state(
+        self, guild_id: int, channel_id: int | None, self_mute: bool = False, self_deaf: bool = False
+    ) -> None:
+        self.gateway.voice_state(guild_id, self.gateway.bot_id, channel_id=channel_id)
+        if channel_id is not None:
+            self.gateway.state.parse_voice_server_update(
+                {"guild_id": str(guild_id), "token": "benchmark", "endpoint": "localhost"}  # type: ignore
+            )
+
+
+class FakeShard:
+    def __init__(self, ws: FakeShardSocket) -> None:
+        self.ws = ws
+        self.id = ws.shard_id
+
+    async def close(self) -> None:
+        pass
+
+
+class FakeGateway:
+    """Feeds synthetic gateway events into a bot that never connected to Discord."""
+
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+        self.state = bot._connection
+
+        self.bot_id = snowflake()
+        self.guild_ids: list[int] = []
+        self.text_channels: dict[int, int] = {}
+        self.voice_channels: dict[int, int] = {}
+
+    def login(self) -> None:
+        self.bot.http = self.state.http = FakeHTTP(self.bot)
+        self.state.user = discord.ClientUser(state=self.state, data=user_payload(self.bot_id, bot=True))  # type: ignore
+
+        shards = self.bot._AutoShardedClient__shards  # type: ignore
+        for shard_id in self.bot.shard_ids or [0]:
+            shards[shard_id] = FakeShard(FakeShardSocket(self, shard_id))
+
+    def create_guilds(self, count: int) -> None:
+        for _ in range(count):
+            self.create_guild()
+
+    def create_guild(self, guild_id: int | None = None) -> int:
+        """Send the GUILD_CREATE of a guild with a text channel and a voice channel."""
+        guild_id = guild_id or snowflake()
+        text_id, voice_id = snowflake(), snowflake()
+
+        self.state._add_guild_from_data(
+            {
+                "id": str(guild_id),
+                "name": f"Guild {guild_id}",
+                "owner_id": str(self.bot_id),
+                "unavailable": False,
+                "member_count": 2,
+                "large": False,
+                "roles": [
+                    {
+                        "id": str(guild_id),
+                        "name": "@everyone",
+                        "permissions": ADMINISTRATOR,
+                        "position": 0,
+                        "color": 0,
+                        "hoist": False,
+                        "managed": False,
+                        "mentionable": False,
+                    }
+                ],
+                "channels": [
+                    channel_payload(text_id, discord.ChannelType.text),
+                    channel_payload(voice_id, discord.ChannelType.voice),
+                ],
+                "members": [member_payload(self.bot_id, bot=True)],
+                "voice_states": [],
+                "emojis": [],
+                "stickers": [],
+                "features": [],
+                "premium_tier": 0,
+                "preferred_locale": "en-US",
+            }  # type: ignore
+        )
+
+        self.guild_ids.append(guild_id)
+        self.text_channels[guild_id] = text_id
+        self.voice_channels[guild_id] = voice_id
+        return guild_id
+
+    def create_channel(self, guild_id: int, channel_id: int, type: discord.ChannelType) -> None:
+        self.state.parse_channel_create({**channel_payload(channel_id, type), "guild_id": str(guild_id)})  # type: ignore
+
+    def message_payload(
+        self, guild_id: int, author_id: int, content: str, *, channel_id: int | None = None
+    ) -> dict[str, Any]:
+        return {
+            "id": str(snowflake()),
+            "channel_id": str(channel_id or self.text_channels[guild_id]),
+            "guild_id": str(guild_id),
+            "author": user_payload(author_id),
+            "member": {"roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False},
+            "content": content,
+            "timestamp": "2024-01-01T00:00:00+00:00",
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "pinned": False,
+            "type": 0,
+        }
+
+    def message(self, guild_id: int, author_id: int, content: str) -> discord.Message:
+        """Build the message of a MESSAGE_CREATE event, without dispatching it."""
+        data = self.message_payload(guild_id, author_id, content)
+        channel, _ = self.state._get_guild_channel(data)  # type: ignore
+        return discord.Message(state=self.state, channel=channel, data=data)  # type: ignore
+
+    def dispatch_message(self, guild_id: int, author_id: int, content: str, *, channel_id: int | None = None) -> None:
+        self.state.parse_message_create(
+            self.message_payload(guild_id, author_id, content, channel_id=channel_id)  # type: ignore
+        )
+
+    def voice_state(self, guild_id: int, user_id: int, *, channel_id: int | None) -> None:
+        self.state.parse_voice_state_update(
+            {
+                "guild_id": str(guild_id),
+                "channel_id": str(channel_id) if channel_id else None,
+                "user_id": str(user_id),
+                "session_id": "benchmark",
+                "deaf": False,
+                "mute": False,
+                "self_deaf": False,
+                "self_mute": False,
+                "self_video": False,
+                "suppress": False,
+                "request_to_speak_timestamp": None,
+                "member": member_payload(user_id),
+            }  # type: ignore
+        )
+
+    def reaction(self, guild_id: int, message_id: int, user_id: int, emoji: str) -> None:
+        self.state.parse_message_reaction_add(
+            {
+                "user_id": str(user_id),
+                "channel_id": str(self.text_channels[guild_id]),
+                "message_id": str(message_id),
+                "guild_id": str(guild_id),
+                "emoji": {"id": None, "name": emoji},
+                "member": member_payload(user_id),
+                "burst": False,
+                "type": 0,
+            }  # type: ignore
+        )
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+from typing import TYPE_CHECKING, Any
+
+from .gateway import FakeGateway, snowflake
+from .lavalink import PASSWORD, FakeLavalink
+
+if TYPE_CHECKING:
+    from cogs.music import Music, Player
+    from core import Bot
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Harness:
+    """A fully set up bot talking to a fake gateway and a fake Lavalink.
+
+    The bot runs from a temporary directory with its own ``config.json`` and
+    database, so benchmarking never touches the real ones.
+    """
+
+    def __init__(self, *, guilds: int, players: int, playlist_size: int = 100) -> None:
+        self.guild_count = guilds
+        self.player_count = min(players, guilds)
+
+        self.lavalink = FakeLavalink(playlist_size=playlist_size)
+        self.bot: Bot
+        self.gateway: FakeGateway
+        self.music: Music
+
+        # One listener per player, all of them sitting in the voice channel
+        self.listeners: dict[int, int] = {}
+
+        self._cwd = os.getcwd()
+        self._directory = tempfile.mkdtemp(prefix="parrot-benchmark-")
+
+    def _write_config(self) -> None:
+        with open(os.path.join(ROOT, "config.json")) as f:
+            config: dict[str, Any] = json.load(f)
+
+        config["database_file"] = os.path.join(self._directory, "db.sqlite")
+        config["database_schema"] = os.path.join(ROOT, config["database_schema"])
+        config["lavalink"] = {"host": self.lavalink.host, "port": self.lavalink.port, "password": PASSWORD}
+        config["metrics"] = {**config.get("metrics", {}), "enabled": False}
+        config["watchdog"] = {**config.get("watchdog", {}), "enabled": False}
+        config["app_commands"] = {**config.get("app_commands", {}), "sync": False}
+        config["cogs"] = [cog for cog in config["cogs"] if cog["path"] == "cogs.music"]
+
+        with open(os.path.join(self._directory, "config.json"), "w") as f:
+            json.dump(config, f)
+
+        os.makedirs(os.path.join(self._directory, "logs"), exist_ok=True)
+
+    async def start(self) -> None:
+        await self.lavalink.start()
+        self._write_config()
+
+        # utils.config reads config.json from the working directory the first time it is used
+        os.chdir(self._directory)
+        if ROOT not in sys.path:
+            sys.path.insert(0, ROOT)
+
+        from core import Bot
+
+        self.bot = Bot(version=(0, 0, 0))
+        await self.bot._async_setup_hook()
+
+        self.gateway = FakeGateway(self.bot)
+        self.gateway.login()
+        await self.bot.setup_hook()
+
+        self.music = self.bot.get_cog("Music")  # type: ignore
+        await self._wait_for_node()
+
+        self.gateway.create_guilds(self.guild_count)
+        for guild_id in self.gateway.guild_ids[: self.player_count]:
+            await self.connect(guild_id)
+
+    async def _wait_for_node(self) -> None:
+        import wavelink
+
+        while not any(node.status is wavelink.NodeStatus.CONNECTED for node in wavelink.Pool.nodes.values()):
+            await self.bot.wait_for("wavelink_node_ready", timeout=10)
+
+    async def connect(self, guild_id: int) -> Player:
+        """Put a listener in the voice channel of the guild and connect a player there."""
+        from cogs.music import Player
+        from core import Context
+
+        guild = self.bot.get_guild(guild_id)
+        assert guild is not None
+        channel = guild.get_channel(self.gateway.voice_channels[guild_id])
+
+        listener = self.listeners[guild_id] = snowflake()
+        self.gateway.voice_state(guild_id, listener, channel_id=channel.id)  # type: ignore
+
+        player = await channel.connect(cls=Player)  # type: ignore
+        player.ctx = await self.bot.get_context(self.gateway.message(guild_id, listener, "p!join"), cls=Context)
+        player.home = guild.get_channel(self.gateway.text_channels[guild_id])  # type: ignore
+
+        # The voice server update is handled in a task, the player is usable once Lavalink knows about it
+        await asyncio.wait_for(player._connection_event.wait(), timeout=10)
+        return player
+
+    def player(self, guild_id: int) -> Player:
+        return self.bot.get_guild(guild_id).voice_client  # type: ignore
+
+    async def close(self) -> None:
+        try:
+            if hasattr(self, "bot"):
+                await self.bot.close()
+                if hasattr(self.bot, "sql"):
+                    await self.bot.sql.close()
+        finally:
+            await self.lavalink.close()
+            os.chdir(self._cwd)
+            shutil.rmtree(self._directory, ignore_errors=True)
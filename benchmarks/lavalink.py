@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import itertools
+import json
+import struct
+import time
+from typing import Any
+
+from aiohttp import WSMsgType, web
+
+PASSWORD = "youshallnotpass"
+
+
+def _write_utf(buffer: bytearray, value: str) -> None:
+    encoded = value.encode()
+    buffer += struct.pack(">H", len(encoded))
+    buffer += encoded
+
+
+def _write_nullable_utf(buffer: bytearray, value: str | None) -> None:
+    buffer += struct.pack(">?", value is not None)
+    if value is not None:
+        _write_utf(buffer, value)
+
+
+def encode_track(info: dict[str, Any]) -> str:
+    """Encode a track the way Lavaplayer does (message version 3)."""
+    body = bytearray()
+    body += struct.pack(">B", 3)
+    _write_utf(body, info["title"])
+    _write_utf(body, info["author"])
+    body += struct.pack(">q", info["length"])
+    _write_utf(body, info["identifier"])
+    body += struct.pack(">?", info["isStream"])
+    _write_nullable_utf(body, info["uri"])
+    _write_nullable_utf(body, info["artworkUrl"])
+    _write_nullable_utf(body, info["isrc"])
+    _write_utf(body, info["sourceName"])
+    body += struct.pack(">q", info["position"])
+
+    # Highest bits of the header hold the flags, 1 means the message is versioned
+    header = struct.pack(">I", len(body) | (1 << 30))
+    return base64.b64encode(header + bytes(body)).decode()
+
+
+def make_track(identifier: str, *, title: str | None = None, length: int = 180_000) -> dict[str, Any]:
+    info = {
+        "identifier": identifier,
+        "isSeekable": True,
+        "author": f"Artist {hash(identifier) % 500}",
+        "length": length,
+        "isStream": False,
+        "position": 0,
+        "title": title or f"Track {identifier}",
+        "uri": f"https://example.com/watch?v={identifier}",
+        "artworkUrl": f"https://example.com/art/{identifier}.jpg",
+        "isrc": None,
+        "sourceName": "http",
+    }
+    return {"encoded": encode_track(info), "info": info, "pluginInfo": {}, "userData": {}}
+
+
+class FakeLavalink:
+    """A local stand-in for a Lavalink v4 server.
+
+    It speaks enough of the REST and websocket protocol for wavelink: searching
+    returns synthetic tracks, ``playlist`` queries return a playlist, and updating a
+    player with a track emits ``TrackStartEvent`` (and ``TrackEndEvent`` for the
+    replaced track) on the websocket, like the real thing does.
+    """
+
+    def __init__(self, *, host: str = "127.0.0.1", port: int = 0, playlist_size: int = 100) -> None:
+        self.host = host
+        self.port = port
+        self.playlist_size = playlist_size
+
+        self.session_id = "benchmark"
+        self.players: dict[int, dict[str, Any]] = {}
+        self.requests = 0
+
+        self._tracks: dict[str, dict[str, Any]] = {}
+        self._websockets: list[web.WebSocketResponse] = []
+        self._runner: web.AppRunner | None = None
+        self._ids = itertools.count()
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/v4/websocket", self._websocket)
+        app.router.add_get("/version", self._version)
+        app.router.add_get("/v4/info", self._info)
+        app.router.add_get("/v4/stats", self._stats)
+        app.router.add_get("/v4/loadtracks", self._load_tracks)
+        app.router.add_patch("/v4/sessions/{session}", self._update_session)
+        app.router.add_get("/v4/sessions/{session}/players", self._get_players)
+        app.router.add_get("/v4/sessions/{session}/players/{guild}", self._get_player)
+        app.router.add_patch("/v4/sessions/{session}/players/{guild}", self._update_player)
+        app.router.add_delete("/v4/sessions/{session}/players/{guild}", self._destroy_player)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+
+        # Resolve the port picked by the OS when asked for port 0
+        server = site._server
+        assert server is not None
+        self.port = server.sockets[0].getsockname()[1]  # type: ignore
+
+    async def close(self) -> None:
+        for ws in self._websockets:
+            await ws.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def _check(self, request: web.Request) -> None:
+        self.requests += 1
+        if request.headers.get("Authorization") != PASSWORD:
+            raise web.HTTPUnauthorized()
+
+    async def send(self, payload: dict[str, Any]) -> None:
+        data = json.dumps(payload)
+        for ws in self._websockets:
+            if not ws.closed:
+                await ws.send_str(data)
+
+    async def _websocket(self, request: web.Request) -> web.WebSocketResponse:
+        self._check(request)
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._websockets.append(ws)
+
+        await ws.send_json({"op": "ready", "resumed": False, "sessionId": self.session_id})
+
+        async for message in ws:
+            if message.type in (WSMsgType.CLOSE, WSMsgType.ERROR):
+                break
+
+        self._websockets.remove(ws)
+        return ws
+
+    async def _version(self, request: web.Request) -> web.Response:
+        self._check(request)
+        return web.Response(text="4.0.0")
+
+    async def _info(self, request: web.Request) -> web.Response:
+        self._check(request)
+        return web.json_response(
+            {
+                "version": {"semver": "4.0.0", "major": 4, "minor": 0, "patch": 0, "preRelease": None},
+                "buildTime": 0,
+                "git": {"branch": "main", "commit": "0" * 40, "commitTime": 0},
+                "jvm": "17",
+                "lavaplayer": "2.0.0",
+                "sourceManagers": ["http"],
+                "filters": ["volume", "equalizer", "timescale", "karaoke", "rotation"],
+                "plugins": [],
+            }
+        )
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        self._check(request)
+        return web.json_response(
+            {
+                "players": len(self.players),
+                "playingPlayers": sum(player["track"] is not None for player in self.players.values()),
+                "uptime": 0,
+                "memory": {"free": 0, "used": 0, "allocated": 0, "reservable": 0},
+                "cpu": {"cores": 1, "systemLoad": 0.0, "lavalinkLoad": 0.0},
+                "frameStats": None,
+            }
+        )
+
+    async def _load_tracks(self, request: web.Request) -> web.Response:
+        self._check(request)
+        identifier = request.query["identifier"]
+
+        if "playlist" in identifier:
+            tracks = [self._track(f"{identifier}-{i}") for i in range(self.playlist_size)]
+            return web.json_response(
+                {
+                    "loadType": "playlist",
+                    "data": {
+                        "info": {"name": identifier, "selectedTrack": -1},
+                        "pluginInfo": {},
+                        "tracks": tracks,
+                    },
+                }
+            )
+
+        query = identifier.split(":", 1)[-1]
+        tracks = [self._track(f"{query}-{i}".replace(" ", "_")) for i in range(10)]
+        return web.json_response({"loadType": "search", "data": tracks})
+
+    def _track(self, identifier: str) -> dict[str, Any]:
+        track = make_track(identifier)
+        self._tracks[track["encoded"]] = track
+        return track
+
+    async def _update_session(self, request: web.Request) -> web.Response:
+        self._check(request)
+        return web.json_response({"resuming": False, "timeout": 60})
+
+    def _player(self, guild_id: int) -> dict[str, Any]:
+        return self.players.setdefault(
+            guild_id,
+            {
+                "guildId": str(guild_id),
+                "track": None,
+                "volume": 100,
+                "paused": False,
+                "state": {"time": 0, "position": 0, "connected": True, "ping": 0},
+                "voice": {"token": "", "endpoint": "", "sessionId": ""},
+                "filters": {},
+            },
+        )
+
+    async def _get_players(self, request: web.Request) -> web.Response:
+        self._check(request)
+        return web.json_response(list(self.players.values()))
+
+    async def _get_player(self, request: web.Request) -> web.Response:
+        self._check(request)
+        return web.json_response(self._player(int(request.match_info["guild"])))
+
+    async def _update_player(self, request: web.Request) -> web.Response:
+        self._check(request)
+        guild_id = int(request.match_info["guild"])
+        player = self._player(guild_id)
+        data = await request.json()
+
+        for key in ("volume", "paused", "filters", "voice"):
+            if key in data:
+                player[key] = data[key]
+        if "position" in data and player["track"] is not None:
+            player["state"]["position"] = data["position"]
+
+        if "track" in data:
+            encoded = data["track"].get("encoded")
+            previous = player["track"]
+
+            no_replace = request.query.get("noReplace") == "true"
+            if no_replace and previous is not None:
+                return web.json_response(player)
+
+            if encoded is None:
+                player["track"] = None
+                if previous is not None:
+                    asyncio.create_task(self._emit_end(guild_id, previous, "stopped"))
+            else:
+                known = self._tracks.get(encoded) or make_track(f"unknown-{next(self._ids)}")
+                track = {**known, "encoded": encoded, "userData": data["track"].get("userData", {})}
+                player["track"] = track
+                if previous is not None:
+                    asyncio.create_task(self._emit_end(guild_id, previous, "replaced"))
+                asyncio.create_task(self._emit_start(guild_id, track))
+
+        return web.json_response(player)
+
+    async def _destroy_player(self, request: web.Request) -> web.Response:
+        self._check(request)
+        self.players.pop(int(request.match_info["guild"]), None)
+        return web.Response(status=204)
+
+    async def _emit_start(self, guild_id: int, track: dict[str, Any]) -> None:
+        await self.send({"op": "event", "type": "TrackStartEvent", "guildId": str(guild_id), "track": track})
+        await self.send(
+            {
+                "op": "playerUpdate",
+                "guildId": str(guild_id),
+                "state": {"time": int(time.time() * 1000), "position": 0, "connected": True, "ping": 5},
+            }
+        )
+
+    async def _emit_end(self, guild_id: int, track: dict[str, Any], reason: str) -> None:
+        await self.send(
+            {"op": "event", "type": "TrackEndEvent", "guildId": str(guild_id), "track": track, "reason": reason}
+        )
+
+    async def finish(self, guild_id: int) -> None:
+        """Pretend the current track of a player played until the end."""
+        player = self.players.get(guild_id)
+        if player is None or player["track"] is None:
+            return
+
+        track, player["track"] = player["track"], None
+        await self._emit_end(guild_id, track, "finished")
@@ -0,0 +1,201 @@
+"""Replay a trace recorded with the `trace` owner command against a local bot.
+
+    python -m benchmarks.replay traces/trace-20240101-200000.ptrace.gz --speed 10
+
+Guilds, channels and members of the trace are created on the fly, messages and
+voice states go through the fake gateway and track ends through the fake
+Lavalink, at the recorded pace divided by ``--speed``. The event loop lag, the
+memory growth and the database writes are reported once the trace is over.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import os
+import statistics
+from collections import Counter
+
+import discord
+
+from .harness import Harness
+
+
+def rss() -> int:
+    """Resident memory of the process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        # Peak, not current, but the best there is without procfs
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def mib(size: float) -> str:
+    return f"{size / 1024 / 1024:.1f} MiB"
+
+
+def quantile(values: list[float], percent: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+class Replayer:
+    def __init__(self, harness: Harness, *, speed: float, interval: float = 0.05) -> None:
+        self.harness = harness
+        self.speed = speed
+        self.interval = interval
+
+        self.events: Counter[str] = Counter()
+        self.lags: list[float] = []
+        self.behind = 0.0
+        self.peak_rss = 0
+        self.command_errors = 0
+
+        self._channels: set[int] = set()
+        self._sampling = True
+
+    def _guild(self, guild_id: int) -> None:
+        if self.harness.bot.get_guild(guild_id) is None:
+            self.harness.gateway.create_guild(guild_id)
+
+    def _channel(self, guild_id: int, channel_id: int, type: discord.ChannelType) -> None:
+        if channel_id not in self._channels:
+            self._channels.add(channel_id)
+            self.harness.gateway.create_channel(guild_id, channel_id, type)
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._sampling:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - start - self.interval))
+            self.peak_rss = max(self.peak_rss, rss())
+
+    async def _on_command_error(self, ctx, error: BaseException) -> None:
+        self.command_errors += 1
+
+    async def run(self, path: str) -> float:
+        from utils.trace import Kind, read_trace
+
+        gateway = self.harness.gateway
+        lavalink = self.harness.lavalink
+        loop = asyncio.get_running_loop()
+
+        self.harness.bot.add_listener(self._on_command_error, "on_command_error")
+        sampler = asyncio.create_task(self._sample())
+
+        start = loop.time()
+        for record in read_trace(path):
+            delay = start + record.offset / self.speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                self.behind = max(self.behind, -delay)
+
+            self.events[record.kind.name] += 1
+            self._guild(record.guild_id)
+
+            if record.kind is Kind.MESSAGE:
+                self._channel(record.guild_id, record.channel_id, discord.ChannelType.text)
+                gateway.dispatch_message(record.guild_id, record.user_id, record.payload, channel_id=record.channel_id)
+
+            elif record.kind is Kind.VOICE_STATE:
+                if record.channel_id:
+                    self._channel(record.guild_id, record.channel_id, discord.ChannelType.voice)
+                gateway.voice_state(record.guild_id, record.user_id, channel_id=record.channel_id or None)
+
+            elif record.kind is Kind.TRACK_END:
+                # Track starts follow from the replayed commands, Lavalink only decides when a track is over
+                asyncio.create_task(lavalink.finish(record.guild_id))
+
+        elapsed = loop.time() - start
+
+        # Let the last events settle before measuring
+        await asyncio.sleep(2)
+        self._sampling = False
+        await sampler
+        return elapsed
+
+
+async def replay(path: str, *, speed: float, playlist_size: int) -> None:
+    harness = Harness(guilds=0, players=0, playlist_size=playlist_size)
+    try:
+        await harness.start()
+        await report(harness, path, speed)
+    finally:
+        await harness.close()
+
+
+async def report(harness: Harness, path: str, speed: float) -> None:
+    # Only importable once the harness moved to its own configuration
+    from utils import CONFIG, LoopWatchdog
+    from utils.metrics import SQLITE_COMMIT, SQLITE_QUERY
+
+    bot = harness.bot
+    watchdog = LoopWatchdog(interval=0.05, budget=0.05)
+    watchdog.start()
+
+    def writes() -> tuple[int, int, int]:
+        return SQLITE_QUERY.labels("insert").count, SQLITE_QUERY.labels("update").count, SQLITE_COMMIT.count
+
+    def database_size() -> int:
+        return sum(
+            os.path.getsize(file)
+            for file in (CONFIG.database_file, f"{CONFIG.database_file}-wal")
+            if os.path.exists(file)
+        )
+
+    gc.collect()
+    rss_before, objects_before = rss(), len(gc.get_objects())
+    writes_before, changes_before, size_before = writes(), bot.sql.total_changes, database_size()
+
+    replayer = Replayer(harness, speed=speed)
+    elapsed = await replayer.run(path)
+    watchdog.stop()
+
+    gc.collect()
+    rss_after, objects_after = rss(), len(gc.get_objects())
+    inserts, updates, commits = (after - before for after, before in zip(writes(), writes_before))
+
+    total = sum(replayer.events.values())
+    print(f"[REPLAY] {total} events in {elapsed:.1f}s at {speed:g}x, fell behind by {replayer.behind * 1000:.0f}ms at most")
+    print("    " + ", ".join(f"{kind.lower()}: {count}" for kind, count in replayer.events.most_common()))
+    print(f"    guilds: {len(bot.guilds)}, players: {len(bot.voice_clients)}, commands failed: {replayer.command_errors}")
+
+    lags = replayer.lags
+    print(
+        f"[REPLAY] Event loop lag: p50 {quantile(lags, 50) * 1000:.1f}ms, p99 {quantile(lags, 99) * 1000:.1f}ms, "
+        f"max {max(lags, default=0.0) * 1000:.1f}ms"
+    )
+    print(
+        f"[REPLAY] Memory: {mib(rss_before)} -> {mib(rss_after)} ({mib(rss_after - rss_before)} growth), "
+        f"peak {mib(replayer.peak_rss)}, {objects_after - objects_before:+} objects tracked by the GC"
+    )
+    print(
+        f"[REPLAY] Database: {inserts} inserts, {updates} updates, {commits} commits, "
+        f"{bot.sql.total_changes - changes_before} rows changed, {database_size() - size_before:+} bytes on disk"
+    )
+    print(f"[REPLAY] Slowest callbacks:\n{watchdog.report()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.replay", description=__doc__.splitlines()[0])
+    parser.add_argument("trace", help="Path of the recorded trace")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed, from 1 to 100 times the recording")
+    parser.add_argument("--playlist-size", type=int, default=100)
+    args = parser.parse_args()
+
+    if not 1 <= args.speed <= 100:
+        parser.error("--speed must be between 1 and 100")
+
+    # The harness runs from its own directory
+    asyncio.run(replay(os.path.abspath(args.trace), speed=args.speed, playlist_size=args.playlist_size))
+
+
+if __name__ == "__main__":
+    main()
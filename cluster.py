@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import signal
+import sys
+
+import aiohttp
+from dotenv import load_dotenv
+
+from main import run_lavalink, stop_lavalink
+from utils import CONFIG, ClusterMetricsServer, IPCServer
+
+load_dotenv()
+
+# Discord allows one IDENTIFY every 5 seconds per bucket
+IDENTIFY_DELAY = 5.5
+
+
+async def recommended_shards(token: str) -> int:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            "https://discord.com/api/v10/gateway/bot",
+            headers={"Authorization": f"Bot {token}"},
+        ) as response:
+            response.raise_for_status()
+            data = await response.json()
+
+    return data["shards"]
+
+
+def split_shards(shard_count: int, clusters: int) -> list[list[int]]:
+    """Split the shards into contiguous ranges, one for each cluster."""
+    size, extra = divmod(shard_count, clusters)
+
+    ranges: list[list[int]] = []
+    start = 0
+    for cluster_id in range(clusters):
+        end = start + size + (cluster_id < extra)
+        ranges.append(list(range(start, end)))
+        start = end
+
+    return ranges
+
+
+class Cluster:
+    """A bot process owning a range of shards, restarted whenever it exits."""
+
+    def __init__(self, cluster_id: int, *, shard_ids: list[int], shard_count: int) -> None:
+        self.id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+
+        self.process: asyncio.subprocess.Process | None = None
+        self.stopping = False
+
+    @property
+    def env(self) -> dict[str, str]:
+        return {
+            **os.environ,
+            "PARROT_CLUSTER_ID": str(self.id),
+            "PARROT_SHARD_IDS": ",".join(map(str, self.shard_ids)),
+            "PARROT_SHARD_COUNT": str(self.shard_count),
+        }
+
+    async def run(self, *, delay: float = 0) -> None:
+        await asyncio.sleep(delay)
+
+        backoff = 1.0
+        while not self.stopping:
+            print(f"[CLUSTER] Starting cluster {self.id} with shards {self.shard_ids[0]}-{self.shard_ids[-1]}")
+            self.process = await asyncio.create_subprocess_exec(sys.executable, "main.py", env=self.env)
+            code = await self.process.wait()
+
+            if self.stopping:
+                return
+
+            print(f"[CLUSTER] Cluster {self.id} exited with code {code}, restarting in {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 60.0)
+
+    def stop(self) -> None:
+        self.stopping = True
+        if self.process is not None and self.process.returncode is None:
+            self.process.terminate()
+
+
+async def report(server: IPCServer) -> None:
+    while True:
+        await asyncio.sleep(60)
+
+        stats = server.aggregate()
+        print(
+            f"[CLUSTER] {len(server.clusters)} clusters connected, "
+            f"{stats['guilds']} guilds, {stats['players']} players"
+        )
+
+
+async def main() -> None:
+    shard_count = CONFIG.sharding.shard_count or await recommended_shards(os.environ["TOKEN"])
+    clusters = min(CONFIG.cluster.clusters or os.cpu_count() or 1, shard_count)
+
+    server = IPCServer(CONFIG.cluster.ipc_path)
+    await server.start()
+    print(f"[IPC] Listening on {CONFIG.cluster.ipc_path}")
+
+    workers = [
+        Cluster(cluster_id, shard_ids=shard_ids, shard_count=shard_count)
+        for cluster_id, shard_ids in enumerate(split_shards(shard_count, clusters))
+    ]
+
+    metrics: ClusterMetricsServer | None = None
+    if CONFIG.metrics.enabled:
+        ports = {worker.id: CONFIG.metrics.cluster_port(worker.id) for worker in workers}
+        metrics = ClusterMetricsServer(host=CONFIG.metrics.host, port=CONFIG.metrics.port, clusters=ports)
+        await metrics.start()
+        print(f"[CLUSTER] Metrics of every cluster on http://{CONFIG.metrics.host}:{CONFIG.metrics.port}/metrics")
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(sig, lambda: [worker.stop() for worker in workers])
+
+    # The launcher runs Lavalink, the clusters it spawns do not need Java
+    lavalink = await run_lavalink()
+    reporter = asyncio.create_task(report(server))
+
+    # Later clusters wait for the earlier ones to identify all of their shards
+    delay = 0.0
+    runners = []
+    for worker in workers:
+        runners.append(worker.run(delay=delay))
+        delay += len(worker.shard_ids) * IDENTIFY_DELAY
+
+    try:
+        await asyncio.gather(*runners)
+    finally:
+        reporter.cancel()
+        await stop_lavalink(lavalink)
+        if metrics is not None:
+            await metrics.close()
+        await server.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
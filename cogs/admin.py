@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import asyncio
+import io
+import os
+
 import discord
 from discord.ext import commands
 
@@ -17,8 +21,8 @@ class Admin(Cog):
     async def block(self, ctx: Context, *, obj: discord.User | discord.Member) -> None:
         """Block a user, member, guild or user ID."""
 
-        confirm = ctx.prompt(
-            content=f"Are you sure you want to block {obj}?",
+        confirm = await ctx.prompt(
+            f"Are you sure you want to block {obj}?",
             timeout=30.0,
         )
         if not confirm:
@@ -33,8 +37,8 @@ class Admin(Cog):
     async def unblock(self, ctx: Context, *, obj: discord.User | discord.Member) -> None:
         """Unblock a user, member, guild or user ID."""
 
-        confirm = ctx.prompt(
-            content=f"Are you sure you want to unblock {obj}?",
+        confirm = await ctx.prompt(
+            f"Are you sure you want to unblock {obj}?",
             timeout=30.0,
         )
         if not confirm:
@@ -44,6 +48,160 @@ class Admin(Cog):
         await self.bot.cache.update(query, (obj.id,))
         await ctx.tick()
 
+    @commands.group(name="looplag", hidden=True, invoke_without_command=True)
+    @commands.is_owner()
+    async def looplag(self, ctx: Context) -> None:
+        """Show the call sites which blocked the event loop the longest."""
+        if self.bot.watchdog is None:
+            await ctx.reply("The event loop watchdog is disabled.")
+            return
+
+        await ctx.reply(f"```\n{self.bot.watchdog.report()[:1900]}\n```")
+
+    @looplag.command(name="stack", hidden=True)
+    @commands.is_owner()
+    async def looplag_stack(self, ctx: Context, index: int = 1) -> None:
+        """Show the stack of the worst stall of the n-th slowest call site."""
+        if self.bot.watchdog is None:
+            await ctx.reply("The event loop watchdog is disabled.")
+            return
+
+        sites = self.bot.watchdog.slowest(index)
+        if len(sites) < index or index < 1:
+            await ctx.reply("There is no such call site.")
+            return
+
+        site = sites[index - 1]
+        # Keep the innermost frames, they are the ones that matter
+        stack = "".join(site.stack)[-1800:]
+        await ctx.reply(f"**{site.site}** ({site.worst * 1000:.0f}ms, task: {site.task})\n```py\n{stack}\n```")
+
+    @looplag.command(name="reset", hidden=True)
+    @commands.is_owner()
+    async def looplag_reset(self, ctx: Context) -> None:
+        """Forget the recorded stalls."""
+        if self.bot.watchdog is not None:
+            self.bot.watchdog.reset()
+        await ctx.tick()
+
+    @commands.group(name="profile", hidden=True, invoke_without_command=True)
+    @commands.is_owner()
+    async def profile(self, ctx: Context, seconds: float = 30.0, *, target: str | None = None) -> None:
+        """Sample the event loop for the given amount of seconds.
+
+        If a target is given, only the samples of that command or event are kept.
+
+        Examples:
+        - `profile 60` - Profile everything for a minute.
+        - `profile 300 play` - Profile the `play` command for five minutes.
+        - `profile 120 on_wavelink_track_end` - Profile the track end listener.
+        """
+        profiler = self.bot.profiler
+        try:
+            profiler.start(target=target)
+        except RuntimeError as e:
+            await ctx.reply(str(e))
+            return
+
+        started_at = profiler.started_at
+        await ctx.reply(f"Profiling {target or 'everything'} for {seconds:.0f} seconds.")
+
+        await asyncio.sleep(seconds)
+
+        # It may have been stopped, or even restarted, in the meantime
+        if profiler.running and profiler.started_at == started_at:
+            await self._send_profile(ctx, profiler.stop())
+
+    @profile.command(name="stop", hidden=True)
+    @commands.is_owner()
+    async def profile_stop(self, ctx: Context) -> None:
+        """Stop the running profiler now."""
+        if not self.bot.profiler.running:
+            await ctx.reply("The profiler is not running.")
+            return
+
+        await self._send_profile(ctx, self.bot.profiler.stop())
+
+    async def _send_profile(self, ctx: Context, path: str) -> None:
+        samples = self.bot.profiler.samples.total()
+        content = f"Collected {samples} samples, written to `{path}`."
+
+        if os.path.getsize(path) < ctx.guild.filesize_limit:
+            await ctx.reply(content, file=discord.File(path))
+        else:
+            await ctx.reply(content)
+
+    @commands.group(name="trace", hidden=True, invoke_without_command=True)
+    @commands.is_owner()
+    async def trace(self, ctx: Context, minutes: float = 60.0) -> None:
+        """Record an anonymized trace of gateway and Lavalink events for the given amount of minutes.
+
+        The trace can be replayed against a local bot with `python -m benchmarks.replay`.
+        """
+        tracer = self.bot.tracer
+        try:
+            path = tracer.start()
+        except RuntimeError as e:
+            await ctx.reply(str(e))
+            return
+
+        writer = tracer.writer
+        await ctx.reply(f"Recording to `{path}` for {minutes:.0f} minutes.")
+
+        await asyncio.sleep(minutes * 60)
+
+        # It may have been stopped, or even restarted, in the meantime
+        if tracer.writer is writer:
+            writer = tracer.stop()
+            await ctx.reply(f"Recorded {writer.records} events to `{writer.path}`.")
+
+    @trace.command(name="stop", hidden=True)
+    @commands.is_owner()
+    async def trace_stop(self, ctx: Context) -> None:
+        """Stop recording the trace now."""
+        if not self.bot.tracer.recording:
+            await ctx.reply("No trace is being recorded.")
+            return
+
+        writer = self.bot.tracer.stop()
+        await ctx.reply(f"Recorded {writer.records} events to `{writer.path}`.")
+
+    @commands.command(name="memory", hidden=True)
+    @commands.is_owner()
+    async def memory(self, ctx: Context, limit: int = 10) -> None:
+        """Show the size of the tracked structures, the biggest guilds and the objects that leaked."""
+        async with ctx.typing():
+            self.bot.memory.check(collect=True)
+            report = await self.bot.memory.report(limit)
+
+        if len(report) < 1900:
+            await ctx.reply(f"```\n{report}\n```")
+        else:
+            await ctx.reply(file=discord.File(io.BytesIO(report.encode()), filename="memory.txt"))
+
+    @commands.command(name="clusters", hidden=True)
+    @commands.is_owner()
+    async def clusters(self, ctx: Context) -> None:
+        """Show the aggregated stats of every cluster."""
+        if self.bot.ipc is None:
+            await ctx.reply("The bot is not running in cluster mode.")
+            return
+
+        stats = await self.bot.ipc.request("cluster_stats")
+
+        lines = [f"{stats['guilds']} guilds, {stats['players']} players", "```"]
+        for cluster_id, cluster in stats["clusters"].items():
+            shards = cluster.get("shards", [])
+            shard_range = f"{shards[0]['id']}-{shards[-1]['id']}" if shards else "-"
+            status = "up" if cluster["connected"] else "down"
+            lines.append(
+                f"Cluster {cluster_id:>3} [{status:>4}] shards {shard_range:<9} | "
+                f"{cluster.get('guilds', 0):>6} guilds | {cluster.get('players', 0):>5} players"
+            )
+        lines.append("```")
+
+        await ctx.reply("\n".join(lines))
+
 
 async def setup(bot: Bot) -> None:
     await bot.add_cog(Admin(bot))
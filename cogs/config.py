@@ -4,6 +4,7 @@ import discord
 from discord.ext import commands
 
 from core import Bot, Cog, Context
+from utils.metrics import SQLITE_QUERY
 
 
 class Config(Cog):
@@ -12,7 +13,8 @@ class Config(Cog):
     def __init__(self, bot: Bot) -> None:
         self.bot = bot
 
-    @commands.group(name="cfg", aliases=["config"])
+    @commands.hybrid_group(name="cfg", aliases=["config"])
+    @commands.guild_only()
     @commands.has_permissions(manage_guild=True)
     async def config(self, ctx: Context) -> None:
         """Configure the bot."""
@@ -53,6 +55,31 @@ class Config(Cog):
         await self.bot.cache.update(query, (role.id if role else 0, ctx.guild.id))
         await ctx.tick()
 
+    @config.command(name="slashonly")
+    @commands.has_permissions(manage_guild=True)
+    async def slashonly(self, ctx: Context, enabled: bool) -> None:
+        """Only answer slash commands in this server.
+
+        Messages are no longer read for prefix commands, use `/cfg slashonly false` to use them again.
+
+        Example:
+        `p!config slashonly true`
+        """
+        if enabled:
+            query = r"""INSERT OR IGNORE INTO SLASH_ONLY_GUILDS (GUILD_ID) VALUES (?)"""
+            self.bot.slash_only.add(ctx.guild.id)
+        else:
+            query = r"""DELETE FROM SLASH_ONLY_GUILDS WHERE GUILD_ID = ?"""
+            self.bot.slash_only.discard(ctx.guild.id)
+
+        with SQLITE_QUERY.labels("update").time():
+            await self.bot.sql.execute(query, (ctx.guild.id,))
+        self.bot.need_commit = True
+
+        if self.bot.ipc is not None:
+            await self.bot.ipc.broadcast("slash_only", (ctx.guild.id, enabled))
+        await ctx.tick()
+
 
 async def setup(bot: Bot) -> None:
     await bot.add_cog(Config(bot))
@@ -5,6 +5,7 @@ import time
 from discord.ext import commands
 
 from core import Bot, Cog, Context
+from core.shards import ShardStats
 
 
 class Meta(Cog):
@@ -20,7 +21,38 @@ class Meta(Cog):
         message = await ctx.reply("Pong!")
         delta = time.perf_counter() - ini
 
-        await message.edit(content=f"Pong! ({delta * 1000:.2f}ms)")
+        lines = [f"Pong! ({delta * 1000:.2f}ms)"]
+
+        shards = self.bot.shard_monitor.stats()
+        current = ctx.guild.shard_id if ctx.guild else 0
+
+        if len(shards) > 10:
+            # Too many shards to list, only show the current one and the average
+            shards = [shard for shard in shards if shard.id == current] + [
+                Meta.average_shard(shards)
+            ]
+
+        lines.append("```")
+        for shard in shards:
+            name = "Average" if shard.id == -1 else f"Shard {shard.id}"
+            marker = "*" if shard.id == current else " "
+            status = "closed" if shard.closed else f"{shard.latency * 1000:.2f}ms"
+            lines.append(
+                f"{marker} {name:<9} {status:>10} | {shard.guilds:>6} guilds | {shard.event_rate:>7.2f} ev/s"
+            )
+        lines.append("```")
+
+        await message.edit(content="\n".join(lines))
+
+    @staticmethod
+    def average_shard(shards: list[ShardStats]) -> ShardStats:
+        return ShardStats(
+            id=-1,
+            latency=sum(shard.latency for shard in shards) / len(shards),
+            guilds=sum(shard.guilds for shard in shards) // len(shards),
+            event_rate=sum(shard.event_rate for shard in shards) / len(shards),
+            closed=False,
+        )
 
     @commands.command(name="version", aliases=["v"])
     async def version_command(self, ctx: Context) -> None:
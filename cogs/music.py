@@ -2,17 +2,61 @@ from __future__ import annotations
 
 import asyncio
 import re
-from time import time
-from typing import cast
+from datetime import datetime, timezone
+from time import perf_counter, time
+from typing import TYPE_CHECKING, cast
 
 import discord
 import wavelink
+from discord import app_commands
 from discord.ext import commands
-from jishaku.paginators import PaginatorEmbedInterface
 
-from core import Bot, Cog, Context
+from core import Bot, Choice, Cog, Context, Priority
 from utils import CONFIG, in_voice_channel, try_connect
-from .music_view import MusicView
+from utils.metrics import (
+    ACTIVE_PLAYERS,
+    LAVALINK_REQUEST,
+    LAVALINK_VOICE_PING,
+    LAVALINK_WEBSOCKET_DELAY,
+    QUEUED_TRACKS,
+    TRACK_START_LATENCY,
+)
+from .music_actor import PlayerActor
+from .music_controls import PlayerControls
+from .music_filters import BANDS, PRESETS, FilterChain
+from .music_history import PlayHistory
+from .music_idle import IdleReaper, Reason
+from .music_queue import TrackQueue, requester_of
+from .music_search import SearchCache
+from .music_view import MusicView, QueueView
+
+if TYPE_CHECKING:
+    from utils.config import Config
+
+
+class Node(wavelink.Node):
+    """A Lavalink node which records the round trip time of its REST requests."""
+
+    async def send(self, method="GET", *, path: str, data=None, params=None):
+        with LAVALINK_REQUEST.labels("send").time():
+            return await super().send(method, path=path, data=data, params=params)
+
+    async def _update_player(self, guild_id: int, /, *, data, replace: bool = False):
+        with LAVALINK_REQUEST.labels("update_player").time():
+            return await super()._update_player(guild_id, data=data, replace=replace)
+
+    async def _destroy_player(self, guild_id: int, /) -> None:
+        with LAVALINK_REQUEST.labels("destroy_player").time():
+            return await super()._destroy_player(guild_id)
+
+    async def _fetch_tracks(self, query: str):
+        with LAVALINK_REQUEST.labels("load_tracks").time():
+            return await super()._fetch_tracks(query)
+
+
+# Fading never goes all the way down, Lavalink resets a volume filter of 0 to 100%
+FADE_FLOOR = 0.05
+FADE_STEPS_PER_SECOND = 4
 
 
 class Player(wavelink.Player):
@@ -22,11 +66,215 @@ class Player(wavelink.Player):
 
     def __init__(self, *args, **kwargs) -> None:
         super().__init__(*args, **kwargs)
+        self.queue: TrackQueue = TrackQueue(fair=CONFIG.queue.fair)
+        self.play_requested_at: float | None = None
+        self.track_started_at: float | None = None
+
+        self.transition: asyncio.Task[None] | None = None
+        # Whether the transition started the next track already, it is then left to finish its fade in
+        self.transition_started = False
+        # The track the last transition started from, its end is not a skip
+        self.transitioned_from: wavelink.Playable | None = None
+        # The track the transition started, until the end of the track it started from is received
+        self.transitioned_to: wavelink.Playable | None = None
+        # The track the actor last skipped, until it ends
+        self.skipped: wavelink.Playable | None = None
+
+        self.controls = PlayerControls(self)
+        self.filter_chain = FilterChain(self)
 
     async def is_dj(self) -> bool:
         """Shortcut from ctx.is_dj."""
         return await self.ctx.is_dj()
 
+    async def play(self, track: wavelink.Playable, **kwargs) -> wavelink.Playable:
+        self.play_requested_at = perf_counter()
+        return await super().play(track, **kwargs)
+
+    def next_track(self) -> wavelink.Playable | None:
+        """The track the queue gives next, without taking it."""
+        queue = self.queue
+        if queue.mode is wavelink.QueueMode.loop and queue.loaded:
+            return queue.loaded
+        if queue:
+            return queue[0]
+        if queue.mode is wavelink.QueueMode.loop_all and queue.history:
+            return queue.history[0]
+        return None
+
+    async def preload(self) -> wavelink.Playable | None:
+        """Make sure the next track plays, resolving it again if its source hands out expiring stream URLs.
+
+        Tracks which do not resolve anymore are removed from the queue now, rather than failing to load once it is their turn.
+        """
+        for _ in range(3):
+            track = self.next_track()
+            if track is None or track.source not in CONFIG.playback.refresh_sources or not track.uri:
+                return track
+
+            # Looping a single track replays the loaded one, otherwise the first of the queue plays next
+            looped = track is self.queue.loaded and self.queue.mode is wavelink.QueueMode.loop
+            if not looped:
+                if not self.queue:
+                    return track
+                record = self.queue.record(0)
+
+            try:
+                results: wavelink.Search = await wavelink.Playable.search(track.uri)
+            except (wavelink.LavalinkLoadException, wavelink.LavalinkException):
+                results = []
+
+            if looped:
+                if results:
+                    fresh = results.tracks[0] if isinstance(results, wavelink.Playlist) else results[0]
+                    fresh.extras = track.extras
+                    if self.queue.loaded is track:
+                        self.queue._loaded = fresh
+                    return fresh
+                if self.queue.loaded is track:
+                    # Stops looping it, the queue goes on with its next track
+                    self.queue._loaded = None
+                continue
+
+            # The queue may have changed during the search, the track is found again rather than its index reused
+            index = self.queue.position(record)
+            if index is None:
+                # Removed meanwhile, whichever track is next now is checked instead
+                continue
+
+            if results:
+                fresh = results.tracks[0] if isinstance(results, wavelink.Playlist) else results[0]
+                fresh.extras = track.extras
+                self.queue[index] = fresh
+                return fresh
+
+            del self.queue[index]
+
+        return self.next_track()
+
+    def schedule_transition(self, position: int) -> None:
+        """Start the next track right as the current one ends, instead of once Lavalink tells it ended.
+
+        The position comes from the player update being handled, wavelink only applies it after the listeners ran.
+        """
+        track = self.current
+        if (
+            not CONFIG.playback.preload
+            or track is None
+            or track.is_stream
+            or self.transition is not None
+            or self.transitioned_from is track
+        ):
+            return
+
+        if track.length - position <= CONFIG.playback.preload * 1000:
+            self.transitioned_from = track
+            self.transition = asyncio.create_task(self._transition(track))
+
+    def cancel_transition(self, *, started: bool = True) -> None:
+        """Cancel the transition, unless it started the next track already and ``started`` is False."""
+        if self.transition is not None and (started or not self.transition_started):
+            self.transition.cancel()
+            self.transition = None
+
+    async def _fade(self, track: wavelink.Playable, base: float, start: float, end: float, duration: float) -> None:
+        steps = max(1, round(duration * FADE_STEPS_PER_SECOND))
+        for step in range(1, steps + 1):
+            await asyncio.sleep(duration / steps)
+            if self.current is not track:
+                return
+            self.filters.volume = base * (start + (end - start) * step / steps)
+            await self.set_filters(self.filters)
+
+    async def _transition(self, track: wavelink.Playable) -> None:
+        volume = self.filters.volume
+        base = volume or 1.0
+        crossfade = CONFIG.playback.crossfade
+
+        try:
+            if await self.preload() is None:
+                return
+
+            # Follow pauses and seeks until the fade out, or the end, is due
+            while True:
+                if self.current is not track:
+                    return
+                remaining = (track.length - self.position) / 1000
+                if not self.paused and remaining <= crossfade:
+                    break
+                await asyncio.sleep(1.0 if self.paused else min(max(remaining - crossfade, 0.0), 1.0))
+
+            if crossfade:
+                # Lavalink plays a single track per player, the tracks fade into each other rather than overlap
+                await self._fade(track, base, 1.0, FADE_FLOOR, remaining)
+            if self.current is not track:
+                return
+
+            async def start_next() -> wavelink.Playable | None:
+                # Lavalink may have told the track ended meanwhile, and the next one was started then
+                if self.current is not track:
+                    return None
+                try:
+                    upcoming = self.queue.get()
+                except wavelink.QueueEmpty:
+                    return None
+
+                self.transition_started = True
+                if crossfade:
+                    self.filters.volume = base * FADE_FLOOR
+                await self.play(upcoming)
+                self.transitioned_to = upcoming
+                return upcoming
+
+            # Applied in order with the end of the track, whichever comes second sees the player playing
+            music: Music | None = self.client.get_cog("Music")  # type: ignore
+            if music is not None and self.guild is not None:
+                upcoming = await music.actor(self.guild.id).run(start_next)
+            else:
+                upcoming = await start_next()
+
+            if upcoming is not None and crossfade:
+                await self._fade(upcoming, base, FADE_FLOOR, 1.0, crossfade)
+        finally:
+            self.transition = None
+            self.transition_started = False
+            if crossfade and self.filters.volume != volume and self.connected:
+                self.filters.volume = volume  # type: ignore
+                await self.set_filters(self.filters)
+
+    async def connect(self, **kwargs) -> None:
+        await super().connect(**kwargs)
+        await self.filter_chain.load()
+
+        music: Music | None = self.client.get_cog("Music")  # type: ignore
+        if music is not None and self.guild is not None:
+            music.reaper.schedule(self.guild.id, "idle", CONFIG.idle.timeout)
+
+    async def _destroy(self, with_invalidate: bool = True) -> None:
+        if not with_invalidate:
+            # Moving to another node, the player lives on
+            self.cancel_transition()
+            await super()._destroy(with_invalidate)
+            return
+
+        guild_id = self.guild.id if self.guild else 0
+        self.cancel_transition()
+        self.controls.cancel()
+        await super()._destroy(with_invalidate)
+
+        bot: Bot = self.client  # type: ignore
+        music: Music | None = bot.get_cog("Music")  # type: ignore
+        if music is not None:
+            music.reaper.cancel(guild_id)
+
+        # Nothing should keep the player, its context or its views alive from now on
+        bot.memory.watch(
+            guild_id,
+            player=self,
+            context=getattr(self, "ctx", None),
+            **{f"view_{i}": view for i, view in enumerate(bot._views()) if bot._view_guild(view) == guild_id},
+        )
+
 
 class Music(Cog):
     """A simple Music Cog that uses wavelink to play music in a voice channel."""
@@ -35,21 +283,179 @@ class Music(Cog):
 
     def __init__(self, bot: Bot) -> None:
         self.bot = bot
+        self.reaper = IdleReaper(self.reap)
+        self.history = PlayHistory(bot)
+        self.searches = SearchCache(CONFIG.app_commands.search_cache)
+
+        self.connecting: asyncio.Task[None] | None = None
+        # Identifier in the config -> node
+        self.nodes: dict[str, Node] = {}
+        self.controls_view: MusicView | None = None
+        self.controls_layout: MusicView | None = None
+        # Guild ID -> actor applying the changes to its player, while it has some to apply
+        self.actors: dict[int, PlayerActor] = {}
+
+    def actor(self, guild_id: int) -> PlayerActor:
+        try:
+            return self.actors[guild_id]
+        except KeyError:
+            actor = self.actors[guild_id] = PlayerActor(guild_id, self._actor_idle)
+            return actor
+
+    def _actor_idle(self, guild_id: int) -> None:
+        actor = self.actors.get(guild_id)
+        if actor is not None and not actor:
+            del self.actors[guild_id]
 
     async def cog_load(self) -> None:
-        host = CONFIG.lavalink.host
-        port = CONFIG.lavalink.port
-
-        uri = f"ws://{host}:{port}"
-        node = wavelink.Node(
-            identifier="MAIN",
-            uri=uri,
-            password=CONFIG.lavalink.password,
+        self.nodes = {config.identifier: self.make_node(config) for config in CONFIG.nodes}
+
+        # Lavalink may still be starting, the cog does not wait for it to load
+        self.connecting = asyncio.create_task(self.connect_nodes(list(self.nodes.values()), cache_capacity=100))
+        CONFIG.subscribe("nodes", self.on_nodes_changed)
+
+        self.reaper.start()
+        self.history.start()
+
+        # Views need the running loop, they cannot be made in __init__
+        self.controls_view = MusicView(self.bot)
+        self.bot.add_view(self.controls_view)
+        self.controls_layout = MusicView(self.bot)
+        discord.ui.View.stop(self.controls_layout)
+
+        memory = self.bot.memory
+        memory.register("music_pool", lambda: self._pool, guild=lambda key, _: key if isinstance(key, int) else None)
+        memory.register("skip_requests", lambda: self.skip_request, guild=lambda key, _: key)
+        memory.register("players", self._players, guild=lambda key, _: key)
+        memory.register("pending_plays", lambda: self.history._plays, guild=lambda _, play: play[0])
+        memory.register("player_actors", lambda: self.actors, guild=lambda key, _: key)
+
+        ACTIVE_PLAYERS.set_function(lambda: sum(len(node.players) for node in wavelink.Pool.nodes.values()))
+        QUEUED_TRACKS.set_function(
+            lambda: sum(
+                player.queue.count for node in wavelink.Pool.nodes.values() for player in node.players.values()
+            )
+        )
+
+    @staticmethod
+    def make_node(config: Config.Lavalink, *, retries: int | None = None) -> Node:
+        # A node replacing another one connects before the old one is drained, they cannot share an identifier
+        identifier, revision = config.identifier, 0
+        while identifier in wavelink.Pool.nodes:
+            revision += 1
+            identifier = f"{config.identifier}-{revision}"
+
+        return Node(
+            identifier=identifier,
+            uri=config.uri,
+            password=config.password,
+            retries=retries,
+            # Inactivity is handled by the reaper, wavelink would start a task per player
+            inactive_player_timeout=None,
+            inactive_channel_tokens=None,
         )
 
-        await wavelink.Pool.connect(nodes=[node], client=self.bot, cache_capacity=100)
+    async def connect_nodes(self, nodes: list[Node], *, cache_capacity: int | None = None) -> None:
+        try:
+            await wavelink.Pool.connect(nodes=nodes, client=self.bot, cache_capacity=cache_capacity)
+        except wavelink.WavelinkException as e:
+            print(f"[BOT] Failed connecting to Lavalink: {e!r}")
+
+    async def wait_connected(self, node: Node, *, timeout: float = 10.0) -> bool:
+        if node.status is wavelink.NodeStatus.CONNECTED:
+            return True
+
+        try:
+            await self.bot.wait_for("wavelink_node_ready", check=lambda payload: payload.node is node, timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def on_nodes_changed(self, old: list[Config.Lavalink], new: list[Config.Lavalink]) -> None:
+        """Connect the nodes added to the config, then drain the ones removed from it.
+
+        A node whose settings changed is replaced, its players only move once the
+        new node is connected. Nodes which fail to connect are dropped and the
+        ones they were replacing are kept.
+        """
+        previous = {config.identifier: config for config in old}
+        current = {config.identifier: config for config in new}
+
+        added = {
+            identifier: self.make_node(config, retries=3)
+            for identifier, config in current.items()
+            if previous.get(identifier) != config
+        }
+        if added:
+            await self.connect_nodes(list(added.values()))
+
+        for identifier, node in added.items():
+            if await self.wait_connected(node):
+                self.nodes[identifier], replaced = node, self.nodes.get(identifier)
+                if replaced is not None:
+                    await self.drain(replaced)
+            else:
+                print(f"[BOT] Node {node.identifier} did not connect, it was not added")
+                await self.close_node(node)
+
+        for identifier in previous.keys() - current.keys():
+            node = self.nodes.pop(identifier, None)
+            if node is not None:
+                await self.drain(node)
+
+    async def drain(self, node: Node) -> None:
+        """Move the players of the node to the other nodes, then close it."""
+        targets = [
+            other
+            for other in wavelink.Pool.nodes.values()
+            if other is not node and other.status is wavelink.NodeStatus.CONNECTED
+        ]
+
+        moved = 0
+        for player in list(node.players.values()):
+            if targets:
+                target = min(targets, key=lambda other: len(other.players))
+                try:
+                    await player.switch_node(target)
+                    moved += 1
+                    continue
+                except (RuntimeError, wavelink.WavelinkException):
+                    pass
+            await player.disconnect()
+
+        await self.close_node(node)
+        print(f"[BOT] Node {node.identifier} drained, {moved} player(s) moved")
+
+    @staticmethod
+    async def close_node(node: Node) -> None:
+        await node.close(eject=True)
+        # Only closing the whole pool closes the session of a node
+        await node._session.close()
+
+    @staticmethod
+    def _players() -> dict[int, Player]:
+        return {
+            guild_id: player  # type: ignore
+            for node in wavelink.Pool.nodes.values()
+            for guild_id, player in node.players.items()
+        }
 
     async def cog_unload(self) -> None:
+        CONFIG.unsubscribe("nodes", self.on_nodes_changed)
+        if self.connecting is not None:
+            self.connecting.cancel()
+        if self.controls_view is not None:
+            discord.ui.View.stop(self.controls_view)
+        self.reaper.stop()
+        await self.history.stop()
+
+        for structure in ("music_pool", "skip_requests", "players", "pending_plays", "player_actors"):
+            self.bot.memory.unregister(structure)
+
+        for actor in self.actors.values():
+            actor.cancel()
+        self.actors.clear()
+
         await wavelink.Pool.close()
 
     def playing_embed(self, player: Player) -> discord.Embed:
@@ -88,13 +494,17 @@ class Music(Cog):
                 name="Volume",
                 value=f"{player.volume}%",
             )
+            .add_field(
+                name="Filters",
+                value=str(player.filter_chain),
+            )
             .add_field(
                 name="Looping",
                 value="Yes" if player.queue.mode.value in {1, 2} else "No",
             )
             .add_field(
                 name=f"Queue [{player.queue.count or 'Empty'}]",
-                value=f"Next: {player.queue._items[0] if player.queue else 'None'}",
+                value=f"Next: {player.queue[0] if player.queue else 'None'}",
             )
             .add_field(
                 name="Requested by",
@@ -110,19 +520,76 @@ class Music(Cog):
 
         return embed
 
+    def queue_embed(self, player: Player | None, page: int) -> tuple[discord.Embed, int]:
+        """Render a page of the queue, out of range pages wrap around. Also returns the page rendered."""
+        embed = discord.Embed()
+        if player is None or not player.queue:
+            embed.description = "_The queue is currently empty._"
+            return embed, 0
+
+        queue = player.queue
+        per_page = CONFIG.queue.page_size
+        pages = -(-queue.count // per_page)
+        page %= pages
+
+        lines = []
+        for index, track in enumerate(queue.page(page, per_page), start=page * per_page + 1):
+            title = f"[{track.title}](<{track.uri}>)" if track.uri else track.title
+            # Mentions in embeds render without fetching the member
+            requester = requester_of(track)
+            lines.append(f"{index}. {title} by {track.author} - Requested by {f'<@{requester}>' if requester else 'N/A'}")
+
+        embed.title = f"Queue [{queue.count}]{' - Fair mode' if queue.fair else ''}"
+        embed.description = "\n".join(lines)
+        embed.set_footer(text=f"Page {page + 1}/{pages}")
+        return embed, page
+
+    async def queue_room(self, ctx: Context) -> int | None:
+        """How many more songs the author may queue, None if there is no limit."""
+        limit = CONFIG.queue.max_per_requester
+        if not limit or await ctx.is_dj():
+            return None
+        return max(0, limit - ctx.voice_client.queue.requesters[ctx.author.id])
+
+    async def enqueue(self, ctx: Context, tracks: list[wavelink.Playable]) -> int:
+        """Queue the tracks through the actor of the guild, which starts the player if it is idle."""
+        weight = None
+        if ctx.voice_client.queue.fair:
+            weight = (ctx.author.id, CONFIG.queue.dj_weight if await ctx.is_dj() else 1.0)
+
+        return await self.actor(ctx.guild.id).enqueue(ctx.voice_client, tracks, weight=weight)
+
     @Cog.listener()
     async def on_wavelink_track_start(self, payload: wavelink.TrackStartEventPayload) -> None:
         player: Player | None = cast(Player, payload.player)
         if player is None:
             return
 
+        if player.play_requested_at is not None:
+            TRACK_START_LATENCY.observe(perf_counter() - player.play_requested_at)
+            player.play_requested_at = None
+        player.track_started_at = time()
+
+        self.reaper.cancel(player.channel.guild.id, "idle")
+
         embed = self.playing_embed(player)
 
-        view = MusicView(timeout=60.0, ctx=player.ctx)
-        msg = await player.home.send(embed=embed, view=view)
-        view.message = msg
+        msg = await self.bot.outbound.send(
+            player.home, embed=embed, view=self.controls_layout, priority=Priority.UPDATE
+        )
         player.main_message = msg
 
+    @Cog.listener()
+    async def on_wavelink_player_update(self, payload: wavelink.PlayerUpdateEventPayload) -> None:
+        # Lavalink timestamps the update in milliseconds since the epoch
+        LAVALINK_WEBSOCKET_DELAY.observe(max(0.0, time() - payload.time / 1000))
+        if payload.ping >= 0:
+            LAVALINK_VOICE_PING.observe(payload.ping / 1000)
+
+        player: Player | None = cast(Player, payload.player)
+        if player is not None:
+            player.schedule_transition(payload.position)
+
     @Cog.listener()
     async def on_wavelink_node_ready(self, payload: wavelink.NodeReadyEventPayload) -> None:
         print(f"[BOT] Node {payload.node.identifier} is ready!")
@@ -134,27 +601,112 @@ class Music(Cog):
             return
 
         if player.channel.guild.id in self.skip_request:
-            await self.skip_request[player.channel.guild.id].delete(delay=0)
-            self.skip_request.pop(player.channel.guild.id)
+            self.bot.outbound.delete(self.skip_request.pop(player.channel.guild.id))
 
         if hasattr(player, "main_message"):
-            await player.main_message.delete(delay=0)
+            # Also drops the refreshes of the message still waiting
+            self.bot.outbound.delete(player.main_message)
+
+        track = payload.track
+        # Replaced by the transition to the next track, the track did play until its end
+        transitioned = player.transitioned_from is not None and player.transitioned_from.encoded == track.encoded
+        finished = payload.reason == "finished" or (payload.reason == "replaced" and transitioned)
+        if transitioned:
+            player.transitioned_from = None
+            if payload.reason == "replaced":
+                player.transitioned_to = None
+
+        # A track which failed to load was never heard
+        if player.track_started_at is not None and payload.reason in {"finished", "stopped", "replaced"}:
+            played = int((time() - player.track_started_at) * 1000)
+            self.history.record(
+                player.channel.guild.id,
+                track,
+                requester_id=requester_of(track),
+                played_ms=track.length if finished else min(played, track.length),
+                skipped=not finished,
+            )
+        player.track_started_at = None
+
+        # Whichever track was skipped has ended now
+        player.skipped = None
+
+        if payload.reason != "replaced":
+            # A transition which took the next track already is left to finish
+            player.cancel_transition(started=False)
+            # Lavalink does not play the next track by itself, the actor starts it after the commands before
+            if (not player.playing or transitioned) and payload.reason in {"finished", "stopped", "loadFailed"}:
+                await self.actor(player.channel.guild.id).run(lambda: self.advance(player, transitioned=transitioned))
+
+        if not player.queue and not player.playing:
+            # Commands adding tracks start playing them, until then the player is idle
+            self.reaper.schedule(player.channel.guild.id, "idle", CONFIG.idle.timeout)
 
-        if not player.playing and player.queue.mode.value in {1, 2}:
+    @staticmethod
+    async def advance(player: Player, *, transitioned: bool = False) -> None:
+        if not player.connected:
+            return
+
+        if transitioned and player.transitioned_to is not None:
+            # The transition started the next track before Lavalink told the previous one finished,
+            # wavelink forgot the current track when it did
+            if player.current is None:
+                player._current = player.transitioned_to
+            player.transitioned_to = None
+            return
+
+        # A command queued in the meantime may have started the player already
+        if player.playing:
+            return
+        try:
             await player.play(player.queue.get())
+        except wavelink.QueueEmpty:
+            pass
 
-        if not player.queue:
-            try:
-                r = await asyncio.wait_for(player.queue.get_wait(), timeout=3 * 60)
-            except asyncio.TimeoutError:
-                await player.disconnect()
-                return
-            else:
-                if not player.playing:
-                    await player.play(r)
+    @Cog.listener()
+    async def on_voice_state_update(
+        self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState
+    ) -> None:
+        if before.channel == after.channel:
+            return
 
-    @commands.command(aliases=["connect"])
-    @commands.max_concurrency(1, per=commands.BucketType.guild)
+        player: Player | None = cast(Player, member.guild.voice_client)
+        if player is None or not player.channel:
+            return
+
+        if self.has_listeners(player.channel):
+            self.reaper.cancel(member.guild.id, "alone")
+        elif not self.reaper.scheduled(member.guild.id, "alone"):
+            self.reaper.schedule(member.guild.id, "alone", CONFIG.idle.alone_timeout)
+
+    def has_listeners(self, channel: discord.VoiceChannel | discord.StageChannel) -> bool:
+        # Voice states are tracked even for members that are not in the member cache, unlike `channel.members`
+        for user_id in channel.voice_states:
+            member = channel.guild.get_member(user_id)
+            if user_id != self.bot.user.id and not (member is not None and member.bot):  # type: ignore
+                return True
+        return False
+
+    async def reap(self, guild_id: int, reason: Reason) -> None:
+        # Checked in the actor, so a song queued just before the deadline is not disconnected
+        await self.actor(guild_id).run(lambda: self._reap(guild_id, reason))
+
+    async def _reap(self, guild_id: int, reason: Reason) -> None:
+        guild = self.bot.get_guild(guild_id)
+        player: Player | None = cast(Player, guild.voice_client) if guild else None
+        if player is None:
+            return
+
+        # The state may have changed between the deadline and now
+        if reason == "idle" and (player.playing or player.queue):
+            return
+        if reason == "alone" and self.has_listeners(player.channel):
+            return
+
+        await player.disconnect()
+
+    @commands.hybrid_command(aliases=["connect"])
+    @commands.guild_only()
     @in_voice_channel(user=True, bot=False)
     async def join(self, ctx: Context) -> None:
         """Join the voice channel of the author. You must be in a voice channel to use this command.
@@ -187,23 +739,48 @@ class Music(Cog):
                 if not prompt:
                     return
 
-                await ctx.voice_client.move_to(ctx.author.voice.channel)
+                await self.move_player(ctx, ctx.author.voice.channel)
                 await ctx.reply(f"Moved the player to {ctx.author.voice.channel.mention}.")
                 await ctx.tick()
             return
 
         try:
-            player = await ctx.author.voice.channel.connect(cls=Player)  # type: ignore
-            player.home = ctx.channel  # type: ignore
-            player.ctx = ctx
-            await ctx.reply(f"Connected to {ctx.author.voice.channel.mention}.")
-            await ctx.tick()
+            connected = await self.actor(ctx.guild.id).run(lambda: self.connect_player(ctx))
         except discord.ClientException:
             await ctx.reply("Failed connecting to channel")
+            return
+
+        if not connected:
+            # Another command connected it first
+            await ctx.reply("Bot is already in a voice channel.")
+            return
+
+        await ctx.reply(f"Connected to {ctx.author.voice.channel.mention}.")
+        await ctx.tick()
 
-    @commands.command()
+    @staticmethod
+    async def connect_player(ctx: Context) -> bool:
+        """Connect to the voice channel of the author, False if a player was connected meanwhile."""
+        assert ctx.author.voice and ctx.author.voice.channel
+        if ctx.voice_client is not None:
+            return False
+
+        player = await ctx.author.voice.channel.connect(cls=Player)  # type: ignore
+        player.home = ctx.channel  # type: ignore
+        player.ctx = ctx
+        return True
+
+    async def move_player(self, ctx: Context, channel: discord.VoiceChannel | discord.StageChannel) -> None:
+        async def move() -> None:
+            # Disconnected meanwhile
+            if ctx.voice_client is not None and ctx.voice_client.channel != channel:
+                await ctx.voice_client.move_to(channel)
+
+        await self.actor(ctx.guild.id).run(move)
+
+    @commands.hybrid_command(description="Move the bot to your voice channel, or to the given one.")
+    @commands.guild_only()
     @in_voice_channel(user=True, bot=True, same=False)
-    @commands.max_concurrency(1, per=commands.BucketType.guild)
     @Context.dj_only()
     async def move(self, ctx: Context, *, channel: discord.VoiceChannel | None = None) -> None:
         """Move the bot to the voice channel of the author. You and the bot must be in a voice channel to use this command.
@@ -237,12 +814,12 @@ class Music(Cog):
         if not prompt:
             return
 
-        await ctx.voice_client.move_to(channel or ctx.author.voice.channel)
+        await self.move_player(ctx, channel or ctx.author.voice.channel)
         await ctx.reply(f"Moved the player to {ctx.author.voice.channel.mention}.")
         await ctx.tick()
 
-    @commands.command()
-    @commands.max_concurrency(1, per=commands.BucketType.guild)
+    @commands.hybrid_command(description="Play the song which best matches the query.")
+    @commands.guild_only()
     @in_voice_channel(user=True)
     @try_connect(cls=Player)
     async def play(self, ctx: Context, *, query: str) -> None:
@@ -260,6 +837,9 @@ class Music(Cog):
             )
             return
 
+        # Searching can outlast the 3 seconds an interaction has to be answered in
+        await ctx.defer()
+
         tracks: wavelink.Search = await wavelink.Playable.search(query)
         if not tracks:
             await ctx.reply(
@@ -267,21 +847,39 @@ class Music(Cog):
             )
             return
 
-        added = 0
+        if not isinstance(tracks, wavelink.Playlist):
+            self.searches.put(query, tracks)
 
-        for track in tracks:
-            track.extras = {"requester_id": ctx.author.id}
-            await ctx.voice_client.queue.put_wait(track)
-            added += 1
-            break
+        if await self.queue_room(ctx) == 0:
+            await ctx.reply(
+                f"{ctx.author.mention} - You already have {CONFIG.queue.max_per_requester} song(s) in the queue."
+            )
+            return
+
+        track = tracks[0]
+        track.extras = {"requester_id": ctx.author.id}
+        added = await self.enqueue(ctx, [track])
 
         await ctx.reply(f"Added the **{added}** song(s) to the queue.")
 
-        if not ctx.voice_client.playing:
-            await ctx.voice_client.play(ctx.voice_client.queue.get())
+    @play.autocomplete("query")
+    async def play_autocomplete(self, interaction: discord.Interaction, current: str) -> list[app_commands.Choice[str]]:
+        choices = self.searches.suggest(current)
+        if choices or len(current.strip()) < 3:
+            return choices
 
-    @commands.command()
-    @commands.max_concurrency(1, per=commands.BucketType.guild)
+        # Only searched when nobody searched anything like it yet, autocomplete must answer within 3 seconds
+        try:
+            tracks = await asyncio.wait_for(wavelink.Playable.search(current), timeout=2.0)
+        except (asyncio.TimeoutError, wavelink.WavelinkException):
+            return []
+
+        if tracks and not isinstance(tracks, wavelink.Playlist):
+            self.searches.put(current, tracks)
+        return self.searches.suggest(current)
+
+    @commands.hybrid_command()
+    @commands.guild_only()
     @in_voice_channel(user=True)
     @try_connect(cls=Player)
     async def playplaylist(self, ctx: Context, *, query: str) -> None:
@@ -297,29 +895,41 @@ class Music(Cog):
             )
             return
 
+        await ctx.defer()
+
         tracks: wavelink.Search = await wavelink.Playable.search(query)
         if not tracks:
             await ctx.reply("Could not find any tracks with that query. Please try again.")
             return
 
-        added = 0
-
         if not isinstance(tracks, wavelink.Playlist):
             await ctx.reply("The query is not a playlist.")
             return
 
-        for track in tracks:
+        room = await self.queue_room(ctx)
+        if room == 0:
+            await ctx.reply(
+                f"{ctx.author.mention} - You already have {CONFIG.queue.max_per_requester} song(s) in the queue."
+            )
+            return
+
+        playlist = tracks.tracks[:room] if room is not None else tracks.tracks
+        for track in playlist:
             track.extras = {"requester_id": ctx.author.id}
-            await ctx.voice_client.queue.put_wait(track)
-            added += 1
 
-        await ctx.reply(f"Added the **{added}** song(s) to the queue.")
+        # Queued in one go rather than track by track
+        added = await self.enqueue(ctx, playlist)
 
-        if not ctx.voice_client.playing:
-            await ctx.voice_client.play(ctx.voice_client.queue.get())
+        if added < len(tracks):
+            await ctx.reply(
+                f"Added the **{added}** song(s) to the queue, you can not queue more than "
+                f"{CONFIG.queue.max_per_requester} song(s)."
+            )
+        else:
+            await ctx.reply(f"Added the **{added}** song(s) to the queue.")
 
-    @commands.command()
-    @commands.max_concurrency(1, per=commands.BucketType.guild)
+    @commands.hybrid_command(description="Pick the song to play out of the top 10 results of the query.")
+    @commands.guild_only()
     @in_voice_channel(user=True, bot=True, same=True)
     @Context.with_typing
     async def search(self, ctx: Context, *, query: str) -> None:
@@ -334,6 +944,9 @@ class Music(Cog):
             )
             return
 
+        if not isinstance(tracks, wavelink.Playlist):
+            self.searches.put(query, tracks)
+
         st = ""
         for index, track in enumerate(tracks, start=1):
             track.extras = {"requester_id": ctx.author.id}
@@ -357,8 +970,7 @@ class Music(Cog):
                     "message", check=lambda m: m.author == ctx.author, timeout=30.0
                 )
             except asyncio.TimeoutError:
-                await msg.delete(delay=0)
-                await msg.add_reaction("\N{ALARM CLOCK}")
+                ctx.bot.outbound.delete(msg)
                 return
 
             if not response.content.isdigit():
@@ -368,13 +980,13 @@ class Music(Cog):
             if index < 0 or index >= len(tracks):
                 continue
 
-            await msg.delete(delay=0)
+            ctx.bot.outbound.delete(msg)
             return await self.play(ctx, query=f"{tracks[index].title} {tracks[index].author}")
 
     skip_request: dict[int, discord.Message] = {}
 
-    @commands.command()
-    @commands.max_concurrency(1, per=commands.BucketType.guild)
+    @commands.hybrid_command()
+    @commands.guild_only()
     @in_voice_channel(bot=True, user=True, same=True)
     async def skip(self, ctx: Context) -> None:
         """Skip the current song. You and the bot must be in the same voice channel to use this command.
@@ -383,22 +995,28 @@ class Music(Cog):
 
         To skip a song without being a DJ, you must have more than 50% of the members in the voice channel to vote to skip the song.
         """
-        if ctx.is_dj():
-            await ctx.voice_client.skip(force=True)
+        if await ctx.is_dj():
+            # Skips of the same track by several members skip it once. The actor is looked up when the skip
+            # is submitted, an actor held across awaits may have been forgotten and replaced meanwhile
+            await self.actor(ctx.guild.id).skip(ctx.voice_client, ctx.voice_client.current)
             await ctx.tick()
             self.skip_request.pop(ctx.guild.id, None)
             return
 
+        if (vote := self.skip_request.get(ctx.guild.id)) is not None:
+            await ctx.reply(f"A vote to skip the song is already running, react to it: {vote.jump_url}")
+            return
+
         assert ctx.author.voice and ctx.author.voice.channel
 
-        members = ctx.author.voice.channel.members
+        members = ctx.author.voice.channel.voice_states
 
         assert len(members) > 3
 
         count = 1
 
         def check(reaction: discord.Reaction, user: discord.User) -> bool:
-            return user in members and reaction.emoji in {
+            return user.id in members and reaction.emoji in {
                 "\N{WHITE HEAVY CHECK MARK}",
                 "\N{NEGATIVE SQUARED CROSS MARK}",
             }
@@ -409,48 +1027,57 @@ class Music(Cog):
         )
 
         self.skip_request[ctx.guild.id] = msg
+        track = ctx.voice_client.current
 
-        await msg.add_reaction("\N{WHITE HEAVY CHECK MARK}")
-        await msg.add_reaction("\N{NEGATIVE SQUARED CROSS MARK}")
+        # Members vote with these, they are never dropped
+        await ctx.bot.outbound.react(msg, "\N{WHITE HEAVY CHECK MARK}", priority=Priority.UPDATE)
+        await ctx.bot.outbound.react(msg, "\N{NEGATIVE SQUARED CROSS MARK}", priority=Priority.UPDATE)
 
         now = time() + (ctx.voice_client.position / 1000) - 1
         while count < len(members) // 2 and time() < now:
             try:
                 reaction, _ = await ctx.bot.wait_for("reaction_add", check=check)
             except asyncio.TimeoutError:
-                await msg.delete(delay=0)
-                await ctx.add_reaction(["\N{ALARM CLOCK}"], message=msg, raise_exception=False)
+                ctx.bot.outbound.delete(msg)
                 return
 
             count += 1
-            await msg.edit(
-                content=f"{message} {count}/{len(members) // 2} votes are required to skip the song."
+            # Not awaited, a burst of votes is merged into the last count
+            ctx.bot.outbound.edit(
+                msg, content=f"{message} {count}/{len(members) // 2} votes are required to skip the song."
             )
 
         if count >= len(members) // 2 and self.skip_request.get(ctx.guild.id):
-            await ctx.voice_client.skip(force=True)
+            await self.actor(ctx.guild.id).skip(ctx.voice_client, track)
             await ctx.tick()
             self.skip_request.pop(ctx.guild.id, None)
             return
 
         await ctx.tick()
 
-    @commands.command(name="toggle", aliases=["pause", "resume"])
+    @commands.hybrid_command(name="toggle", aliases=["pause", "resume"])
+    @commands.guild_only()
     @in_voice_channel(bot=True, user=True, same=True)
     async def pause_resume(self, ctx: Context) -> None:
         """Pause or Resume the Player depending on its current state."""
-
-        await ctx.voice_client.pause(not ctx.voice_client.paused)
+        ctx.voice_client.controls.toggle_pause()
         await ctx.tick()
 
-    @commands.command(aliases=["dc"])
+    @commands.hybrid_command(aliases=["dc"])
+    @commands.guild_only()
     @in_voice_channel(bot=True, user=True, same=True)
     async def disconnect(self, ctx: Context) -> None:
         """Disconnect the Player."""
-        await ctx.voice_client.disconnect()
+
+        async def disconnect() -> None:
+            if ctx.voice_client is not None:
+                await ctx.voice_client.disconnect()
+
+        await self.actor(ctx.guild.id).run(disconnect)
         await ctx.tick()
 
-    @commands.command()
+    @commands.hybrid_command(description="Set the volume of the Player, from 0 to 100. Prefix it with + or - to change it.")
+    @commands.guild_only()
     @in_voice_channel(bot=True, user=True, same=True)
     async def volume(self, ctx: Context, *, percentage: str) -> None:
         """Set the volume of the Player. The volume must be between 0 and 100. Also supports + and - for relative volume changes.
@@ -464,73 +1091,215 @@ class Music(Cog):
             await ctx.reply("Invalid volume percentage. Please provide a valid percentage.")
             return
 
+        controls = ctx.voice_client.controls
         if percentage.startswith("+"):
-            vol = ctx.voice_client.volume + int(float(percentage[1:]))
+            controls.change_volume(int(float(percentage[1:])))
         elif percentage.startswith("-"):
-            vol = ctx.voice_client.volume - int(float(percentage[1:]))
+            controls.change_volume(-int(float(percentage[1:])))
         else:
-            vol = int(float(percentage))
+            controls.set_volume(int(float(percentage)))
 
-        vol = max(0, min(vol, 100))
+        await ctx.tick()
+
+    @commands.hybrid_group(name="filter", aliases=["filters"], invoke_without_command=True, fallback="show")
+    @commands.guild_only()
+    @in_voice_channel(bot=True, user=True, same=True)
+    async def filters(self, ctx: Context) -> None:
+        """Show the filters of the Player and the presets which can be added."""
+        chain = ctx.voice_client.filter_chain
+        embed = discord.Embed(title="Filters", description=f"Active: {chain}")
+        embed.add_field(name="Presets", value=", ".join(f"`{name}`" for name in PRESETS), inline=False)
+        if chain.equalizer:
+            bands = ", ".join(f"{band + 1}: {gain:+.2f}" for band, gain in sorted(chain.equalizer.items()))
+            embed.add_field(name="Equalizer", value=bands, inline=False)
+        await ctx.reply(embed=embed)
+
+    @filters.command(name="add")
+    @in_voice_channel(bot=True, user=True, same=True)
+    async def filter_add(self, ctx: Context, *, presets: str) -> None:
+        """Add presets to the filters of the Player. Presets can be combined.
 
-        await ctx.voice_client.set_volume(vol)
+        Examples:
+        - `filter add bassboost` - Boosts the bass.
+        - `filter add nightcore 8d` - Speeds the song up and makes it go around.
+        """
+        names = tuple(name.lower() for name in presets.split())
+        unknown = [name for name in names if name not in PRESETS]
+        if not names or unknown:
+            await ctx.reply(f"Unknown preset(s): {', '.join(unknown) or 'None'}. Available: {', '.join(PRESETS)}")
+            return
+
+        ctx.voice_client.filter_chain.add(*names)
+        await ctx.tick()
+
+    @filters.command(name="remove")
+    @in_voice_channel(bot=True, user=True, same=True)
+    async def filter_remove(self, ctx: Context, *, presets: str) -> None:
+        """Remove presets from the filters of the Player."""
+        ctx.voice_client.filter_chain.remove(*(name.lower() for name in presets.split()))
         await ctx.tick()
 
-    @commands.command()
+    @filters.command(name="equalizer", aliases=["eq"], description="Set the gain of an equalizer band, from 1 (25 Hz) to 15 (16 kHz).")
+    @in_voice_channel(bot=True, user=True, same=True)
+    async def filter_equalizer(self, ctx: Context, band: int, gain: float) -> None:
+        """Set the gain of an equalizer band, from 1 (25 Hz) to 15 (16 kHz). The gain goes from -0.25 to 1, 0 resets the band.
+
+        Examples:
+        - `filter eq 1 0.3` - Boosts the lowest band.
+        - `filter eq 1 0` - Resets the lowest band.
+        """
+        if not 1 <= band <= BANDS:
+            await ctx.reply(f"The band must be between 1 and {BANDS}.")
+            return
+
+        ctx.voice_client.filter_chain.set_band(band - 1, gain)
+        await ctx.tick()
+
+    @filters.command(name="reset", aliases=["clear"])
+    @in_voice_channel(bot=True, user=True, same=True)
+    async def filter_reset(self, ctx: Context) -> None:
+        """Remove every filter of the Player."""
+        ctx.voice_client.filter_chain.reset()
+        await ctx.tick()
+
+    @commands.hybrid_command()
+    @commands.guild_only()
     @in_voice_channel(bot=True, user=True, same=True)
     async def shuffle(self, ctx: Context) -> None:
         """Shuffle the queue."""
-        ctx.voice_client.queue.shuffle()
+
+        async def shuffle() -> None:
+            if ctx.voice_client is not None:
+                ctx.voice_client.queue.shuffle()
+
+        await self.actor(ctx.guild.id).run(shuffle)
         await ctx.tick()
 
-    @commands.command(name="nowplaying", aliases=["np", "current", "currentsong"])
+    @commands.hybrid_command(name="nowplaying", aliases=["np", "current", "currentsong"])
+    @commands.guild_only()
     @in_voice_channel(bot=True, user=True, same=True)
     async def now_playing(self, ctx: Context) -> None:
         """Show the currently playing song."""
         embed = self.playing_embed(ctx.voice_client)
-        view = MusicView(timeout=60.0, ctx=ctx)
-        msg = await ctx.reply(embed=embed, view=view)
-        view.message = msg
+        msg = await ctx.reply(embed=embed, view=self.controls_layout)
 
         if embed.description == "_There is currently no song playing._":
             await msg.delete(delay=10)
         else:
             if hasattr(ctx.voice_client, "main_message"):
-                await ctx.voice_client.main_message.delete(delay=0)
+                ctx.bot.outbound.delete(ctx.voice_client.main_message)
             ctx.voice_client.main_message = msg
 
-    @commands.command(name="stop")
+    @commands.hybrid_command(name="stop")
+    @commands.guild_only()
     @in_voice_channel(bot=True, user=True, same=True)
     async def stop(self, ctx: Context) -> None:
         """Stop the Player and clear the queue."""
-        ctx.voice_client.queue.clear()
-        await ctx.voice_client.stop(force=True)
+
+        async def stop() -> None:
+            player = ctx.voice_client
+            if player is not None:
+                player.queue.reset()
+                await player.stop(force=True)
+
+        await self.actor(ctx.guild.id).run(stop)
         await ctx.tick()
 
-    @commands.command()
+    @commands.hybrid_group(invoke_without_command=True, fallback="show")
+    @commands.guild_only()
     @in_voice_channel(bot=True, user=True, same=True)
-    async def queue(self, ctx: Context) -> None:
-        """Show the current queue."""
-        queue = ctx.voice_client.queue
-        if not queue:
+    async def queue(self, ctx: Context, page: int = 1) -> None:
+        """Show the current queue, a page at a time."""
+        if not ctx.voice_client.queue:
             await ctx.reply("The queue is currently empty.")
             return
 
-        st = f"**Queue [{queue.count}]**\n\n"
-        for index, track in enumerate(queue):
-            member = ctx.guild.get_member(track.extras.requester_id)
+        view = QueueView(timeout=60.0, ctx=ctx, page=page - 1)
+        msg = await ctx.reply(embed=view.embed(), view=view)
+        view.message = msg
 
-            if track.uri:
-                st += f"{index + 1}. [{track.title}](<{track.uri}>)\n by {track.author} - Requested by {member or 'N/A'}\n"
-            else:
-                st += f"{index + 1}. {track.title} by {track.author} - Requested by {member or 'N/A'}\n"
+    @queue.command(name="fair", description="Toggle the fair mode of the queue, where requesters take turns.")
+    @in_voice_channel(bot=True, user=True, same=True)
+    @Context.dj_only()
+    async def queue_fair(self, ctx: Context) -> None:
+        """Toggle the fair mode of the queue. In fair mode, the members who requested songs take turns instead of the songs playing in the order they were requested."""
+        queue = ctx.voice_client.queue
+        queue.fair = not queue.fair
+        await ctx.reply(f"Fair mode is now **{'on' if queue.fair else 'off'}**.")
 
-            if len(st) > 1900:
-                break
+    @queue.command(name="remove", description="Remove the song at the given position from the queue.")
+    @in_voice_channel(bot=True, user=True, same=True)
+    async def queue_remove(self, ctx: Context, index: int) -> None:
+        """Remove the song at the given position from the queue. Only the requester of the song or a DJ can remove it."""
+        # Asked beforehand, it may need a REST call the actor should not wait on
+        dj = await ctx.is_dj()
+
+        async def remove() -> tuple[bool, str]:
+            # The song at the position is read and removed in one go, after the changes submitted before
+            player = ctx.voice_client
+            if player is None or not 1 <= index <= player.queue.count:
+                return False, f"There is no song at position {index} in the queue."
+
+            track = player.queue[index - 1]
+            if requester_of(track) != ctx.author.id and not dj:
+                return False, "You can only remove the songs you requested."
 
-        await ctx.reply(st)
+            del player.queue[index - 1]
+            return True, f"Removed **{track.title}** from the queue."
 
-    @commands.command()
+        removed, reply = await self.actor(ctx.guild.id).run(remove)
+        await ctx.reply(reply, delete_after=None if removed else 10)
+
+    @queue.command(name="move")
+    @in_voice_channel(bot=True, user=True, same=True)
+    @Context.dj_only()
+    async def queue_move(self, ctx: Context, source: int, destination: int) -> None:
+        """Move the song at the given position to another position in the queue.
+
+        Examples:
+        - `queue move 5 1` - Moves the fifth song to the top of the queue.
+        """
+
+        async def move() -> int | None:
+            # The amount of songs when the positions are out of range
+            player = ctx.voice_client
+            if player is None:
+                return 0
+            queue = player.queue
+            if not (1 <= source <= queue.count and 1 <= destination <= queue.count):
+                return queue.count
+            queue.move(source - 1, destination - 1)
+            return None
+
+        count = await self.actor(ctx.guild.id).run(move)
+        if count is not None:
+            await ctx.reply(f"Positions must be between 1 and {count}.", delete_after=10)
+            return
+
+        await ctx.tick()
+
+    @queue.command(name="skipto", aliases=["jump"])
+    @in_voice_channel(bot=True, user=True, same=True)
+    @Context.dj_only()
+    async def queue_skipto(self, ctx: Context, index: int) -> None:
+        """Skip to the song at the given position in the queue, the songs before it are removed."""
+
+        async def jump() -> bool:
+            # Checked once the changes submitted before are applied, a track may have ended meanwhile
+            player = ctx.voice_client
+            if player is None or not 1 <= index <= player.queue.count:
+                return False
+            await player.play(player.queue.skip_to(index - 1))
+            return True
+
+        if not await self.actor(ctx.guild.id).run(jump):
+            await ctx.reply(f"There is no song at position {index} in the queue.", delete_after=10)
+            return
+
+        await ctx.tick()
+
+    @commands.hybrid_command()
+    @commands.guild_only()
     @in_voice_channel(bot=True, user=True, same=True)
     @Context.dj_only()
     async def clear(self, ctx: Context) -> None:
@@ -538,9 +1307,65 @@ class Music(Cog):
         prompt = await ctx.prompt("Are you sure you want to clear the queue?", delete_after=True)
         if not prompt:
             return
-        ctx.voice_client.queue.clear()
 
-    @commands.command()
+        async def clear() -> None:
+            if ctx.voice_client is not None:
+                ctx.voice_client.queue.clear()
+
+        await self.actor(ctx.guild.id).run(clear)
+
+    @commands.hybrid_command(name="history")
+    @commands.guild_only()
+    async def play_history(self, ctx: Context, page: int = 1) -> None:
+        """Show the songs recently played in this server."""
+        page = max(page, 1)
+        per_page = CONFIG.queue.page_size
+        plays = await self.history.recent(ctx.guild.id, limit=per_page, offset=(page - 1) * per_page)
+        if not plays:
+            await ctx.reply("Nothing was played in this server yet." if page == 1 else f"There is no page {page}.")
+            return
+
+        lines = []
+        for play in plays:
+            played_at = discord.utils.format_dt(datetime.fromtimestamp(play.played_at, timezone.utc), "R")
+            title = f"[{play.title}](<{play.uri}>)" if play.uri else play.title
+            requester = f"<@{play.requester_id}>" if play.requester_id else "N/A"
+            lines.append(
+                f"{played_at} {title} by {play.author} - Requested by {requester}{' (skipped)' if play.skipped else ''}"
+            )
+
+        embed = discord.Embed(title="Recently played", description="\n".join(lines))
+        embed.set_footer(text=f"Page {page}")
+        await ctx.reply(embed=embed)
+
+    @commands.hybrid_command(aliases=["top"], description="Show the most played songs of the server.")
+    @commands.guild_only()
+    async def toptracks(self, ctx: Context, days: int = 0) -> None:
+        """Show the most played songs of this server, of all time or over the last given days. Skipped songs do not count.
+
+        Examples:
+        - `toptracks` - Most played songs of all time.
+        - `toptracks 7` - Most played songs of the last week.
+        """
+        days = max(0, min(days, CONFIG.history.retention_days))
+        tracks = await self.history.top(ctx.guild.id, days=days)
+        if not tracks:
+            await ctx.reply("Nothing was played in this server yet.")
+            return
+
+        lines = []
+        for index, track in enumerate(tracks, start=1):
+            title = f"[{track.title}](<{track.uri}>)" if track.uri else track.title
+            lines.append(f"{index}. {title} by {track.author} - {track.plays - track.skips} play(s)")
+
+        embed = discord.Embed(
+            title=f"Top songs of the last {days} day(s)" if days else "Top songs of all time",
+            description="\n".join(lines),
+        )
+        await ctx.reply(embed=embed)
+
+    @commands.hybrid_command()
+    @commands.guild_only()
     @in_voice_channel(bot=True, user=True, same=True)
     @Context.with_typing
     async def lyrics(self, ctx: Context) -> None:
@@ -557,6 +1382,9 @@ class Music(Cog):
             await ctx.reply("There are no lyrics available for this song.")
             return
 
+        # Imported here, jishaku is loaded in the background after the cogs
+        from jishaku.paginators import PaginatorEmbedInterface
+
         paginator = commands.Paginator(prefix="", suffix="", max_size=1900)
         for line in data["lines"]:
             paginator.add_line(line["line"])
@@ -567,7 +1395,8 @@ class Music(Cog):
         interface = PaginatorEmbedInterface(ctx.bot, paginator, owner=ctx.author, embed=embed)
         await interface.send_to(ctx)
 
-    @commands.command()
+    @commands.hybrid_command()
+    @commands.guild_only()
     @in_voice_channel(bot=True, user=True, same=True)
     async def seek(self, ctx: Context, *, seek: str) -> None:
         """Seek to a specific time in the current song. Supports + and - for relative seeking.
@@ -609,19 +1438,25 @@ class Music(Cog):
             f"Seeked to {timestamp}/{ctx.voice_client.current.length // 60000}:{(ctx.voice_client.current.length // 1000) % 60:02d}\n`{duration_bar}`"
         )
 
-    @commands.command()
+    @commands.hybrid_command()
+    @commands.guild_only()
     @in_voice_channel(bot=True, user=True, same=True)
     @Context.dj_only()
     async def loop(self, ctx: Context) -> None:
         """Loop the current song. This will toggle the loop state of the player."""
         if ctx.voice_client.queue.count:
-            prompt = await ctx.prompt(
-                "Do you want to loop the current song? Deny to loop entire Queue", delete_after=True
+            choice = await ctx.choose(
+                "What do you want to loop?",
+                [
+                    Choice("track", label="Current song"),
+                    Choice("queue", label="Entire queue"),
+                ],
+                delete_after=True,
             )
-            if not prompt:
-                ctx.voice_client.queue.mode = wavelink.QueueMode.loop_all
-            else:
+            if choice == "track":
                 ctx.voice_client.queue.mode = wavelink.QueueMode.loop
+            else:
+                ctx.voice_client.queue.mode = wavelink.QueueMode.loop_all
         else:
             ctx.voice_client.queue.mode = wavelink.QueueMode.loop
         await ctx.tick()
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Literal, TypeVar
+
+import wavelink
+
+if TYPE_CHECKING:
+    from cogs.music import Player
+
+__all__ = ("PlayerActor",)
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Operation:
+    kind: Literal["run", "enqueue", "skip"]
+    future: asyncio.Future[Any]
+    player: Player | None = None
+    func: Callable[[], Awaitable[Any]] | None = None
+    # Enqueue: the tracks and the fair queue weight of the requester, skip: the track to skip
+    tracks: list[wavelink.Playable] = field(default_factory=list)
+    weight: tuple[int, float] | None = None
+    track: wavelink.Playable | None = None
+
+
+class PlayerActor:
+    """The changes to the player and the queue of a guild, applied one after another by a single task.
+
+    Commands and Lavalink events do their slow parts, like searching and replying,
+    concurrently and only hand their changes to the actor of the guild, which
+    applies them in the order they arrived. Operations of the same kind already
+    waiting when the task comes around are applied as a batch: the tracks of
+    several ``play`` commands are queued at once and the player started once,
+    and skips of the same track skip it only once. The task ends when the mailbox
+    is empty and ``on_idle`` is called so the actor can be forgotten.
+    """
+
+    def __init__(self, guild_id: int, on_idle: Callable[[int], None]) -> None:
+        self.guild_id = guild_id
+        self.on_idle = on_idle
+
+        self.mailbox: deque[_Operation] = deque()
+        self._task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self.mailbox)
+
+    def cancel(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        for operation in self.mailbox:
+            operation.future.cancel()
+        self.mailbox.clear()
+
+    def _submit(self, operation: _Operation) -> asyncio.Future[Any]:
+        self.mailbox.append(operation)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._drain())
+        return operation.future
+
+    def _operation(self, kind: Literal["run", "enqueue", "skip"], **kwargs: Any) -> _Operation:
+        return _Operation(kind, asyncio.get_running_loop().create_future(), **kwargs)
+
+    async def run(self, func: Callable[[], Awaitable[T]]) -> T:
+        """Call ``func`` once the operations submitted before it are applied."""
+        return await self._submit(self._operation("run", func=func))
+
+    async def enqueue(
+        self, player: Player, tracks: list[wavelink.Playable], *, weight: tuple[int, float] | None = None
+    ) -> int:
+        """Queue the tracks and start playing if the player is idle, the amount of tracks queued.
+
+        ``weight`` is the (requester, weight) of the fair queue, applied with the tracks.
+        """
+        return await self._submit(self._operation("enqueue", player=player, tracks=tracks, weight=weight))
+
+    async def skip(self, player: Player, track: wavelink.Playable | None) -> bool:
+        """Skip ``track``, False if it is not playing anymore by then."""
+        return await self._submit(self._operation("skip", player=player, track=track))
+
+    async def _drain(self) -> None:
+        try:
+            while self.mailbox:
+                operation = self.mailbox.popleft()
+                if operation.kind == "run":
+                    await self._apply_run(operation)
+                    continue
+
+                batch = [operation]
+                while (
+                    self.mailbox
+                    and self.mailbox[0].kind == operation.kind
+                    and self.mailbox[0].player is operation.player
+                ):
+                    batch.append(self.mailbox.popleft())
+
+                if operation.kind == "enqueue":
+                    await self._apply_enqueue(batch)
+                else:
+                    await self._apply_skip(batch)
+        finally:
+            if not self.mailbox:
+                self.on_idle(self.guild_id)
+
+    @staticmethod
+    def _settle(operation: _Operation, result: Any = None, exception: BaseException | None = None) -> None:
+        if operation.future.done():
+            # The caller is gone, its command was cancelled
+            return
+        if exception is not None:
+            operation.future.set_exception(exception)
+        else:
+            operation.future.set_result(result)
+
+    async def _apply_run(self, operation: _Operation) -> None:
+        assert operation.func is not None
+        try:
+            result = await operation.func()
+        except Exception as e:
+            self._settle(operation, exception=e)
+        else:
+            self._settle(operation, result)
+
+    async def _apply_enqueue(self, batch: list[_Operation]) -> None:
+        player = batch[0].player
+        assert player is not None
+
+        added: list[int] = []
+        for operation in batch:
+            if operation.weight is not None:
+                requester, weight = operation.weight
+                if weight != 1.0:
+                    player.queue.weights[requester] = weight
+                else:
+                    player.queue.weights.pop(requester, None)
+            try:
+                added.append(await player.queue.put_wait(operation.tracks))
+            except Exception as e:
+                added.append(0)
+                self._settle(operation, exception=e)
+
+        # Started once for the whole batch, every command used to see the player idle and start it
+        try:
+            if player.connected and not player.playing and player.queue:
+                await player.play(player.queue.get())
+        except Exception as e:
+            for operation in batch:
+                self._settle(operation, exception=e)
+            return
+
+        for operation, count in zip(batch, added):
+            self._settle(operation, count)
+
+    async def _apply_skip(self, batch: list[_Operation]) -> None:
+        player = batch[0].player
+        assert player is not None
+
+        for operation in batch:
+            track = operation.track
+            # Ended meanwhile, or already skipped and its end not received yet
+            if track is None or track is not player.current or track is player.skipped:
+                self._settle(operation, False)
+                continue
+
+            try:
+                await player.skip(force=True)
+            except Exception as e:
+                self._settle(operation, exception=e)
+            else:
+                player.skipped = track
+                self._settle(operation, True)
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING, Any
+
+import wavelink
+
+from utils import CONFIG
+
+if TYPE_CHECKING:
+    from cogs.music import Music, Player
+
+__all__ = ("PlayerControls",)
+
+
+class PlayerControls:
+    """The state a player is asked to be in, applied once per tick.
+
+    Controls only record their target: the final volume, the final paused state,
+    whether the filters changed and whether to skip, stop or disconnect. Once per
+    ``controls.tick`` seconds, the difference with the current state of the player
+    is sent to Lavalink in a single request and the now playing message is edited
+    once, so clicking a button ten times costs as much as clicking it once.
+    """
+
+    def __init__(self, player: Player) -> None:
+        self.player = player
+
+        self.volume: int | None = None
+        self.paused: bool | None = None
+        self.filters = False
+        # Skipping applies to the track playing when it was asked for, not to the next one
+        self.skipping: wavelink.Playable | None = None
+        self.stopping = False
+        self.disconnecting = False
+
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def pending(self) -> bool:
+        return (
+            self.volume is not None
+            or self.paused is not None
+            or self.filters
+            or self.skipping is not None
+            or self.stopping
+            or self.disconnecting
+        )
+
+    @property
+    def target_volume(self) -> int:
+        return self.player.volume if self.volume is None else self.volume
+
+    @property
+    def target_paused(self) -> bool:
+        return self.player.paused if self.paused is None else self.paused
+
+    def set_volume(self, volume: int) -> None:
+        self.volume = max(0, min(volume, 100))
+        self._schedule()
+
+    def change_volume(self, delta: int) -> None:
+        self.set_volume(self.target_volume + delta)
+
+    def set_paused(self, paused: bool) -> None:
+        self.paused = paused
+        self._schedule()
+
+    def toggle_pause(self) -> None:
+        self.set_paused(not self.target_paused)
+
+    def refresh_filters(self) -> None:
+        self.filters = True
+        self._schedule()
+
+    def skip(self) -> None:
+        if self.player.current is not None:
+            self.skipping = self.player.current
+            self._schedule()
+
+    def stop(self) -> None:
+        self.stopping = True
+        self._schedule()
+
+    def disconnect(self) -> None:
+        self.disconnecting = True
+        self._schedule()
+
+    def _schedule(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def cancel(self) -> None:
+        # Disconnecting destroys the player from within the task, it must not cancel itself
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
+
+    async def _run(self) -> None:
+        try:
+            while self.pending:
+                await asyncio.sleep(CONFIG.controls.tick)
+                # Applied in order with the commands and the track ends of the guild
+                music: Music | None = self.player.client.get_cog("Music")  # type: ignore
+                if music is not None and self.player.guild is not None:
+                    await music.actor(self.player.guild.id).run(self.flush)
+                else:
+                    await self.flush()
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
+
+    async def flush(self) -> None:
+        player = self.player
+        volume, paused, filters = self.volume, self.paused, self.filters
+        skipping, stopping, disconnecting = self.skipping, self.stopping, self.disconnecting
+        self.volume = self.paused = self.skipping = None
+        self.filters = self.stopping = self.disconnecting = False
+
+        if not player.connected or player.guild is None:
+            return
+
+        if disconnecting:
+            await player.disconnect()
+            return
+
+        data: dict[str, Any] = {}
+        if volume is not None and volume != player.volume:
+            data["volume"] = volume
+        if paused is not None and paused != player.paused:
+            data["paused"] = paused
+        if filters:
+            data["filters"] = player.filter_chain.request()
+
+        # A track skipped by a command already is not skipped again
+        ending = stopping or (skipping is not None and skipping is player.current and skipping is not player.skipped)
+        if stopping:
+            player.queue.reset()
+        if ending and player.current is not None:
+            player.queue._loaded = None
+            player.skipped = player.current
+            data["track"] = {"encoded": None}
+
+        if data:
+            await player.node._update_player(player.guild.id, data=data, replace="track" in data)
+            player._volume = data.get("volume", player.volume)
+            player._paused = data.get("paused", player.paused)
+
+        if filters:
+            player.filter_chain.applied(data["filters"])
+            await player.filter_chain.save()
+
+        # The message goes away with the track when it ends
+        if ("volume" in data or "paused" in data) and not ending:
+            await self.refresh_message()
+
+    async def refresh_message(self) -> None:
+        player = self.player
+        music: Music | None = player.client.get_cog("Music")  # type: ignore
+        message = getattr(player, "main_message", None)
+        if music is None or message is None or player.current is None:
+            return
+
+        # Every change of volume or pause edits the message, only the last of a burst is sent
+        player.client.outbound.edit(message, embed=music.playing_embed(player))  # type: ignore
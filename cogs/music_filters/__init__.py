@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import copy
+import json
+from collections import defaultdict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any
+
+import wavelink
+
+from utils.metrics import SQLITE_QUERY
+
+if TYPE_CHECKING:
+    from cogs.music import Player
+    from core import Bot
+
+__all__ = ("BANDS", "PRESETS", "FilterChain", "build_payload")
+
+# Lavalink has 15 equalizer bands, from 25 Hz to 16 kHz, and clamps their gain to this range
+BANDS = 15
+MIN_GAIN, MAX_GAIN = -0.25, 1.0
+
+# Filter payloads as Lavalink takes them, see https://lavalink.dev/api/rest#filters
+PRESETS: dict[str, dict[str, Any]] = {
+    "bassboost": {
+        "equalizer": [
+            {"band": 0, "gain": 0.25},
+            {"band": 1, "gain": 0.2},
+            {"band": 2, "gain": 0.15},
+            {"band": 3, "gain": 0.05},
+        ],
+    },
+    "treble": {
+        "equalizer": [
+            {"band": 11, "gain": 0.1},
+            {"band": 12, "gain": 0.15},
+            {"band": 13, "gain": 0.2},
+            {"band": 14, "gain": 0.25},
+        ],
+    },
+    "nightcore": {"timescale": {"speed": 1.2, "pitch": 1.2}},
+    "vaporwave": {"timescale": {"speed": 0.85, "pitch": 0.85}},
+    "karaoke": {"karaoke": {"level": 1.0, "monoLevel": 1.0, "filterBand": 220.0, "filterWidth": 100.0}},
+    "8d": {"rotation": {"rotationHz": 0.2}},
+    "soft": {"lowPass": {"smoothing": 20.0}},
+    "tremolo": {"tremolo": {"frequency": 4.0, "depth": 0.5}},
+    "vibrato": {"vibrato": {"frequency": 4.0, "depth": 0.5}},
+}
+
+SELECT_FILTERS = r"""SELECT FILTERS FROM GUILD_FILTERS WHERE GUILD_ID = ?"""
+UPSERT_FILTERS = r"""INSERT INTO GUILD_FILTERS (GUILD_ID, FILTERS) VALUES (?, ?)
+    ON CONFLICT (GUILD_ID) DO UPDATE SET FILTERS = excluded.FILTERS"""
+DELETE_FILTERS = r"""DELETE FROM GUILD_FILTERS WHERE GUILD_ID = ?"""
+
+
+@lru_cache(maxsize=512)
+def build_payload(presets: tuple[str, ...]) -> dict[str, Any]:
+    """The filter payload of a combination of presets, which must not be modified.
+
+    Equalizer gains add up, timescales multiply and any other filter of a later
+    preset overrides the one of an earlier preset.
+    """
+    gains: defaultdict[int, float] = defaultdict(float)
+    payload: dict[str, Any] = {}
+
+    for name in presets:
+        for key, value in PRESETS[name].items():
+            if key == "equalizer":
+                for band in value:
+                    gains[band["band"]] += band["gain"]
+            elif key == "timescale":
+                current = payload.get("timescale", {})
+                payload["timescale"] = {
+                    option: current.get(option, 1.0) * value.get(option, 1.0) for option in ("speed", "pitch", "rate")
+                }
+            else:
+                payload[key] = {**payload.get(key, {}), **value}
+
+    if gains:
+        payload["equalizer"] = _bands(gains)
+    return payload
+
+
+def _bands(gains: dict[int, float]) -> list[dict[str, Any]]:
+    # Every band is given, wavelink drops an equalizer with fewer of them when it reads the filters back
+    return [{"band": band, "gain": max(MIN_GAIN, min(gains.get(band, 0.0), MAX_GAIN))} for band in range(BANDS)]
+
+
+class FilterChain:
+    """The presets and equalizer of a player.
+
+    Every change only marks the filters as changed on the player controls, which
+    send them with the rest of the state of the player once per tick. They are
+    saved for the guild at the same time and applied again when the bot next
+    joins a channel there.
+    """
+
+    def __init__(self, player: Player) -> None:
+        self.player = player
+        # Kept in the order of PRESETS, so every combination is built and cached once
+        self.presets: tuple[str, ...] = ()
+        self.equalizer: dict[int, float] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.presets or self.equalizer)
+
+    def __str__(self) -> str:
+        names = list(self.presets)
+        if self.equalizer:
+            names.append("equalizer")
+        return ", ".join(names) or "None"
+
+    def add(self, *presets: str) -> None:
+        wanted = set(self.presets) | set(presets)
+        self.presets = tuple(name for name in PRESETS if name in wanted)
+        self.changed()
+
+    def remove(self, *presets: str) -> None:
+        self.presets = tuple(name for name in self.presets if name not in presets)
+        self.changed()
+
+    def set_band(self, band: int, gain: float) -> None:
+        gain = max(MIN_GAIN, min(gain, MAX_GAIN))
+        if gain:
+            self.equalizer[band] = gain
+        else:
+            self.equalizer.pop(band, None)
+        self.changed()
+
+    def reset(self) -> None:
+        self.presets = ()
+        self.equalizer.clear()
+        self.changed()
+
+    def payload(self) -> dict[str, Any]:
+        payload = build_payload(self.presets)
+        if self.equalizer:
+            gains = {band["band"]: band["gain"] for band in payload.get("equalizer", ())}
+            gains.update(self.equalizer)
+            payload = {**payload, "equalizer": _bands(gains)}
+        return payload
+
+    def changed(self) -> None:
+        self.player.controls.refresh_filters()
+
+    def request(self) -> dict[str, Any]:
+        """The filters to send to Lavalink."""
+        payload = dict(self.payload())
+        # The volume filter belongs to the transitions between tracks, it is kept as it is
+        if self.player.filters.volume is not None:
+            payload["volume"] = self.player.filters.volume
+        return payload
+
+    def applied(self, payload: dict[str, Any]) -> None:
+        # The filters of the player can be changed in place, they must not share the cached payload
+        self.player._filters = wavelink.Filters(data=copy.deepcopy(payload))  # type: ignore
+
+    def dump(self) -> str:
+        return json.dumps({"presets": list(self.presets), "equalizer": self.equalizer})
+
+    async def save(self) -> None:
+        bot: Bot = self.player.client  # type: ignore
+        if self.player.guild is None:
+            return
+
+        with SQLITE_QUERY.labels("update").time():
+            if self:
+                await bot.sql.execute(UPSERT_FILTERS, (self.player.guild.id, self.dump()))
+            else:
+                await bot.sql.execute(DELETE_FILTERS, (self.player.guild.id,))
+        bot.need_commit = True
+
+    async def load(self) -> None:
+        """Apply the filters saved for the guild, if any."""
+        bot: Bot = self.player.client  # type: ignore
+        if self.player.guild is None:
+            return
+
+        with SQLITE_QUERY.labels("select").time():
+            async with bot.sql.execute(SELECT_FILTERS, (self.player.guild.id,)) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            return
+
+        data = json.loads(row[0])
+        self.presets = tuple(name for name in PRESETS if name in data.get("presets", ()))
+        self.equalizer = {int(band): gain for band, gain in data.get("equalizer", {}).items()}
+        if self:
+            self.changed()
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import wavelink
+from discord.ext import tasks
+
+from utils import CONFIG
+from utils.metrics import SQLITE_QUERY
+
+if TYPE_CHECKING:
+    from core import Bot
+
+INSERT_TRACK = r"""INSERT OR IGNORE INTO TRACKS (SOURCE, IDENTIFIER, TITLE, AUTHOR, URI, LENGTH, ENCODED) VALUES (?, ?, ?, ?, ?, ?, ?)"""
+INSERT_PLAY = r"""INSERT INTO PLAYS (GUILD_ID, TRACK_ID, REQUESTER_ID, PLAYED_AT, PLAYED_MS, SKIPPED)
+    VALUES (?, (SELECT ID FROM TRACKS WHERE SOURCE = ? AND IDENTIFIER = ?), ?, ?, ?, ?)"""
+
+SELECT_RECENT = r"""SELECT PLAYS.PLAYED_AT, TRACKS.TITLE, TRACKS.AUTHOR, TRACKS.URI, PLAYS.REQUESTER_ID, PLAYS.PLAYED_MS, PLAYS.SKIPPED
+    FROM PLAYS JOIN TRACKS ON TRACKS.ID = PLAYS.TRACK_ID
+    WHERE PLAYS.GUILD_ID = ? ORDER BY PLAYS.PLAYED_AT DESC LIMIT ? OFFSET ?"""
+# Recent plays are still in PLAYS, older ones were rolled up into TRACK_STATS
+SELECT_TOP = r"""SELECT TRACKS.TITLE, TRACKS.AUTHOR, TRACKS.URI, TRACKS.ENCODED, SUM(COUNTS.PLAYS), SUM(COUNTS.SKIPS)
+    FROM (
+        SELECT TRACK_ID, COUNT(*) AS PLAYS, SUM(SKIPPED) AS SKIPS FROM PLAYS WHERE GUILD_ID = ? AND PLAYED_AT >= ? GROUP BY TRACK_ID
+        UNION ALL
+        SELECT TRACK_ID, PLAYS, SKIPS FROM TRACK_STATS WHERE GUILD_ID = ? AND ? = 0
+    ) AS COUNTS JOIN TRACKS ON TRACKS.ID = COUNTS.TRACK_ID
+    GROUP BY COUNTS.TRACK_ID ORDER BY SUM(COUNTS.PLAYS) - SUM(COUNTS.SKIPS) DESC, SUM(COUNTS.PLAYS) DESC LIMIT ?"""
+
+ROLLUP_PLAYS = r"""INSERT INTO TRACK_STATS (GUILD_ID, TRACK_ID, PLAYS, SKIPS, PLAYED_MS)
+    SELECT GUILD_ID, TRACK_ID, COUNT(*), SUM(SKIPPED), SUM(PLAYED_MS) FROM PLAYS WHERE PLAYED_AT < ? GROUP BY GUILD_ID, TRACK_ID
+    ON CONFLICT (GUILD_ID, TRACK_ID) DO UPDATE SET
+        PLAYS = PLAYS + excluded.PLAYS, SKIPS = SKIPS + excluded.SKIPS, PLAYED_MS = PLAYED_MS + excluded.PLAYED_MS"""
+DELETE_PLAYS = r"""DELETE FROM PLAYS WHERE PLAYED_AT < ?"""
+DELETE_STATS = r"""DELETE FROM TRACK_STATS WHERE ROWID IN (
+    SELECT ROWID FROM (
+        SELECT ROWID, ROW_NUMBER() OVER (PARTITION BY GUILD_ID ORDER BY PLAYS - SKIPS DESC, PLAYS DESC) AS POSITION FROM TRACK_STATS
+    ) WHERE POSITION > ?
+)"""
+DELETE_TRACKS = r"""DELETE FROM TRACKS
+    WHERE NOT EXISTS (SELECT 1 FROM PLAYS WHERE PLAYS.TRACK_ID = TRACKS.ID)
+    AND NOT EXISTS (SELECT 1 FROM TRACK_STATS WHERE TRACK_STATS.TRACK_ID = TRACKS.ID)"""
+
+
+@dataclass
+class Play:
+    played_at: int
+    title: str
+    author: str
+    uri: str | None
+    requester_id: int | None
+    played_ms: int
+    skipped: bool
+
+
+@dataclass
+class TopTrack:
+    title: str
+    author: str
+    uri: str | None
+    encoded: str
+    plays: int
+    skips: int
+
+
+class PlayHistory:
+    """Records what every guild played, without a database write per track.
+
+    Plays are buffered and written in batches, every ``flush_interval`` seconds or
+    as soon as ``batch_size`` plays are pending. Every hour, the plays older than
+    the retention period are rolled up into per track totals and deleted, and only
+    the ``max_tracks_per_guild`` best totals of a guild are kept, so the size of the
+    database does not grow with the age of the bot.
+    """
+
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+
+        # (source, identifier) -> row of TRACKS, deduplicated until the next flush
+        self._tracks: dict[tuple[str, str], tuple] = {}
+        self._plays: list[tuple] = []
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._plays)
+
+    def start(self) -> None:
+        self.flusher.change_interval(seconds=CONFIG.history.flush_interval)
+        self.flusher.start()
+        self.rollup.start()
+
+    async def stop(self) -> None:
+        self.flusher.cancel()
+        self.rollup.cancel()
+        await self.flush()
+
+    def record(
+        self,
+        guild_id: int,
+        track: wavelink.Playable,
+        *,
+        requester_id: int | None,
+        played_ms: int,
+        skipped: bool,
+    ) -> None:
+        key = (track.source, track.identifier)
+        if key not in self._tracks:
+            self._tracks[key] = (*key, track.title, track.author, track.uri, track.length, track.encoded)
+
+        self._plays.append((guild_id, *key, requester_id, int(time.time()), played_ms, skipped))
+
+        if len(self._plays) >= CONFIG.history.batch_size and not self._lock.locked():
+            asyncio.create_task(self.flush())
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._plays:
+                return
+
+            tracks, plays = list(self._tracks.values()), self._plays
+            self._tracks, self._plays = {}, []
+
+            with SQLITE_QUERY.labels("insert").time():
+                await self.bot.sql.executemany(INSERT_TRACK, tracks)
+                await self.bot.sql.executemany(INSERT_PLAY, plays)
+            self.bot.need_commit = True
+
+    @tasks.loop(seconds=30)
+    async def flusher(self) -> None:
+        await self.flush()
+
+    @tasks.loop(hours=1)
+    async def rollup(self) -> None:
+        await self.flush()
+
+        before = int(time.time() - CONFIG.history.retention_days * 86400)
+        async with self._lock:
+            with SQLITE_QUERY.labels("rollup").time():
+                await self.bot.sql.execute(ROLLUP_PLAYS, (before,))
+                await self.bot.sql.execute(DELETE_PLAYS, (before,))
+                await self.bot.sql.execute(DELETE_STATS, (CONFIG.history.max_tracks_per_guild,))
+                await self.bot.sql.execute(DELETE_TRACKS)
+            self.bot.need_commit = True
+
+    async def recent(self, guild_id: int, *, limit: int = 10, offset: int = 0) -> list[Play]:
+        await self.flush()
+
+        with SQLITE_QUERY.labels("select").time():
+            async with self.bot.sql.execute(SELECT_RECENT, (guild_id, limit, offset)) as cursor:
+                rows = await cursor.fetchall()
+        return [Play(*row[:6], bool(row[6])) for row in rows]
+
+    async def top(self, guild_id: int, *, days: int = 0, limit: int = 10) -> list[TopTrack]:
+        """The most played tracks of the guild, skips excluded, over the last ``days`` days or all time if 0."""
+        await self.flush()
+
+        since = int(time.time() - days * 86400) if days else 0
+        with SQLITE_QUERY.labels("select").time():
+            async with self.bot.sql.execute(SELECT_TOP, (guild_id, since, guild_id, days, limit)) as cursor:
+                rows = await cursor.fetchall()
+        return [TopTrack(*row) for row in rows]
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+from collections.abc import Awaitable, Callable
+from typing import Literal
+
+Reason = Literal["idle", "alone"]
+Key = tuple[int, Reason]
+
+
+class IdleReaper:
+    """Disconnects idle players from a single task, whatever the amount of players.
+
+    Every (guild, reason) has a deadline. Deadlines live in a heap with at most one
+    entry per key: pushing a deadline back only updates a dict, the heap entry is
+    moved when it comes up. Idle guilds therefore cost a dict entry and a heap
+    entry, and the task only wakes up when the earliest deadline is due.
+    """
+
+    def __init__(self, callback: Callable[[int, Reason], Awaitable[None]]) -> None:
+        self.callback = callback
+
+        self._deadlines: dict[Key, float] = {}
+        # Deadline of the heap entry of every key, always <= the actual deadline
+        self._entries: dict[Key, float] = {}
+        self._heap: list[tuple[float, int, Reason]] = []
+
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+    def schedule(self, guild_id: int, reason: Reason, delay: float) -> None:
+        """Call back in ``delay`` seconds unless cancelled or rescheduled in the meantime."""
+        key = (guild_id, reason)
+        deadline = asyncio.get_running_loop().time() + delay
+        self._deadlines[key] = deadline
+
+        entry = self._entries.get(key)
+        if entry is not None and entry <= deadline:
+            return
+
+        # A stale entry may remain in the heap, it is skipped since it does not match `_entries`
+        self._entries[key] = deadline
+        heapq.heappush(self._heap, (deadline, guild_id, reason))
+        if self._heap[0][0] == deadline:
+            self._wakeup.set()
+
+    def cancel(self, guild_id: int, reason: Reason | None = None) -> None:
+        reasons: tuple[Reason, ...] = (reason,) if reason is not None else ("idle", "alone")
+        for each in reasons:
+            self._deadlines.pop((guild_id, each), None)
+
+    def scheduled(self, guild_id: int, reason: Reason) -> bool:
+        return (guild_id, reason) in self._deadlines
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+
+            timeout = self._heap[0][0] - loop.time() if self._heap else None
+            if timeout is None or timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            when, guild_id, reason = heapq.heappop(self._heap)
+            key = (guild_id, reason)
+            if self._entries.get(key) != when:
+                continue
+            del self._entries[key]
+
+            deadline = self._deadlines.get(key)
+            if deadline is None:
+                # Cancelled
+                continue
+
+            if deadline > loop.time():
+                self._entries[key] = deadline
+                heapq.heappush(self._heap, (deadline, guild_id, reason))
+                continue
+
+            del self._deadlines[key]
+            asyncio.create_task(self.callback(guild_id, reason))
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import random
+from collections import Counter, defaultdict
+
+import wavelink
+
+from .compact import CompactTrack, TrackList
+from .indexed import IndexedList
+
+__all__ = ("CompactTrack", "IndexedList", "TrackList", "TrackQueue", "requester_of")
+
+
+def requester_of(track: wavelink.Playable) -> int | None:
+    return getattr(track.extras, "requester_id", None)
+
+
+class TrackQueue(wavelink.Queue):
+    """A wavelink queue backed by a :class:`TrackList`.
+
+    Wavelink only ever reaches the tracks through ``_items`` with list methods,
+    so swapping the list keeps every queue mode working while indexing, slicing,
+    removing and moving tracks no longer walk the whole queue. Tracks are stored
+    compact and only inflated back to a ``Playable`` when they are read, the
+    history is a compact queue as well.
+
+    In fair mode, every requester has a virtual sub-queue: their n-th pending
+    track is ranked in round n, or n / weight for weighted requesters, counted from
+    the round being played. Tracks are inserted after everything ranked in the same
+    round or earlier, so the queue always reads as the round robin of the
+    sub-queues and the next track is still the first one.
+    """
+
+    def __init__(self, *, history: bool = True, fair: bool = False) -> None:
+        super().__init__(history=False)
+        self._items: TrackList = TrackList()  # type: ignore
+        self._history: TrackQueue | None = TrackQueue(history=False) if history else None
+        self._fair = False
+
+        self.weights: dict[int | None, float] = {}
+        # The round being played, and the round of the last track queued by every requester
+        self._round = 0.0
+        self._rounds: dict[int | None, float] = {}
+
+        self.fair = fair
+
+    @property
+    def fair(self) -> bool:
+        return self._fair
+
+    @fair.setter
+    def fair(self, value: bool) -> None:
+        if value and not self._fair:
+            self._interleave()
+        self._fair = value
+
+    def _interleave(self) -> None:
+        """Rank the tracks already queued as if they were queued in fair mode, keeping the order of each requester."""
+        self._rounds.clear()
+        ranked = []
+        for index, (record, _) in enumerate(self._items.ranked()):
+            ranked.append((self._next_round(record.requester), index, record))
+        ranked.sort(key=lambda item: item[:2])
+        self._items.rebuild((record, rank) for rank, _, record in ranked)
+
+    def _next_round(self, requester: int | None) -> float:
+        start = self._rounds.get(requester, self._round) if self.requesters[requester] else self._round
+        self._rounds[requester] = rank = max(start, self._round) + 1 / self.weights.get(requester, 1.0)
+        return rank
+
+    @property
+    def history(self) -> TrackQueue | None:
+        return self._history
+
+    @property
+    def requesters(self) -> Counter[int | None]:
+        """The amount of queued tracks of every requester."""
+        return self._items.counts  # type: ignore
+
+    def get(self) -> wavelink.Playable:
+        if self.mode is wavelink.QueueMode.loop_all and not self._items and self.history:
+            # Done here rather than by wavelink, the next round starts ranked after the last one
+            self._items.rebuild((record, self._round) for record, _ in self.history._items.ranked())
+            self.history.clear()
+
+        if self._items and not (self.mode is wavelink.QueueMode.loop and self._loaded):
+            self._round = self._items.rank(0)
+        return super().get()
+
+    def put(self, item: list[wavelink.Playable] | wavelink.Playable | wavelink.Playlist, /, *, atomic: bool = True) -> int:
+        if not self._fair:
+            return super().put(item, atomic=atomic)
+
+        tracks = [item] if isinstance(item, wavelink.Playable) else list(item)
+        if atomic:
+            self._check_atomic(tracks)
+        else:
+            tracks = [track for track in tracks if isinstance(track, wavelink.Playable)]
+
+        for track in tracks:
+            requester = requester_of(track)
+            self._items.insort(track, self._next_round(requester))
+
+        self._wakeup_next()
+        return len(tracks)
+
+    async def put_wait(
+        self, item: list[wavelink.Playable] | wavelink.Playable | wavelink.Playlist, /, *, atomic: bool = True
+    ) -> int:
+        if not self._fair:
+            return await super().put_wait(item, atomic=atomic)
+
+        async with self._lock:
+            return self.put(item, atomic=atomic)
+
+    def page(self, page: int, per_page: int) -> list[wavelink.Playable]:
+        return self._items[page * per_page : (page + 1) * per_page]
+
+    def move(self, source: int, destination: int, /) -> None:
+        self._items.move(source, destination)
+
+    def skip_to(self, index: int, /) -> wavelink.Playable:
+        """Drop the tracks before ``index`` and return the track at ``index``, whatever the queue mode."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("TrackQueue index out of range")
+
+        skipped = self._items.slice(slice(0, index))
+        del self._items[:index]
+
+        # Looping the whole queue keeps the skipped tracks for the next round
+        if self.mode is wavelink.QueueMode.loop_all and self.history is not None:
+            self.history._items.extend(skipped)
+
+        self._round = self._items.rank(0)
+        track = self._items.pop(0)
+        self._loaded = track
+        return track
+
+    def record(self, index: int, /) -> CompactTrack:
+        """The compact track at ``index``, the same object for as long as it stays queued.
+
+        Reading a track inflates a new ``Playable`` every time, the record is what
+        identifies a queued track across changes of the queue.
+        """
+        return self._items.slice(slice(index, index + 1))[0]
+
+    def position(self, record: CompactTrack, /) -> int | None:
+        """The index the track of the record is queued at now, None if it is not queued anymore."""
+        return next((index for index, (queued, _) in enumerate(self._items.ranked()) if queued is record), None)
+
+    def shuffle(self) -> None:
+        if not self._fair:
+            self._items.shuffle()
+            return
+
+        # Shuffle every sub-queue on its own, the turns of the requesters stay where they are
+        items = list(self._items.ranked())
+        positions: defaultdict[int | None, list[int]] = defaultdict(list)
+        for index, (record, _) in enumerate(items):
+            positions[record.requester].append(index)
+
+        for indexes in positions.values():
+            records = [items[index][0] for index in indexes]
+            random.shuffle(records)
+            for index, record in zip(indexes, records):
+                items[index] = (record, items[index][1])
+
+        self._items.rebuild(items)
+
+    def clear(self) -> None:
+        super().clear()
+        self._rounds.clear()
+
+    def copy(self) -> TrackQueue:
+        copy_queue = TrackQueue(history=self.history is not None)
+        copy_queue._items = self._items.copy()
+        copy_queue._fair = self._fair
+        copy_queue._round = self._round
+        copy_queue._rounds = self._rounds.copy()
+        copy_queue.weights = self.weights.copy()
+        return copy_queue
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import base64
+import struct
+import sys
+from collections.abc import Iterable, Iterator
+from operator import attrgetter
+from typing import Any, overload
+
+import wavelink
+
+from .indexed import IndexedList
+
+__all__ = ("CompactTrack", "TrackList", "decode_track")
+
+
+def _read_utf(data: bytes, offset: int) -> tuple[str, int]:
+    (size,) = struct.unpack_from(">H", data, offset)
+    offset += 2
+    # Java writes modified UTF-8: characters outside of the BMP are written as two surrogates
+    value = data[offset : offset + size].decode("utf-8", "surrogatepass")
+    value = value.encode("utf-16", "surrogatepass").decode("utf-16")
+    return value, offset + size
+
+
+def _read_nullable_utf(data: bytes, offset: int) -> tuple[str | None, int]:
+    present = data[offset]
+    offset += 1
+    if not present:
+        return None, offset
+    return _read_utf(data, offset)
+
+
+def decode_track(encoded: str) -> dict[str, Any]:
+    """Decode the track info out of a track encoded by Lavaplayer, message versions 1 to 3."""
+    data = base64.b64decode(encoded)
+    (header,) = struct.unpack_from(">I", data, 0)
+    size, flags = header & 0x3FFFFFFF, header >> 30
+
+    offset, version = 4, 1
+    # The first flag tells the message is versioned
+    if flags & 1:
+        version = data[offset]
+        offset += 1
+
+    title, offset = _read_utf(data, offset)
+    author, offset = _read_utf(data, offset)
+    (length,) = struct.unpack_from(">q", data, offset)
+    identifier, offset = _read_utf(data, offset + 8)
+    is_stream = bool(data[offset])
+    offset += 1
+
+    uri = artwork = isrc = None
+    if version >= 2:
+        uri, offset = _read_nullable_utf(data, offset)
+    if version >= 3:
+        artwork, offset = _read_nullable_utf(data, offset)
+        isrc, offset = _read_nullable_utf(data, offset)
+    source, offset = _read_utf(data, offset)
+
+    # Source specific fields may follow, the position always ends the message
+    (position,) = struct.unpack_from(">q", data, len(data) - 8)
+
+    return {
+        "identifier": identifier,
+        "isSeekable": not is_stream,
+        "author": author,
+        "length": length,
+        "isStream": is_stream,
+        "position": position,
+        "title": title,
+        "uri": uri,
+        "artworkUrl": artwork,
+        "isrc": isrc,
+        "sourceName": source,
+    }
+
+
+class CompactTrack:
+    """A queued track, a fraction of the size of a :class:`wavelink.Playable`.
+
+    The encoded track is all Lavalink needs, everything else the queue shows is
+    kept next to it and the remaining info is decoded back from it when the track
+    is inflated. Plugin info, playlist and extras other than the requester are
+    rare and only kept when present.
+    """
+
+    __slots__ = ("encoded", "title", "author", "length", "requester", "extra")
+
+    def __init__(
+        self,
+        encoded: str,
+        title: str,
+        author: str,
+        length: int,
+        requester: int | None,
+        extra: tuple[dict[str, Any], wavelink.PlaylistInfo | None, dict[str, Any]] | None = None,
+    ) -> None:
+        self.encoded = encoded
+        self.title = title
+        self.author = author
+        self.length = length
+        self.requester = requester
+        self.extra = extra
+
+    def __repr__(self) -> str:
+        return f"<CompactTrack title={self.title!r} requester={self.requester}>"
+
+    @classmethod
+    def pack(cls, track: wavelink.Playable | CompactTrack) -> CompactTrack:
+        if isinstance(track, CompactTrack):
+            return track
+
+        # Whole playlists go through here, the attributes are read directly rather than through properties
+        extras: dict[str, Any] = track._extras.__dict__
+        requester = extras.get("requester_id")
+        plugin: dict[str, Any] = track._raw_data.get("pluginInfo") or {}
+
+        extra = None
+        if plugin or track._playlist is not None or track._recommended or len(extras) > (requester is not None):
+            extras = {key: value for key, value in extras.items() if key != "requester_id"}
+            extras["_recommended"] = track._recommended
+            extra = (plugin, track._playlist, extras)
+
+        return cls(
+            track._encoded,
+            sys.intern(track._title),
+            sys.intern(track._author),
+            track._length,
+            requester,
+            extra,
+        )
+
+    def inflate(self) -> wavelink.Playable:
+        try:
+            info = decode_track(self.encoded)
+        except (ValueError, struct.error, IndexError):
+            # Lavalink only needs the encoded track to play it
+            info = {
+                "identifier": "",
+                "isSeekable": True,
+                "author": self.author,
+                "length": self.length,
+                "isStream": False,
+                "position": 0,
+                "title": self.title,
+                "uri": None,
+                "artworkUrl": None,
+                "isrc": None,
+                "sourceName": "unknown",
+            }
+        info["title"], info["author"], info["length"] = self.title, self.author, self.length
+
+        plugin, playlist, extras = self.extra or ({}, None, {})
+        extras = dict(extras)
+        recommended = extras.pop("_recommended", False)
+        if self.requester is not None:
+            extras["requester_id"] = self.requester
+
+        track = wavelink.Playable(
+            {"encoded": self.encoded, "info": info, "pluginInfo": plugin, "userData": extras},  # type: ignore
+            playlist=playlist,
+        )
+        track._recommended = recommended
+        return track
+
+
+def _pack(track: wavelink.Playable | CompactTrack) -> CompactTrack:
+    return CompactTrack.pack(track)
+
+
+class TrackList(IndexedList[CompactTrack]):
+    """An :class:`IndexedList` of compact tracks which reads and writes :class:`wavelink.Playable`.
+
+    Tracks are packed when they are added and inflated when they are read, only
+    :meth:`ranked`, :meth:`rebuild` and :meth:`slice` work on the compact tracks.
+    """
+
+    def __init__(self, values: Iterable[wavelink.Playable | CompactTrack] = ()) -> None:
+        super().__init__(values, key=attrgetter("requester"))  # type: ignore
+
+    def __iter__(self) -> Iterator[wavelink.Playable]:  # type: ignore[override]
+        return (record.inflate() for record in super().__iter__())
+
+    def __reversed__(self) -> Iterator[wavelink.Playable]:  # type: ignore[override]
+        return (record.inflate() for record in super().__reversed__())
+
+    def __contains__(self, value: object) -> bool:
+        return isinstance(value, wavelink.Playable) and any(
+            record.encoded == value.encoded for record in super().__iter__()
+        )
+
+    @overload
+    def __getitem__(self, index: int) -> wavelink.Playable: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[wavelink.Playable]: ...
+
+    def __getitem__(self, index: int | slice) -> wavelink.Playable | list[wavelink.Playable]:  # type: ignore[override]
+        if isinstance(index, slice):
+            return [record.inflate() for record in self.slice(index)]
+        return super().__getitem__(index).inflate()
+
+    def __setitem__(self, index: int, value: wavelink.Playable) -> None:  # type: ignore[override]
+        super().__setitem__(index, _pack(value))
+
+    def index(self, value: Any, start: int = 0, stop: int | None = None) -> int:
+        encoded = value.encoded if isinstance(value, (wavelink.Playable, CompactTrack)) else None
+        for index, record in enumerate(super().__iter__()):
+            if index >= start and (stop is None or index < stop) and record.encoded == encoded:
+                return index
+        raise ValueError(f"{value!r} is not in the list")
+
+    def insert(self, index: int, value: wavelink.Playable) -> None:  # type: ignore[override]
+        super().insert(index, _pack(value))
+
+    def insort(self, value: wavelink.Playable, rank: float) -> int:  # type: ignore[override]
+        return super().insort(_pack(value), rank)
+
+    def append(self, value: wavelink.Playable) -> None:  # type: ignore[override]
+        super().append(_pack(value))
+
+    def extend(self, values: Iterable[wavelink.Playable | CompactTrack]) -> None:  # type: ignore[override]
+        super().extend(_pack(value) for value in values)
+
+    def rebuild(self, items: Iterable[tuple[wavelink.Playable | CompactTrack, float]]) -> None:  # type: ignore[override]
+        super().rebuild((_pack(value), rank) for value, rank in items)
+
+    def pop(self, index: int = -1) -> wavelink.Playable:  # type: ignore[override]
+        return super().pop(index).inflate()
+
+    def copy(self) -> TrackList:
+        copy = TrackList()
+        copy.rebuild(self.ranked())
+        return copy
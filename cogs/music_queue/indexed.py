@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import random
+from collections import Counter
+from collections.abc import Callable, Hashable, Iterable, Iterator, MutableSequence
+from typing import Any, Generic, TypeVar, overload
+
+T = TypeVar("T")
+
+
+class _Node(Generic[T]):
+    __slots__ = ("value", "rank", "priority", "size", "left", "right")
+
+    def __init__(self, value: T, rank: float = 0.0) -> None:
+        self.value = value
+        self.rank = rank
+        self.priority = random.random()
+        self.size = 1
+        self.left: _Node[T] | None = None
+        self.right: _Node[T] | None = None
+
+
+def _size(node: _Node | None) -> int:
+    return node.size if node is not None else 0
+
+
+def _update(node: _Node) -> None:
+    node.size = 1 + _size(node.left) + _size(node.right)
+
+
+def _split(node: _Node[T] | None, index: int) -> tuple[_Node[T] | None, _Node[T] | None]:
+    """Split in the first ``index`` items and the rest."""
+    if node is None:
+        return None, None
+
+    if _size(node.left) >= index:
+        left, node.left = _split(node.left, index)
+        _update(node)
+        return left, node
+
+    node.right, right = _split(node.right, index - _size(node.left) - 1)
+    _update(node)
+    return node, right
+
+
+def _split_rank(node: _Node[T] | None, rank: float) -> tuple[_Node[T] | None, _Node[T] | None]:
+    """Split in the items ranked ``rank`` or lower and the rest, ranks must not decrease along the list."""
+    if node is None:
+        return None, None
+
+    if node.rank <= rank:
+        node.right, right = _split_rank(node.right, rank)
+        _update(node)
+        return node, right
+
+    left, node.left = _split_rank(node.left, rank)
+    _update(node)
+    return left, node
+
+
+def _merge(left: _Node[T] | None, right: _Node[T] | None) -> _Node[T] | None:
+    if left is None:
+        return right
+    if right is None:
+        return left
+
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+def _build(items: Iterable[tuple[T, float]]) -> _Node[T] | None:
+    """Build a treap from (value, rank) pairs in linear time, with the right spine kept on a stack."""
+    spine: list[_Node[T]] = []
+    for value, rank in items:
+        node = _Node(value, rank)
+        last = None
+        while spine and spine[-1].priority < node.priority:
+            last = spine.pop()
+            _update(last)
+        node.left = last
+        if spine:
+            spine[-1].right = node
+        spine.append(node)
+
+    for node in reversed(spine):
+        _update(node)
+    return spine[0] if spine else None
+
+
+def _walk(node: _Node[T] | None) -> Iterator[_Node[T]]:
+    stack: list[_Node[T]] = []
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        yield node
+        node = node.right
+
+
+class IndexedList(MutableSequence[T]):
+    """A list with O(log n) indexing, insertion, deletion and slicing.
+
+    Items are stored in an implicit treap: every node knows the size of its subtree,
+    which is enough to find the n-th item, split the list at any index and join two
+    lists back together. Moving a range of items is a couple of splits and merges.
+
+    When a ``key`` is given, the number of items per key is kept in :attr:`counts`.
+
+    Every item also has a rank, which never decreases along the list: items keep
+    the rank they were given by :meth:`insort`, any other insertion takes the rank
+    of its neighbour. :meth:`insort` can therefore find where an item goes in
+    O(log n), whatever the items were moved, removed or shuffled in between.
+    """
+
+    def __init__(self, values: Iterable[T] = (), *, key: Callable[[T], Hashable] | None = None) -> None:
+        self.key = key
+        self.counts: Counter[Hashable] = Counter()
+        self._root: _Node[T] | None = None
+        self.extend(values)
+
+    def _count(self, values: Iterable[T], sign: int) -> None:
+        if self.key is None:
+            return
+
+        for value in values:
+            key = self.key(value)
+            self.counts[key] += sign
+            if self.counts[key] <= 0:
+                del self.counts[key]
+
+    def _index(self, index: int) -> int:
+        size = _size(self._root)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("IndexedList index out of range")
+        return index
+
+    def _node(self, index: int) -> _Node[T]:
+        node = self._root
+        while node is not None:
+            left = _size(node.left)
+            if index < left:
+                node = node.left
+            elif index == left:
+                return node
+            else:
+                index -= left + 1
+                node = node.right
+        raise IndexError("IndexedList index out of range")
+
+    def _neighbour_rank(self, index: int) -> float:
+        """The rank an item inserted at ``index`` takes."""
+        if self._root is None:
+            return 0.0
+        return self._node(index - 1 if index > 0 else 0).rank
+
+    def _cut(self, start: int, stop: int) -> tuple[_Node[T] | None, _Node[T] | None, _Node[T] | None]:
+        left, rest = _split(self._root, start)
+        middle, right = _split(rest, stop - start)
+        return left, middle, right
+
+    def __len__(self) -> int:
+        return _size(self._root)
+
+    def __iter__(self) -> Iterator[T]:
+        return (node.value for node in _walk(self._root))
+
+    def __reversed__(self) -> Iterator[T]:
+        for index in range(len(self) - 1, -1, -1):
+            yield self._node(index).value
+
+    def __repr__(self) -> str:
+        return f"IndexedList({list(self)!r})"
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (IndexedList, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    @overload
+    def __getitem__(self, index: int) -> T: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[T]: ...
+
+    def __getitem__(self, index: int | slice) -> T | list[T]:
+        if isinstance(index, slice):
+            return self.slice(index)
+        return self._node(self._index(index)).value
+
+    def slice(self, index: slice) -> list[T]:
+        start, stop, step = index.indices(len(self))
+        if step != 1:
+            return [node.value for node in _walk(self._root)][index]
+        if start >= stop:
+            return []
+
+        left, middle, right = self._cut(start, stop)
+        try:
+            return [node.value for node in _walk(middle)]
+        finally:
+            self._root = _merge(_merge(left, middle), right)
+
+    def __setitem__(self, index: int, value: T) -> None:  # type: ignore[override]
+        node = self._node(self._index(index))
+        self._count((node.value,), -1)
+        self._count((value,), 1)
+        node.value = value
+
+    def __delitem__(self, index: int | slice) -> None:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                values = list(self)
+                del values[index]
+                self.clear()
+                self.extend(values)
+                return
+            if start >= stop:
+                return
+
+            left, middle, right = self._cut(start, stop)
+            self._count((node.value for node in _walk(middle)), -1)
+            self._root = _merge(left, right)
+            return
+
+        self.pop(index)
+
+    def insert(self, index: int, value: T) -> None:
+        size = len(self)
+        if index < 0:
+            index = max(0, index + size)
+        index = min(index, size)
+
+        node = _Node(value, self._neighbour_rank(index))
+        left, right = _split(self._root, index)
+        self._root = _merge(_merge(left, node), right)
+        self._count((value,), 1)
+
+    def insort(self, value: T, rank: float) -> int:
+        """Insert ``value`` after every item ranked ``rank`` or lower, returns its index."""
+        left, right = _split_rank(self._root, rank)
+        index = _size(left)
+        self._root = _merge(_merge(left, _Node(value, rank)), right)
+        self._count((value,), 1)
+        return index
+
+    def append(self, value: T) -> None:
+        self._root = _merge(self._root, _Node(value, self._neighbour_rank(len(self))))
+        self._count((value,), 1)
+
+    def extend(self, values: Iterable[T]) -> None:
+        values = list(values)
+        if not values:
+            return
+        rank = self._neighbour_rank(len(self))
+        self._root = _merge(self._root, _build((value, rank) for value in values))
+        self._count(values, 1)
+
+    def rank(self, index: int) -> float:
+        return self._node(self._index(index)).rank
+
+    def ranked(self) -> Iterator[tuple[T, float]]:
+        return ((node.value, node.rank) for node in _walk(self._root))
+
+    def rebuild(self, items: Iterable[tuple[T, float]]) -> None:
+        """Replace the items with (value, rank) pairs, ranks must not decrease."""
+        items = list(items)
+        self.clear()
+        self._root = _build(items)
+        self._count((value for value, _ in items), 1)
+
+    def pop(self, index: int = -1) -> T:
+        index = self._index(index)
+        left, middle, right = self._cut(index, index + 1)
+        assert middle is not None
+
+        self._root = _merge(left, right)
+        self._count((middle.value,), -1)
+        return middle.value
+
+    def move(self, source: int, destination: int) -> None:
+        """Move the item at ``source`` so it ends up at ``destination``."""
+        source, destination = self._index(source), self._index(destination)
+        left, middle, right = self._cut(source, source + 1)
+        rest = _merge(left, right)
+
+        left, right = _split(rest, destination)
+        assert middle is not None
+        # Ranks must not decrease, the item takes the rank of its new neighbour
+        if left is not None:
+            node = left
+            while node.right is not None:
+                node = node.right
+            middle.rank = node.rank
+        elif right is not None:
+            node = right
+            while node.left is not None:
+                node = node.left
+            middle.rank = node.rank
+        self._root = _merge(_merge(left, middle), right)
+
+    def clear(self) -> None:
+        self._root = None
+        self.counts.clear()
+
+    def copy(self) -> IndexedList[T]:
+        copy = IndexedList(key=self.key)
+        copy.rebuild(self.ranked())
+        return copy
+
+    def shuffle(self) -> None:
+        # Values are shuffled, ranks stay where they are
+        items = list(self.ranked())
+        values = [value for value, _ in items]
+        random.shuffle(values)
+        self._root = _build((value, rank) for value, (_, rank) in zip(values, items))
+
+    def remove(self, value: Any) -> None:
+        # An item can be anywhere, finding it is linear like for a list
+        del self[self.index(value)]
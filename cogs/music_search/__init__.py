@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from collections.abc import Iterable
+
+import wavelink
+from discord import app_commands
+
+__all__ = ("SearchCache",)
+
+# Discord limits the name and the value of a choice to 100 characters, and a response to 25 choices
+CHOICE_LENGTH = 100
+MAX_CHOICES = 25
+TRACKS_PER_QUERY = 5
+
+
+class SearchCache:
+    """The last searches and the tracks they found, which the autocomplete of ``play`` suggests from.
+
+    Autocomplete runs on every keystroke, so suggestions come from the searches
+    members already made rather than from Lavalink, the least recently used
+    queries are forgotten past ``capacity``.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        # query -> [(name, value)] of its first tracks
+        self._entries: OrderedDict[str, list[tuple[str, str]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def put(self, query: str, tracks: Iterable[wavelink.Playable]) -> None:
+        choices: list[tuple[str, str]] = []
+        for track in tracks:
+            name = f"{track.title} - {track.author}"
+            if len(name) > CHOICE_LENGTH:
+                name = f"{name[: CHOICE_LENGTH - 1]}\N{HORIZONTAL ELLIPSIS}"
+            # The value is searched again once chosen, a URI finds the exact track
+            value = track.uri if track.uri and len(track.uri) <= CHOICE_LENGTH else name
+            choices.append((name, value))
+            if len(choices) >= TRACKS_PER_QUERY:
+                break
+
+        if not choices:
+            return
+
+        key = query.strip().lower()
+        self._entries[key] = choices
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def suggest(self, current: str) -> list[app_commands.Choice[str]]:
+        current = current.strip().lower()
+        seen: set[str] = set()
+        choices: list[app_commands.Choice[str]] = []
+
+        for query in reversed(self._entries):
+            for name, value in self._entries[query]:
+                if value in seen or (current not in query and current not in name.lower()):
+                    continue
+                seen.add(value)
+                choices.append(app_commands.Choice(name=name, value=value))
+                if len(choices) >= MAX_CHOICES:
+                    return choices
+
+        return choices
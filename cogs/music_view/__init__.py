@@ -4,92 +4,145 @@ from typing import TYPE_CHECKING
 
 import discord
 
+from core.context import is_dj
+
 if TYPE_CHECKING:
     from cogs.music import Music, Player
-    from core import Context
+    from core import Bot, Context
+
+VOLUME_STEP = 10
 
 
 class MusicView(discord.ui.View):
-    message: discord.Message | None
+    """The controls under the now playing message, a single persistent view for every guild.
 
-    def __init__(self, timeout: float, ctx: Context):
-        super().__init__(timeout=timeout)
-        self.ctx = ctx
-        self.music_cog: Music = ctx.bot.get_cog("Music")  # type: ignore
+    It is registered once when the music cog loads and every button has a stable
+    custom id, so clicks are routed to the player of the guild they come from,
+    including clicks on messages sent before the bot restarted. Messages are sent
+    with :attr:`Music.controls_layout`, a stopped copy of the view which only
+    gives the components, so sending one does not store a view per message.
+    """
 
-    def disable_all(self) -> None:
-        for child in self.children:
-            if isinstance(child, discord.ui.Button) and not child.disabled:
-                child.disabled = True
+    def __init__(self, bot: Bot) -> None:
+        super().__init__(timeout=None)
+        self.bot = bot
 
-    async def on_timeout(self) -> None:
-        if self.message:
-            await self.message.edit(view=self)
+    @staticmethod
+    def player(interaction: discord.Interaction) -> Player | None:
+        return interaction.guild.voice_client if interaction.guild else None  # type: ignore
 
     async def interaction_check(self, interaction: discord.Interaction[discord.Client]) -> bool:
-        if interaction.user.id == self.ctx.author.id:
-            return True
-        await interaction.response.send_message(
-            "You are not allowed to interact with this view", ephemeral=True
-        )
-        return False
+        player = self.player(interaction)
+        if player is None or player.channel is None:
+            await interaction.response.send_message("Nothing is playing", ephemeral=True)
+            return False
+
+        voice = interaction.user.voice if isinstance(interaction.user, discord.Member) else None
+        if voice is None or voice.channel != player.channel:
+            await interaction.response.send_message("You must be in same voice channel of Bot's", ephemeral=True)
+            return False
+        return True
+
+    async def is_dj(self, interaction: discord.Interaction) -> bool:
+        return await is_dj(self.bot, interaction.user, self.player(interaction))  # type: ignore
+
+    # Buttons only acknowledge the click, the player controls apply the final state once per tick
+    # and edit the now playing message, however many times a button was clicked in between
 
     @discord.ui.button(
         style=discord.ButtonStyle.primary,
         emoji="\N{BLACK RIGHT-POINTING TRIANGLE WITH DOUBLE VERTICAL BAR}",
+        custom_id="music:pause",
     )
-    async def play(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
-        await interaction.response.defer(thinking=True, ephemeral=True)
-        player: Player = self.ctx.voice_client
-        await player.pause(not player.paused)
-
-        await interaction.followup.send(
-            f"Music {'paused' if player.paused else 'resumed'}", ephemeral=True
-        )
+    async def pause(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        await interaction.response.defer()
+        self.player(interaction).controls.toggle_pause()  # type: ignore
 
-    @discord.ui.button(style=discord.ButtonStyle.danger, emoji="\N{BLACK SQUARE FOR STOP}")
-    async def stop(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
-        await interaction.response.defer(thinking=True, ephemeral=True)
-        player: Player = self.ctx.voice_client
-        if await self.ctx.is_dj():
-            player.queue.clear()
-            await player.stop()
-        else:
-            await interaction.followup.send("You are not a DJ", ephemeral=True)
+    @discord.ui.button(style=discord.ButtonStyle.danger, emoji="\N{BLACK SQUARE FOR STOP}", custom_id="music:stop")
+    async def stop_player(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        if not await self.is_dj(interaction):
+            await interaction.response.send_message("You are not a DJ", ephemeral=True)
+            return
 
-        await interaction.followup.send("Music stopped", ephemeral=True)
+        await interaction.response.defer()
+        self.player(interaction).controls.stop()  # type: ignore
 
     @discord.ui.button(
         style=discord.ButtonStyle.secondary,
         emoji="\N{BLACK RIGHT-POINTING DOUBLE TRIANGLE}",
+        custom_id="music:skip",
     )
     async def skip(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
-        await interaction.response.defer(ephemeral=True)
-        await self.music_cog.skip(self.ctx)
+        if not await self.is_dj(interaction):
+            # Votes need the reactions of the channel, they are started with the command
+            await interaction.response.send_message("You are not a DJ, use the skip command to vote", ephemeral=True)
+            return
 
-    @discord.ui.button(style=discord.ButtonStyle.danger, emoji="\N{WAVING HAND SIGN}")
+        await interaction.response.defer()
+        self.player(interaction).controls.skip()  # type: ignore
+
+    @discord.ui.button(style=discord.ButtonStyle.danger, emoji="\N{WAVING HAND SIGN}", custom_id="music:disconnect")
     async def disconnect(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
-        # TODO
-        await interaction.response.edit_message(view=self)
+        await interaction.response.defer()
+        self.player(interaction).controls.disconnect()  # type: ignore
 
     @discord.ui.button(
         label="Volume",
         style=discord.ButtonStyle.secondary,
         emoji="\N{UPWARDS BLACK ARROW}",
         row=1,
+        custom_id="music:volume_up",
     )
     async def volume_up(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
-        # TODO
-        await interaction.response.edit_message(view=self)
+        await interaction.response.defer()
+        self.player(interaction).controls.change_volume(VOLUME_STEP)  # type: ignore
 
     @discord.ui.button(
         label="Volume",
         style=discord.ButtonStyle.secondary,
         emoji="\N{DOWNWARDS BLACK ARROW}",
         row=1,
+        custom_id="music:volume_down",
     )
     async def volume_down(
         self, interaction: discord.Interaction, button: discord.ui.Button
     ) -> None:
-        # TODO
-        await interaction.response.edit_message(view=self)
+        await interaction.response.defer()
+        self.player(interaction).controls.change_volume(-VOLUME_STEP)  # type: ignore
+
+
+class QueueView(discord.ui.View):
+    message: discord.Message | None
+
+    def __init__(self, timeout: float, ctx: Context, *, page: int = 0):
+        super().__init__(timeout=timeout)
+        self.ctx = ctx
+        self.page = page
+        self.music_cog: Music = ctx.bot.get_cog("Music")  # type: ignore
+
+    def embed(self) -> discord.Embed:
+        embed, self.page = self.music_cog.queue_embed(self.ctx.voice_client, self.page)
+        return embed
+
+    async def on_timeout(self) -> None:
+        self.clear_items()
+        if self.message:
+            await self.message.edit(view=self)
+
+    async def interaction_check(self, interaction: discord.Interaction[discord.Client]) -> bool:
+        if interaction.user.id == self.ctx.author.id:
+            return True
+        await interaction.response.send_message(
+            "You are not allowed to interact with this view", ephemeral=True
+        )
+        return False
+
+    @discord.ui.button(style=discord.ButtonStyle.secondary, emoji="\N{BLACK LEFT-POINTING TRIANGLE}")
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        self.page -= 1
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    @discord.ui.button(style=discord.ButtonStyle.secondary, emoji="\N{BLACK RIGHT-POINTING TRIANGLE}")
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button) -> None:
+        self.page += 1
+        await interaction.response.edit_message(embed=self.embed(), view=self)
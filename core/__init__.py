@@ -1,3 +1,5 @@
 from .bot import Bot  # noqa: F401
 from .cog import Cog  # noqa: F401
 from .context import Context  # noqa: F401
+from .outbound import Outbound, Priority  # noqa: F401
+from .prompts import Choice, Prompts  # noqa: F401
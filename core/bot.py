@@ -1,72 +1,221 @@
 from __future__ import annotations
 
-import logging
-import logging.handlers
+import asyncio
+import importlib
 import os
 import re
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import Any
 
 import aiosqlite
 import discord
-import jishaku  # noqa: F401
 from discord.ext import commands, tasks
 
-from utils import CONFIG, Cache
+from utils import (
+    CONFIG,
+    Cache,
+    IPCClient,
+    LogPipeline,
+    LoopWatchdog,
+    MemoryTracker,
+    MetricsServer,
+    SamplingProfiler,
+    TraceRecorder,
+)
+from utils.metrics import COMMAND_LATENCY, SQLITE_COMMIT
 
 from .context import Context
 from .help import HelpCommand
+from .intents import build_intents, build_member_cache_flags
+from .outbound import Outbound
+from .prompts import Prompts
+from .shards import ShardMonitor
+from .sync import sync_commands
+from .tree import CommandTree
 
 os.environ["JISHAKU_HIDE"] = "True"
 os.environ["JISHAKU_NO_UNDERSCORE"] = "True"
 os.environ["JISHAKU_NO_DM_TRACEBACK"] = "True"
 os.environ["JISHAKU_FORCE_PAGINATOR"] = "True"
 
-file_handler = logging.handlers.RotatingFileHandler(filename=r"logs/bot.log", mode="w")
-file_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
-discord.utils.setup_logging(handler=file_handler, level=logging.INFO, root=True)
 
-
-class Bot(commands.Bot):
+class Bot(commands.AutoShardedBot):
     color = 0x2F3136
     sql: aiosqlite.Connection
     need_commit: bool = False
+    ipc: IPCClient | None = None
+    metrics: MetricsServer | None = None
+    watchdog: LoopWatchdog | None = None
+    config_watcher: asyncio.Task[None] | None = None
+    # Guilds which only use application commands
+    slash_only: set[int]
 
     def __init__(self, *, version: tuple[int, int, int], **kwargs):
+        # Startup phases and how long they took, in seconds
+        self.boot_started = time.perf_counter()
+        self.boot_phases: dict[str, float] = {}
+        self._booted = False
+
+        self.logs = LogPipeline(**asdict(CONFIG.logging))
+        self.logs.start()
+
+        # Replies, edits and reactions in channels, see `Context.send` and `Context.tick`
+        self.outbound = Outbound()
+        # Button prompts, see `Context.prompt`
+        self.prompts = Prompts(self)
+
+        sharding = CONFIG.sharding
+        if sharding.enabled:
+            # `shard_count=None` lets discord decide the recommended amount of shards
+            kwargs.setdefault("shard_count", sharding.shard_count)
+            kwargs.setdefault("shard_ids", sharding.shard_ids)
+        else:
+            kwargs.setdefault("shard_count", 1)
+            kwargs.setdefault("shard_ids", [0])
+
+        intents = build_intents(CONFIG.intents.profile)
+
         super().__init__(
             command_prefix=self.get_prefix,  # type: ignore
             case_insensitive=True,
-            intents=discord.Intents.all(),
+            intents=intents,
+            member_cache_flags=build_member_cache_flags(CONFIG.intents.member_cache, intents),
+            chunk_guilds_at_startup=intents.members,
             help_command=HelpCommand(),
+            tree_cls=CommandTree,
             **kwargs,
         )
         self.version: tuple[int, int, int] = version
+        self.shard_monitor = ShardMonitor(self)
+        self.profiler = SamplingProfiler()
+        self.tracer = TraceRecorder(self)
 
-        self._BotBase__cogs = commands.core._CaseInsensitiveDict()
+        # Members fetched over REST, the member cache only holds members in voice channels
+        self._fetched_members: OrderedDict[tuple[int, int], discord.Member | None] = OrderedDict()
 
-    async def setup_hook(self) -> None:
-        self.sql = await aiosqlite.connect(CONFIG.database_file)
-        self.cache = Cache(self)
-        await self.sql.executescript(CONFIG.datbase_schema)
+        self.memory = MemoryTracker()
+        self.memory.register("fetched_members", lambda: self._fetched_members, guild=lambda key, _: key[0])
+        self.memory.register("views", self._views, guild=lambda _, view: self._view_guild(view))
 
-        await self.load_extension("jishaku")
-        print("[COG] `jishaku` loaded")
+        self._BotBase__cogs = commands.core._CaseInsensitiveDict()
 
-        for cog in CONFIG.cogs:
-            try:
-                await self.load_extension(cog)
-                print(f"[COG] `{cog}` loaded")
-            except Exception as e:
-                print(f"[COG] `{cog}` failed to load: {e}")
+    @contextmanager
+    def boot_phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.boot_phases[name] = time.perf_counter() - start
+
+    async def setup_hook(self) -> None:
+        # Nothing else needs jishaku, it is imported while everything else starts
+        self._jishaku = asyncio.create_task(self.load_jishaku())
+
+        with self.boot_phase("database"):
+            self.sql = await aiosqlite.connect(CONFIG.database_file)
+            self.cache = Cache(self)
+            self.memory.register(
+                "settings_cache",
+                lambda: self.cache.cache,
+                guild=lambda key, _: key[1] if key[0].startswith("GUILDS.") else None,
+            )
+            await self.sql.executescript(CONFIG.datbase_schema)
+
+            async with self.sql.execute(r"""SELECT GUILD_ID FROM SLASH_ONLY_GUILDS""") as cursor:
+                self.slash_only = {guild_id for (guild_id,) in await cursor.fetchall()}
+
+        if CONFIG.cluster_id is not None:
+            with self.boot_phase("ipc"):
+                # Several processes share the database file, WAL lets readers run alongside the writer
+                await self.sql.execute("PRAGMA journal_mode=WAL")
+
+                self.ipc = IPCClient(self, path=CONFIG.cluster.ipc_path, cluster_id=CONFIG.cluster_id)
+                await self.ipc.connect()
+                print(f"[IPC] Cluster {CONFIG.cluster_id} connected to {CONFIG.cluster.ipc_path}")
+
+        with self.boot_phase("cogs"):
+            # Cogs do not depend on each other, the ones waiting on I/O to load do not hold up the others
+            await asyncio.gather(*(self.load_cog(cog) for cog in CONFIG.cogs))
+
+        # Clusters share the command tree, only the first one uploads it
+        if CONFIG.app_commands.sync and not CONFIG.cluster_id:
+            with self.boot_phase("sync"):
+                try:
+                    await sync_commands(self)
+                except discord.HTTPException as e:
+                    print(f"[SYNC] Failed syncing the command tree: {e}")
 
         self.global_commit.start()
+        self.sample_shards.start()
+        self.check_memory.start()
+
+        if CONFIG.reload_config.enabled:
+            CONFIG.subscribe("cogs", self.on_cogs_changed)
+            self.config_watcher = asyncio.create_task(CONFIG.watch(CONFIG.reload_config.interval))
+
+        if CONFIG.watchdog.enabled:
+            self.watchdog = LoopWatchdog(
+                interval=CONFIG.watchdog.interval_ms / 1000,
+                budget=CONFIG.watchdog.budget_ms / 1000,
+            )
+            self.watchdog.start()
+
+        if CONFIG.metrics.enabled:
+            self.metrics = MetricsServer(host=CONFIG.metrics.host, port=CONFIG.metrics.port)
+            await self.metrics.start()
+            print(f"[BOT] Metrics available on http://{CONFIG.metrics.host}:{CONFIG.metrics.port}/metrics")
+
+        phases = ", ".join(f"{name} {elapsed * 1000:.0f}ms" for name, elapsed in self.boot_phases.items())
+        print(f"[BOOT] Set up in {(time.perf_counter() - self.boot_started) * 1000:.0f}ms ({phases})")
+
+    async def load_cog(self, cog: str) -> None:
+        start = time.perf_counter()
+        try:
+            await self.load_extension(cog)
+        except Exception as e:
+            print(f"[COG] `{cog}` failed to load: {e}")
+        else:
+            print(f"[COG] `{cog}` loaded in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    async def on_cogs_changed(self, old: list[str], new: list[str]) -> None:
+        for cog in old:
+            if cog not in new:
+                try:
+                    await self.unload_extension(cog)
+                    print(f"[COG] `{cog}` unloaded")
+                except commands.ExtensionError as e:
+                    print(f"[COG] `{cog}` failed to unload: {e}")
+
+        await asyncio.gather(*(self.load_cog(cog) for cog in new if cog not in old))
+
+    async def load_jishaku(self) -> None:
+        # Importing jishaku takes longer than the rest of the startup, it is done off the event loop
+        await asyncio.to_thread(importlib.import_module, "jishaku")
+        await self.load_cog("jishaku")
 
     async def on_ready(self) -> None:
         print(f"[BOT] {self.user} is ready")
 
+        if not self._booted:
+            self._booted = True
+            print(f"[BOOT] Ready in {(time.perf_counter() - self.boot_started) * 1000:.0f}ms")
+
+    async def on_shard_ready(self, shard_id: int) -> None:
+        print(f"[BOT] Shard {shard_id} is ready")
+
     @staticmethod
     def _check_permissions(channel: discord.abc.MessageableChannel, **kwargs) -> bool:
         permssions = discord.Permissions(**kwargs)
         return channel.permissions_for(channel.guild.me).is_superset(permssions)  # type: ignore
 
+    async def get_context(self, origin: discord.Message | discord.Interaction, /, *, cls=Context) -> Context:
+        # Application commands of hybrid commands build their context here as well
+        return await super().get_context(origin, cls=cls)
+
     async def process_commands(self, message: discord.Message) -> None:
         ctx = await self.get_context(message, cls=Context)
 
@@ -81,16 +230,44 @@ class Bot(commands.Bot):
 
         await self.invoke(ctx)
 
+    async def invoke(self, ctx: commands.Context) -> None:
+        if ctx.command is None:
+            return await super().invoke(ctx)
+
+        with self.instrument(ctx.command.qualified_name):
+            await super().invoke(ctx)
+
+    @contextmanager
+    def instrument(self, command: str) -> Iterator[None]:
+        """Time the command and label the samples of the profiler taken while it runs."""
+        task = asyncio.current_task() if self.profiler.running else None
+        if task is not None:
+            self.profiler.label(task, command)
+
+        try:
+            with COMMAND_LATENCY.labels(command).time():
+                yield
+        finally:
+            if task is not None:
+                self.profiler.unlabel(task)
+
     async def on_message(self, message: discord.Message) -> None:
         if message.author.bot:
             return
 
+        # Not even the prefix is looked up, these guilds only use application commands
+        if message.guild is not None and message.guild.id in self.slash_only:
+            return
+
         if re.fullmatch(rf"<@!?{self.user.id}>", message.content):  # type: ignore
             await message.channel.send(f"Prefixes: `{'`, `'.join(await self.get_prefix(message))}`")
             return
 
         await self.process_commands(message)
 
+    async def on_interaction(self, interaction: discord.Interaction) -> None:
+        await self.prompts.dispatch(interaction)
+
     async def on_message_edit(self, before: discord.Message, after: discord.Message) -> None:
         if before.content == after.content:
             return
@@ -112,6 +289,31 @@ class Bot(commands.Bot):
 
         return commands.when_mentioned_or(prefix)(self, message)
 
+    async def get_or_fetch_member(self, guild: discord.Guild, member_id: int) -> discord.Member | None:
+        member = guild.get_member(member_id)
+        if member is not None:
+            return member
+
+        key = (guild.id, member_id)
+        try:
+            self._fetched_members.move_to_end(key)
+            return self._fetched_members[key]
+        except KeyError:
+            pass
+
+        try:
+            member = await guild.fetch_member(member_id)
+        except discord.NotFound:
+            member = None
+        except discord.HTTPException:
+            return None
+
+        self._fetched_members[key] = member
+        if len(self._fetched_members) > 2048:
+            self._fetched_members.popitem(last=False)
+
+        return member
+
     async def on_guild_join(self, guild: discord.Guild) -> None:
         query = r"""INSERT INTO GUILDS (ID) VALUES (?)"""
 
@@ -120,9 +322,75 @@ class Bot(commands.Bot):
     @tasks.loop(seconds=1)
     async def global_commit(self) -> None:
         if self.need_commit:
-            await self.sql.commit()
+            with SQLITE_COMMIT.time():
+                await self.sql.commit()
             self.need_commit = False
 
+    @tasks.loop(seconds=15)
+    async def sample_shards(self) -> None:
+        self.shard_monitor.sample()
+
+        if self.ipc is not None:
+            await self.ipc.push_stats(
+                {
+                    "guilds": len(self.guilds),
+                    "players": len(self.voice_clients),
+                    "shards": [asdict(stats) for stats in self.shard_monitor.stats()],
+                }
+            )
+
+    @tasks.loop(minutes=5)
+    async def check_memory(self) -> None:
+        leaked = self.memory.check()
+        if leaked:
+            kinds = ", ".join(sorted({suspect.kind for suspect in leaked}))
+            print(f"[MEMORY] {len(leaked)} object(s) ({kinds}) still reachable after their player disconnected")
+
+    def _views(self) -> list[discord.ui.View]:
+        store = self._connection._view_store
+        views = {item.view for items in store._views.values() for item in items.values() if item.view is not None}
+        views.update(store._synced_message_views.values())
+        return list(views)  # type: ignore
+
+    @staticmethod
+    def _view_guild(view: discord.ui.View) -> int | None:
+        ctx = getattr(view, "ctx", None)
+        return ctx.guild.id if ctx is not None and ctx.guild is not None else None
+
+    async def on_ipc_cache_set(self, entries: list[tuple[str, int, Any]]) -> None:
+        self.cache.apply(entries)
+
+    async def on_ipc_slash_only(self, data: tuple[int, bool]) -> None:
+        guild_id, enabled = data
+        if enabled:
+            self.slash_only.add(guild_id)
+        else:
+            self.slash_only.discard(guild_id)
+
+    async def close(self) -> None:
+        if self.config_watcher is not None:
+            self.config_watcher.cancel()
+            CONFIG.unsubscribe("cogs", self.on_cogs_changed)
+
+        if self.tracer.recording:
+            self.tracer.stop()
+
+        self.prompts.stop()
+
+        if self.ipc is not None:
+            await self.ipc.close()
+
+        if self.watchdog is not None:
+            self.watchdog.stop()
+
+        if self.metrics is not None:
+            await self.metrics.close()
+
+        await super().close()
+
+        # Joins the thread writing the logs, which waits on the disk
+        await asyncio.to_thread(self.logs.stop)
+
     async def on_command_error(self, context: Context, exception: commands.CommandError) -> None:
         exception = getattr(exception, "original", exception)
 
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
 from functools import wraps
-from typing import TYPE_CHECKING, Callable
+from typing import TYPE_CHECKING, Any, Callable
 
 import discord
 from discord.ext import commands
 
+from .outbound import Priority
+from .prompts import Choice
+
 if TYPE_CHECKING:
     from bot import Bot
     from cog import Cog
@@ -13,6 +16,31 @@ if TYPE_CHECKING:
     from cogs.music import Player
 
 
+async def is_dj(bot: Bot, member: discord.Member, voice_client: Player | None) -> bool:
+    if member.guild_permissions.manage_channels:
+        return True
+
+    if (
+        member.voice
+        and member.voice.channel
+        # voice states are tracked even for members that are not in the member cache
+        and len(member.voice.channel.voice_states) < 3
+        and voice_client
+        and voice_client.channel == member.voice.channel
+    ):
+        return True
+
+    query = r"""SELECT DJ_ROLE FROM GUILDS WHERE ID = ?"""
+
+    dj_role = await bot.cache.get(query, (member.guild.id,))
+
+    if dj_role is None:
+        return True
+
+    dj_role = member.guild.get_role(dj_role)
+    return True if dj_role is None else dj_role in member.roles
+
+
 class Context(commands.Context):
     if TYPE_CHECKING:
         bot: Bot
@@ -20,36 +48,33 @@ class Context(commands.Context):
         author: discord.Member
         guild: discord.Guild
 
-    async def tick(self, *, value: bool = True) -> None:
-        # sourcery skip: use-contextlib-suppress
-        emoji = "\N{WHITE HEAVY CHECK MARK}" if value else "\N{CROSS MARK}"
-        try:
-            await self.message.add_reaction(emoji)
-        except discord.Forbidden:
-            pass
-
-    async def is_dj(self) -> bool:
-        if self.author.guild_permissions.manage_channels:
-            return True
+    async def send(self, *args: Any, **kwargs: Any) -> discord.Message:
+        if self.interaction is not None:
+            # Interaction responses have a bucket of their own
+            return await super().send(*args, **kwargs)
 
-        if (
-            self.author.voice
-            and self.author.voice.channel
-            and len(self.author.voice.channel.members) < 3
-            and self.voice_client
-            and self.voice_client.channel == self.author.voice.channel
-        ):
-            return True
+        send = super().send
+        return await self.bot.outbound.submit("send", self.channel.id, Priority.REPLY, lambda: send(*args, **kwargs))
 
-        query = r"""SELECT DJ_ROLE FROM GUILDS WHERE ID = ?"""
+    async def tick(self, *, value: bool = True) -> None:
+        emoji = "\N{WHITE HEAVY CHECK MARK}" if value else "\N{CROSS MARK}"
+        if self.interaction is not None:
+            # An interaction has no message to react to, it is answered instead unless it already was
+            if not self.interaction.response.is_done():
+                await self.send(emoji, ephemeral=True)
+            return
 
-        dj_role = await self.bot.cache.get(query, (self.guild.id,))
+        # Not awaited, and dropped when the channel has reactions piling up
+        self.bot.outbound.react(self.message, emoji)
 
-        if dj_role is None:
-            return True
+    async def is_dj(self) -> bool:
+        if not isinstance(self.author, discord.Member):
+            member = await self.bot.get_or_fetch_member(self.guild, self.author.id)
+            if member is None:
+                return False
+            self.author = member
 
-        dj_role = self.guild.get_role(dj_role)
-        return True if dj_role is None else dj_role in self.author.roles
+        return await is_dj(self.bot, self.author, self.voice_client)
 
     @staticmethod
     def dj_only():
@@ -79,29 +104,32 @@ class Context(commands.Context):
         timeout: float = 30.0,
         message: discord.Message | None = None,
     ) -> bool:
-        if message is None:
-            message = await self.send(content)
-        else:
-            message = await message.edit(content=content)
-
-        def check(reaction: discord.Reaction, user: discord.User) -> bool:
-            return user == self.author and reaction.message.id == message.id
-
-        await message.add_reaction("\N{WHITE HEAVY CHECK MARK}")
-        await message.add_reaction("\N{CROSS MARK}")
-
-        try:
-            reaction, _ = await self.bot.wait_for("reaction_add", check=check, timeout=timeout)
-        except TimeoutError:
-            await message.add_reaction("\N{ALARM CLOCK}")
-            return False
-
-        assert isinstance(reaction, discord.Reaction)
-
-        if delete_after:
-            await message.delete(delay=0)
-
-        return str(reaction.emoji) == "\N{WHITE HEAVY CHECK MARK}"
+        """Ask the author to confirm, False if they deny or do not answer in time."""
+        answer = await self.choose(
+            content,
+            [
+                Choice("yes", emoji="\N{WHITE HEAVY CHECK MARK}", style=discord.ButtonStyle.success),
+                Choice("no", emoji="\N{CROSS MARK}", style=discord.ButtonStyle.danger),
+            ],
+            delete_after=delete_after,
+            timeout=timeout,
+            message=message,
+        )
+        return answer == "yes"
+
+    async def choose(
+        self,
+        content: str,
+        choices: list[Choice],
+        *,
+        delete_after: bool = False,
+        timeout: float = 30.0,
+        message: discord.Message | None = None,
+    ) -> str | None:
+        """Ask the author to click one of the buttons, the value of the choice or None if they do not in time."""
+        return await self.bot.prompts.ask(
+            self, content, choices, timeout=timeout, delete_after=delete_after, message=message
+        )
 
     async def add_reaction(
         self,
@@ -114,8 +142,8 @@ class Context(commands.Context):
             message = self.message
 
         for emoji in emojis:
-            try:
-                await message.add_reaction(emoji)
-            except discord.HTTPException as e:
-                if raise_exception:
-                    raise e
+            if not raise_exception:
+                self.bot.outbound.react(message, emoji)
+                continue
+
+            await self.bot.outbound.react(message, emoji, priority=Priority.UPDATE)
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import discord
+
+
+def _music_intents() -> discord.Intents:
+    # Only what the music bot needs: prefix commands, reaction prompts and voice states.
+    # Presences, typing and the member list are never requested.
+    return discord.Intents(
+        guilds=True,
+        voice_states=True,
+        guild_messages=True,
+        guild_reactions=True,
+        message_content=True,
+    )
+
+
+INTENT_PROFILES = {
+    "all": discord.Intents.all,
+    "default": discord.Intents.default,
+    "music": _music_intents,
+}
+
+
+def build_intents(profile: str) -> discord.Intents:
+    try:
+        factory = INTENT_PROFILES[profile]
+    except KeyError:
+        raise ValueError(
+            f"Unknown intents profile {profile!r}, expected one of {', '.join(INTENT_PROFILES)}"
+        ) from None
+
+    return factory()
+
+
+def build_member_cache_flags(policy: str, intents: discord.Intents) -> discord.MemberCacheFlags:
+    if policy == "intents":
+        return discord.MemberCacheFlags.from_intents(intents)
+
+    if policy == "voice":
+        # Only members connected to a voice channel are kept, they are evicted once they leave
+        return discord.MemberCacheFlags(voice=True, joined=False)
+
+    if policy == "none":
+        return discord.MemberCacheFlags.none()
+
+    raise ValueError(f"Unknown member cache policy {policy!r}, expected one of intents, voice, none")
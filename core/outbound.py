@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import asyncio
+import enum
+import heapq
+import itertools
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass, field
+from typing import Any
+
+import discord
+
+from utils import CONFIG
+from utils.metrics import OUTBOUND_ACTIONS
+
+__all__ = ("Outbound", "Priority")
+
+
+class Priority(enum.IntEnum):
+    # Answers to what a member just did
+    REPLY = 0
+    # Announcements, edits, deletes and reactions members have to click
+    UPDATE = 1
+    # Reactions only telling how a command went
+    COSMETIC = 2
+
+
+@dataclass(order=True)
+class _Job:
+    priority: int
+    sequence: int
+    factory: Callable[[], Awaitable[Any]] = field(compare=False)
+    key: Hashable | None = field(default=None, compare=False)
+    future: asyncio.Future[Any] = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future(), compare=False
+    )
+    # The fields of a pending edit, later edits of the message are merged into them
+    fields: dict[str, Any] = field(default_factory=dict, compare=False)
+    dropped: bool = field(default=False, compare=False)
+    # The edit of the same message submitted while this one was running, queued once it is done
+    follow: _Job | None = field(default=None, compare=False)
+
+
+class _Lane:
+    def __init__(self) -> None:
+        self.heap: list[_Job] = []
+        self.keyed: dict[Hashable, _Job] = {}
+        # Keyed jobs being sent
+        self.running: dict[Hashable, _Job] = {}
+        self.workers = 0
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+
+class Outbound:
+    """The REST calls the bot makes in channels, the most important first.
+
+    Discord rate limits every route of every channel separately, so calls are put
+    in a lane per route and channel, which runs ``outbound.concurrency`` of them at
+    once (reactions one at a time) in order of :class:`Priority`. A reply never waits behind reactions. An
+    edit of a message still waiting is merged into the pending one, a delete drops
+    the pending edits of its message, and cosmetic reactions are dropped when their
+    lane already has ``outbound.backlog`` calls waiting.
+    """
+
+    def __init__(self) -> None:
+        self._lanes: dict[tuple[str, int], _Lane] = {}
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def submit(
+        self,
+        route: str,
+        channel_id: int,
+        priority: Priority,
+        factory: Callable[[], Awaitable[Any]],
+        *,
+        key: Hashable | None = None,
+    ) -> asyncio.Future[Any]:
+        lane = self._lanes.setdefault((route, channel_id), _Lane())
+
+        if priority is Priority.COSMETIC and len(lane) >= CONFIG.outbound.backlog:
+            OUTBOUND_ACTIONS.labels(route, "dropped").inc()
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(None)
+            return future
+
+        job = _Job(priority, next(self._sequence), factory, key)
+        if key is not None:
+            lane.keyed[key] = job
+        heapq.heappush(lane.heap, job)
+
+        # Reactions show up in the order they were added, one goes at a time
+        concurrency = 1 if route == "react" else CONFIG.outbound.concurrency
+        while lane.workers < concurrency and lane.workers < len(lane):
+            lane.workers += 1
+            asyncio.create_task(self._work((route, channel_id), lane))
+
+        return job.future
+
+    async def _work(self, name: tuple[str, int], lane: _Lane) -> None:
+        try:
+            while lane.heap:
+                job = heapq.heappop(lane.heap)
+                if job.key is not None and lane.keyed.get(job.key) is job:
+                    del lane.keyed[job.key]
+                if job.dropped:
+                    continue
+
+                if job.key is not None:
+                    lane.running[job.key] = job
+                try:
+                    result = await job.factory()
+                except Exception as e:
+                    OUTBOUND_ACTIONS.labels(name[0], "failed").inc()
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                        # Most calls are not awaited, their failures must not be logged as never retrieved
+                        job.future.exception()
+                else:
+                    OUTBOUND_ACTIONS.labels(name[0], "sent").inc()
+                    if not job.future.done():
+                        job.future.set_result(result)
+                finally:
+                    if job.key is not None and lane.running.get(job.key) is job:
+                        del lane.running[job.key]
+                    if job.follow is not None:
+                        heapq.heappush(lane.heap, job.follow)
+        finally:
+            lane.workers -= 1
+            if not lane.workers and not lane.heap:
+                self._lanes.pop(name, None)
+
+    def send(
+        self,
+        channel: discord.abc.MessageableChannel,
+        *args: Any,
+        priority: Priority = Priority.REPLY,
+        **kwargs: Any,
+    ) -> asyncio.Future[discord.Message]:
+        return self.submit("send", channel.id, priority, lambda: channel.send(*args, **kwargs))
+
+    def edit(self, message: discord.Message, **fields: Any) -> asyncio.Future[discord.Message | None]:
+        """Edit the message, the result is the edited message or None if it was deleted meanwhile."""
+        lane = self._lanes.get(("edit", message.channel.id))
+        key = ("edit", message.id)
+        pending = lane.keyed.get(key) if lane is not None else None
+        if pending is not None and not pending.dropped:
+            OUTBOUND_ACTIONS.labels("edit", "merged").inc()
+            pending.fields.update(fields)
+            return pending.future
+
+        merged = dict(fields)
+        running = lane.running.get(key) if lane is not None else None
+        if running is not None:
+            # Edits of a message are sent one at a time, an older one finishing last would undo the newer
+            assert lane is not None
+            job = _Job(Priority.UPDATE, next(self._sequence), lambda: message.edit(**merged), key, fields=merged)
+            running.follow = lane.keyed[key] = job
+            return job.future
+
+        future = self.submit("edit", message.channel.id, Priority.UPDATE, lambda: message.edit(**merged), key=key)
+        self._lanes[("edit", message.channel.id)].keyed[key].fields = merged
+        return future
+
+    def delete(self, message: discord.Message) -> asyncio.Future[None]:
+        lane = self._lanes.get(("edit", message.channel.id))
+        pending = lane.keyed.pop(("edit", message.id), None) if lane is not None else None
+        if pending is not None:
+            # Nothing is left to edit
+            pending.dropped = True
+            pending.future.set_result(None)
+            OUTBOUND_ACTIONS.labels("edit", "dropped").inc()
+
+        return self.submit(
+            "delete",
+            message.channel.id,
+            Priority.UPDATE,
+            lambda: self._delete(message),
+            key=("delete", message.id),
+        )
+
+    @staticmethod
+    async def _delete(message: discord.Message) -> None:
+        try:
+            await message.delete()
+        except discord.NotFound:
+            pass
+
+    def react(
+        self, message: discord.Message, emoji: str, *, priority: Priority = Priority.COSMETIC
+    ) -> asyncio.Future[None]:
+        return self.submit("react", message.channel.id, priority, lambda: message.add_reaction(emoji))
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import secrets
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+import discord
+
+if TYPE_CHECKING:
+    from .bot import Bot
+    from .context import Context
+
+__all__ = ("Choice", "Prompts")
+
+PREFIX = "prompt"
+
+
+@dataclass
+class Choice:
+    value: str
+    label: str | None = None
+    emoji: str | None = None
+    style: discord.ButtonStyle = discord.ButtonStyle.secondary
+
+
+@dataclass
+class _Prompt:
+    author_id: int
+    message: discord.Message | None
+    delete_after: bool
+    future: asyncio.Future[str | None] = field(default_factory=lambda: asyncio.get_running_loop().create_future())
+
+
+class Prompts:
+    """Questions asked with buttons, answered through a single table of custom ids.
+
+    The buttons of a prompt have the custom id ``prompt:<token>:<value>``. A click
+    is looked up by token in :meth:`dispatch`, called from ``on_interaction``, so no
+    view is stored per prompt, and asking takes one REST call rather than a message
+    and a reaction per answer. Timeouts of every prompt share a heap and one task,
+    which removes the buttons once a prompt expires.
+    """
+
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+        self._pending: dict[str, _Prompt] = {}
+        self._heap: list[tuple[float, str]] = []
+
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+        for prompt in self._pending.values():
+            if not prompt.future.done():
+                prompt.future.set_result(None)
+        self._pending.clear()
+
+    @staticmethod
+    def layout(token: str, choices: list[Choice]) -> discord.ui.View:
+        view = discord.ui.View(timeout=None)
+        for choice in choices:
+            view.add_item(
+                discord.ui.Button(
+                    style=choice.style,
+                    label=choice.label,
+                    emoji=choice.emoji,
+                    custom_id=f"{PREFIX}:{token}:{choice.value}",
+                )
+            )
+        # Only the components are sent, clicks are dispatched from the table rather than by a stored view
+        discord.ui.View.stop(view)
+        return view
+
+    async def ask(
+        self,
+        ctx: Context,
+        content: str,
+        choices: list[Choice],
+        *,
+        timeout: float = 30.0,
+        delete_after: bool = False,
+        message: discord.Message | None = None,
+    ) -> str | None:
+        """The value of the button the author clicked, None if they did not before ``timeout``."""
+        token = secrets.token_hex(8)
+        view = self.layout(token, choices)
+
+        prompt = _Prompt(ctx.author.id, None, delete_after)
+        self._pending[token] = prompt
+        try:
+            if message is None:
+                message = await ctx.send(content, view=view)
+            else:
+                message = await self.bot.outbound.edit(message, content=content, view=view) or message
+        except BaseException:
+            del self._pending[token]
+            raise
+
+        prompt.message = message
+        self._schedule(token, timeout)
+        try:
+            return await prompt.future
+        finally:
+            # The command was cancelled, its buttons must not answer a future nobody waits for
+            self._pending.pop(token, None)
+
+    def _schedule(self, token: str, timeout: float) -> None:
+        deadline = asyncio.get_running_loop().time() + timeout
+        heapq.heappush(self._heap, (deadline, token))
+        if self._heap[0][1] == token:
+            self._wakeup.set()
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._heap:
+            self._wakeup.clear()
+
+            timeout = self._heap[0][0] - loop.time()
+            if timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, token = heapq.heappop(self._heap)
+            prompt = self._pending.pop(token, None)
+            if prompt is None:
+                # Already answered
+                continue
+
+            if not prompt.future.done():
+                prompt.future.set_result(None)
+            if prompt.message is not None:
+                # The buttons would not do anything anymore
+                self.bot.outbound.edit(prompt.message, view=None)
+
+    async def dispatch(self, interaction: discord.Interaction) -> bool:
+        """Answer the prompt the clicked button belongs to, False if it is not a button of a prompt."""
+        if interaction.type is not discord.InteractionType.component or interaction.data is None:
+            return False
+
+        prefix, _, rest = str(interaction.data.get("custom_id", "")).partition(":")
+        if prefix != PREFIX:
+            return False
+
+        token, _, value = rest.partition(":")
+        prompt = self._pending.get(token)
+        if prompt is None:
+            await interaction.response.send_message("This prompt has expired.", ephemeral=True)
+            return True
+
+        if interaction.user.id != prompt.author_id:
+            await interaction.response.send_message("This prompt is not for you.", ephemeral=True)
+            return True
+
+        del self._pending[token]
+        if not prompt.future.done():
+            prompt.future.set_result(value)
+
+        if prompt.delete_after:
+            await interaction.response.defer()
+            await interaction.delete_original_response()
+        else:
+            await interaction.response.edit_message(view=None)
+        return True
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from discord import ShardInfo
+
+    from .bot import Bot
+
+
+@dataclass
+class ShardStats:
+    id: int
+    latency: float
+    guilds: int
+    event_rate: float
+    closed: bool
+
+
+class ShardMonitor:
+    """Samples per-shard gateway counters.
+
+    The gateway sequence number of every shard is read on each sample, the
+    difference between two samples is the amount of dispatch events received
+    by that shard in the meantime.
+    """
+
+    def __init__(self, bot: Bot) -> None:
+        self.bot = bot
+
+        self._sequences: dict[int, int] = {}
+        self._rates: dict[int, float] = {}
+        self._guilds: Counter[int] = Counter()
+        self._last_sample: float | None = None
+
+    def sample(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last_sample if self._last_sample is not None else None
+
+        for shard_id, info in self.bot.shards.items():
+            sequence = info._parent.ws.sequence or 0
+            previous = self._sequences.get(shard_id)
+
+            if previous is not None and elapsed:
+                # A fresh IDENTIFY resets the sequence, count from zero in that case
+                delta = sequence - previous if sequence >= previous else sequence
+                self._rates[shard_id] = delta / elapsed
+
+            self._sequences[shard_id] = sequence
+
+        self._guilds = Counter(guild.shard_id for guild in self.bot.guilds)
+        self._last_sample = now
+
+    def _stats(self, info: ShardInfo) -> ShardStats:
+        return ShardStats(
+            id=info.id,
+            latency=info.latency,
+            guilds=self._guilds.get(info.id, 0),
+            event_rate=self._rates.get(info.id, 0.0),
+            closed=info.is_closed(),
+        )
+
+    def stats(self) -> list[ShardStats]:
+        return [self._stats(info) for _, info in sorted(self.bot.shards.items())]
+
+    def get(self, shard_id: int) -> ShardStats | None:
+        info = self.bot.get_shard(shard_id)
+        return None if info is None else self._stats(info)
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import TYPE_CHECKING
+
+import discord
+
+from utils import CONFIG
+from utils.metrics import SQLITE_QUERY
+
+if TYPE_CHECKING:
+    from discord import app_commands
+
+    from .bot import Bot
+
+__all__ = ("command_hashes", "sync_commands")
+
+SELECT_HASHES = r"""SELECT HASHES FROM APP_COMMANDS WHERE SCOPE = ?"""
+UPSERT_HASHES = r"""INSERT INTO APP_COMMANDS (SCOPE, HASHES) VALUES (?, ?)
+    ON CONFLICT (SCOPE) DO UPDATE SET HASHES = excluded.HASHES"""
+
+
+def command_hashes(tree: app_commands.CommandTree, guild: discord.abc.Snowflake | None = None) -> dict[str, str]:
+    """The hash of every command of the tree, as it is uploaded to Discord."""
+    hashes: dict[str, str] = {}
+    for command in tree.get_commands(guild=guild):
+        data = command.to_dict(tree)
+        payload = json.dumps(data, sort_keys=True, separators=(",", ":"))
+        hashes[f"{data['type']}:{data['name']}"] = hashlib.sha256(payload.encode()).hexdigest()
+    return hashes
+
+
+async def sync_commands(bot: Bot) -> None:
+    """Upload the command tree, unless it is the same as the one uploaded last time.
+
+    Every sync replaces the whole tree and counts against a daily limit, so the
+    hash of every command is stored when it is synced and compared on startup.
+    """
+    guild_ids = CONFIG.app_commands.guild_ids
+    scopes: list[discord.Object | None] = [discord.Object(id=guild_id) for guild_id in guild_ids] or [None]
+
+    for guild in scopes:
+        scope = "global" if guild is None else str(guild.id)
+        if guild is not None:
+            bot.tree.copy_global_to(guild=guild)
+
+        hashes = command_hashes(bot.tree, guild)
+
+        with SQLITE_QUERY.labels("select").time():
+            async with bot.sql.execute(SELECT_HASHES, (scope,)) as cursor:
+                row = await cursor.fetchone()
+        stored: dict[str, str] = json.loads(row[0]) if row else {}
+
+        added = hashes.keys() - stored.keys()
+        removed = stored.keys() - hashes.keys()
+        changed = {name for name in hashes.keys() & stored.keys() if hashes[name] != stored[name]}
+
+        if not (added or removed or changed):
+            print(f"[SYNC] {len(hashes)} command(s) of `{scope}` are up to date")
+            continue
+
+        await bot.tree.sync(guild=guild)
+
+        with SQLITE_QUERY.labels("update").time():
+            await bot.sql.execute(UPSERT_HASHES, (scope, json.dumps(hashes)))
+        bot.need_commit = True
+
+        print(f"[SYNC] `{scope}` synced: {len(added)} added, {len(changed)} changed, {len(removed)} removed")
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+import discord
+from discord import app_commands
+
+if TYPE_CHECKING:
+    from .bot import Bot
+
+__all__ = ("CommandTree",)
+
+# Option types of a subcommand and of a subcommand group
+SUBCOMMANDS = (1, 2)
+
+
+def qualified_name(data: dict[str, Any]) -> str:
+    """The name of the invoked command with its groups, e.g. ``filter show``."""
+    names = [data["name"]]
+    options = data.get("options", [])
+    while options and options[0].get("type") in SUBCOMMANDS:
+        names.append(options[0]["name"])
+        options = options[0].get("options", [])
+    return " ".join(names)
+
+
+class CommandTree(app_commands.CommandTree["Bot"]):
+    """Application commands, timed and labelled for the profiler like the prefix ones.
+
+    Slash invocations of hybrid commands never go through :meth:`Bot.invoke`, they
+    are instrumented here instead.
+    """
+
+    async def _call(self, interaction: discord.Interaction) -> None:
+        if interaction.type is not discord.InteractionType.application_command or interaction.data is None:
+            await super()._call(interaction)
+            return
+
+        with self.client.instrument(qualified_name(interaction.data)):  # type: ignore
+            await super()._call(interaction)
@@ -1,11 +1,12 @@
 import asyncio
 import contextlib
 import os
+import shlex
 
 from dotenv import load_dotenv
 
 from core import Bot
-from utils import JAVA_INSTALLED
+from utils import CONFIG, ensure_java
 
 load_dotenv()
 
@@ -19,20 +20,47 @@ else:
 
 VERSION = (1, 0, 0)
 
-if not JAVA_INSTALLED:
-    raise EnvironmentError("Java 17 or higher is required to run this bot.")
-
 LAVALINK = r"java -jar lavalink/Lavalink.jar"
+# Seconds Lavalink gets to shut down before it is killed
+LAVALINK_STOP_TIMEOUT = 10.0
+
+
+async def run_lavalink() -> asyncio.subprocess.Process:
+    """Start Lavalink, the caller stops it with :func:`stop_lavalink`."""
+    await ensure_java()
+    # Started without a shell so terminating the process terminates Java itself
+    return await asyncio.create_subprocess_exec(*shlex.split(LAVALINK))
 
 
-async def run_terminal_command(command: str) -> None:
-    process = await asyncio.create_subprocess_shell(command)
-    await process.communicate()
+async def stop_lavalink(process: asyncio.subprocess.Process) -> None:
+    if process.returncode is not None:
+        return
+
+    process.terminate()
+    try:
+        await asyncio.wait_for(process.wait(), LAVALINK_STOP_TIMEOUT)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
 
 
 async def main() -> None:
     bot = Bot(version=VERSION)
-    await asyncio.gather(*(run_terminal_command(LAVALINK), bot.start(os.environ["TOKEN"])))
+
+    if CONFIG.cluster_id is not None:
+        # Spawned by `cluster.py`, the launcher owns the Lavalink process
+        await bot.start(os.environ["TOKEN"])
+        return
+
+    lavalink = asyncio.create_task(run_lavalink())
+    try:
+        await asyncio.gather(lavalink, bot.start(os.environ["TOKEN"]))
+    finally:
+        # Lavalink would outlive the bot otherwise
+        if not lavalink.done():
+            lavalink.cancel()
+        elif not lavalink.cancelled() and lavalink.exception() is None:
+            await stop_lavalink(lavalink.result())
 
 
 if __name__ == "__main__":
@@ -14,3 +14,59 @@ CREATE TABLE IF NOT EXISTS USERS (
     BLACKLISTED BOOLEAN DEFAULT 0,
     BLACKLISTED_REASON TEXT DEFAULT ""
 );
+
+CREATE TABLE IF NOT EXISTS TRACKS (
+    ID INTEGER PRIMARY KEY,
+    SOURCE VARCHAR(32) NOT NULL,
+    IDENTIFIER TEXT NOT NULL,
+    TITLE TEXT NOT NULL,
+    AUTHOR TEXT NOT NULL,
+    URI TEXT,
+    LENGTH INTEGER NOT NULL,
+    ENCODED TEXT NOT NULL,
+
+    UNIQUE (SOURCE, IDENTIFIER)
+);
+
+-- One row per play, rolled up into TRACK_STATS once older than the retention period
+CREATE TABLE IF NOT EXISTS PLAYS (
+    GUILD_ID BIGINT NOT NULL,
+    TRACK_ID INTEGER NOT NULL REFERENCES TRACKS (ID),
+    REQUESTER_ID BIGINT,
+    PLAYED_AT INTEGER NOT NULL,
+    PLAYED_MS INTEGER NOT NULL,
+    SKIPPED BOOLEAN NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS PLAYS_GUILD_PLAYED_AT ON PLAYS (GUILD_ID, PLAYED_AT);
+CREATE INDEX IF NOT EXISTS PLAYS_PLAYED_AT ON PLAYS (PLAYED_AT);
+CREATE INDEX IF NOT EXISTS PLAYS_TRACK_ID ON PLAYS (TRACK_ID);
+
+CREATE TABLE IF NOT EXISTS TRACK_STATS (
+    GUILD_ID BIGINT NOT NULL,
+    TRACK_ID INTEGER NOT NULL REFERENCES TRACKS (ID),
+    PLAYS INTEGER NOT NULL DEFAULT 0,
+    SKIPS INTEGER NOT NULL DEFAULT 0,
+    PLAYED_MS INTEGER NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (GUILD_ID, TRACK_ID)
+);
+
+CREATE INDEX IF NOT EXISTS TRACK_STATS_TRACK_ID ON TRACK_STATS (TRACK_ID);
+
+-- The filters of the guild, applied again every time the bot joins a channel there
+CREATE TABLE IF NOT EXISTS GUILD_FILTERS (
+    GUILD_ID BIGINT PRIMARY KEY,
+    FILTERS TEXT NOT NULL
+);
+
+-- The hash of every application command when it was last synced, per scope ("global" or a guild ID)
+CREATE TABLE IF NOT EXISTS APP_COMMANDS (
+    SCOPE TEXT PRIMARY KEY,
+    HASHES TEXT NOT NULL
+);
+
+-- Guilds which only use application commands, their messages are not read for prefix commands
+CREATE TABLE IF NOT EXISTS SLASH_ONLY_GUILDS (
+    GUILD_ID BIGINT PRIMARY KEY
+);
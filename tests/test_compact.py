@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import wavelink
+
+from benchmarks.lavalink import encode_track, make_track
+from cogs.music_queue import CompactTrack, TrackList
+from cogs.music_queue.compact import decode_track
+
+
+def test_decode_track_round_trip() -> None:
+    data = make_track("abc")
+    assert decode_track(data["encoded"]) == data["info"]
+
+
+def test_decode_track_nulls_and_unicode() -> None:
+    info = {
+        "identifier": "x1",
+        "isSeekable": False,
+        "author": "Sigur Rós",
+        "length": 0,
+        "isStream": True,
+        "position": 1234,
+        "title": "Song 🎵 of the ünïcode",
+        "uri": None,
+        "artworkUrl": None,
+        "isrc": "USRC17607839",
+        "sourceName": "youtube",
+    }
+    assert decode_track(encode_track(info)) == info
+
+
+def test_compact_track_inflates_back() -> None:
+    data = make_track("abc")
+    data["userData"] = {"requester_id": 42, "note": "kept"}
+    track = wavelink.Playable(data)  # type: ignore
+
+    record = CompactTrack.pack(track)
+    assert record.requester == 42
+    inflated = record.inflate()
+    assert inflated.encoded == track.encoded
+    assert (inflated.title, inflated.author, inflated.length) == (track.title, track.author, track.length)
+    assert (inflated.uri, inflated.identifier, inflated.source) == (track.uri, track.identifier, track.source)
+    assert dict(inflated.extras) == {"requester_id": 42, "note": "kept"}
+
+
+def test_track_list_counts_requesters() -> None:
+    tracks = []
+    for index, requester in enumerate([1, 1, 2, None]):
+        data = make_track(f"t{index}")
+        data["userData"] = {"requester_id": requester} if requester is not None else {}
+        tracks.append(wavelink.Playable(data))  # type: ignore
+
+    items = TrackList(tracks)
+    assert items.counts == {1: 2, 2: 1, None: 1}
+    assert [track.identifier for track in items] == ["t0", "t1", "t2", "t3"]
+    items.pop(0)
+    assert items.counts == {1: 1, 2: 1, None: 1}
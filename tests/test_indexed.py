@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import random
+from collections import Counter
+
+import pytest
+
+from cogs.music_queue.indexed import IndexedList
+
+
+def check(indexed: IndexedList[int], expected: list[int]) -> None:
+    assert list(indexed) == expected
+    assert list(reversed(indexed)) == expected[::-1]
+    assert len(indexed) == len(expected)
+    assert indexed.counts == Counter(value % 3 for value in expected)
+    # Ranks never decrease along the list
+    ranks = [rank for _, rank in indexed.ranked()]
+    assert ranks == sorted(ranks)
+
+
+def test_indexing_and_slicing() -> None:
+    values = list(range(50))
+    indexed = IndexedList(values, key=lambda value: value % 3)
+    check(indexed, values)
+
+    for index in (0, 1, 25, 49, -1, -50):
+        assert indexed[index] == values[index]
+    for index in (50, -51):
+        with pytest.raises(IndexError):
+            indexed[index]
+
+    for part in (slice(None), slice(10, 20), slice(-5, None), slice(30, 10), slice(None, None, 3), slice(45, 100)):
+        assert indexed[part] == values[part]
+    # Slicing leaves the list as it was
+    check(indexed, values)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_list(seed: int) -> None:
+    rng = random.Random(seed)
+    expected: list[int] = []
+    indexed: IndexedList[int] = IndexedList(key=lambda value: value % 3)
+
+    for step in range(300):
+        operation = rng.choice(["insert", "append", "extend", "pop", "move", "delslice", "setitem", "insort"])
+        if operation == "insert":
+            index = rng.randint(-len(expected) - 2, len(expected) + 2)
+            expected.insert(index, step)
+            indexed.insert(index, step)
+        elif operation == "append":
+            expected.append(step)
+            indexed.append(step)
+        elif operation == "extend":
+            values = [step * 10 + i for i in range(rng.randint(0, 5))]
+            expected.extend(values)
+            indexed.extend(values)
+        elif operation == "insort":
+            # Inserted after every item ranked the same or lower, the last item has the highest rank
+            rank = indexed.rank(-1) if expected else 0.0
+            assert indexed.insort(step, rank) == len(expected)
+            expected.append(step)
+        elif not expected:
+            continue
+        elif operation == "pop":
+            index = rng.randrange(-len(expected), len(expected))
+            assert indexed.pop(index) == expected.pop(index)
+        elif operation == "move":
+            source, destination = rng.randrange(len(expected)), rng.randrange(len(expected))
+            expected.insert(destination, expected.pop(source))
+            indexed.move(source, destination)
+        elif operation == "delslice":
+            start = rng.randint(-len(expected), len(expected))
+            stop = rng.randint(-len(expected), len(expected))
+            step_ = rng.choice([None, None, 2])
+            del expected[start:stop:step_]
+            del indexed[start:stop:step_]
+        else:
+            index = rng.randrange(len(expected))
+            expected[index] = step
+            indexed[index] = step
+
+        check(indexed, expected)
+
+
+def test_insort_after_moves_and_shuffles() -> None:
+    indexed: IndexedList[str] = IndexedList()
+    for value, rank in [("a", 1.0), ("b", 2.0), ("c", 3.0)]:
+        indexed.insort(value, rank)
+
+    indexed.move(2, 0)
+    assert list(indexed) == ["c", "a", "b"]
+    assert indexed.insort("d", 1.5) == 2
+    assert list(indexed) == ["c", "a", "d", "b"]
+
+    indexed.shuffle()
+    assert sorted(indexed) == ["a", "b", "c", "d"]
+    assert indexed.insort("e", 10.0) == 4
+
+
+def test_copy_is_independent() -> None:
+    indexed = IndexedList(range(5), key=lambda value: value % 3)
+    copy = indexed.copy()
+    copy.pop(0)
+    assert list(indexed) == [0, 1, 2, 3, 4]
+    assert list(copy) == [1, 2, 3, 4]
+    assert copy.counts == Counter({1: 2, 2: 1, 0: 1})
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import wavelink
+
+from benchmarks.lavalink import make_track
+from cogs.music_queue import TrackQueue
+
+
+def track(identifier: str, requester: int | None) -> wavelink.Playable:
+    data = make_track(identifier)
+    data["userData"] = {"requester_id": requester} if requester is not None else {}
+    return wavelink.Playable(data)  # type: ignore
+
+
+def order(queue: TrackQueue) -> list[str]:
+    return [track.identifier for track in queue]
+
+
+def test_fair_round_robin() -> None:
+    queue = TrackQueue(fair=True)
+    queue.put([track("a1", 1), track("a2", 1), track("a3", 1)])
+    queue.put([track("b1", 2), track("b2", 2)])
+    assert order(queue) == ["a1", "b1", "a2", "b2", "a3"]
+    assert queue.requesters == {1: 3, 2: 2}
+
+
+def test_fair_joins_the_next_round() -> None:
+    queue = TrackQueue(fair=True)
+    queue.put([track("a1", 1), track("a2", 1), track("a3", 1)])
+    queue.put([track("b1", 2), track("b2", 2)])
+
+    assert queue.get().identifier == "a1"
+    # The round of a1 is being played, a new requester gets a turn in the next one
+    queue.put(track("c1", 3))
+    assert order(queue) == ["b1", "a2", "b2", "c1", "a3"]
+
+
+def test_fair_weights() -> None:
+    queue = TrackQueue(fair=True)
+    queue.weights[1] = 2.0
+    queue.put([track(f"a{i}", 1) for i in range(1, 5)])
+    queue.put([track("b1", 2), track("b2", 2)])
+    assert order(queue) == ["a1", "a2", "b1", "a3", "a4", "b2"]
+
+
+def test_fair_mode_toggled_on() -> None:
+    queue = TrackQueue()
+    queue.put([track("a1", 1), track("a2", 1), track("a3", 1)])
+    queue.put([track("b1", 2), track("b2", 2)])
+    queue.put(track("n1", None))
+    assert order(queue) == ["a1", "a2", "a3", "b1", "b2", "n1"]
+
+    # The tracks already queued are interleaved, each requester keeps their own order
+    queue.fair = True
+    assert order(queue) == ["a1", "b1", "n1", "a2", "b2", "a3"]
+
+    queue.put(track("b3", 2))
+    assert order(queue) == ["a1", "b1", "n1", "a2", "b2", "a3", "b3"]
+
+    # Turned off, tracks are appended again
+    queue.fair = False
+    queue.put(track("a4", 1))
+    assert order(queue)[-1] == "a4"
+
+
+def test_fair_order_survives_moves_and_shuffles() -> None:
+    queue = TrackQueue(fair=True)
+    queue.put([track(f"a{i}", 1) for i in range(1, 4)])
+    queue.put([track(f"b{i}", 2) for i in range(1, 4)])
+
+    queue.shuffle()
+    requesters = [int(identifier[0] == "b") + 1 for identifier in order(queue)]
+    assert requesters == [1, 2, 1, 2, 1, 2]
+
+    # A track moved to the front joins the first round
+    queue.move(5, 0)
+    queue.put(track("c1", 3))
+    assert order(queue).index("c1") == 3
+
+
+def test_skip_to_and_records() -> None:
+    queue = TrackQueue()
+    queue.put([track(f"t{i}", 1) for i in range(5)])
+
+    record = queue.record(3)
+    assert queue.position(record) == 3
+    assert queue.skip_to(2).identifier == "t2"
+    assert order(queue) == ["t3", "t4"]
+    assert queue.position(record) == 0
+    queue.get()
+    assert queue.position(record) is None
@@ -1,4 +1,11 @@
 from .cache import Cache  # noqa: F401
 from .config import CONFIG  # noqa: F401
 from .deco import *  # noqa: F401, F403
-from .ensure_java import JAVA_INSTALLED  # noqa: F401
+from .ensure_java import ensure_java  # noqa: F401
+from .ipc import IPCClient, IPCServer  # noqa: F401
+from .logs import LogPipeline  # noqa: F401
+from .memory import MemoryTracker  # noqa: F401
+from .metrics import REGISTRY, ClusterMetricsServer, MetricsServer  # noqa: F401
+from .profiler import SamplingProfiler  # noqa: F401
+from .trace import TraceRecorder  # noqa: F401
+from .watchdog import LoopWatchdog  # noqa: F401
@@ -4,6 +4,8 @@ import re
 from collections.abc import Callable
 from typing import TYPE_CHECKING, Any, Concatenate, Literal, ParamSpec, TypeVar
 
+from .metrics import CACHE_REQUESTS, SQLITE_QUERY
+
 if TYPE_CHECKING:
     from core import Bot
 
@@ -68,12 +70,16 @@ class Cache:
         assert operation == "SELECT"
 
         try:
-            return self.__getitem__((f"{table}.{column}", identifier))
+            value = self.__getitem__((f"{table}.{column}", identifier))
         except KeyError:
-            pass
+            CACHE_REQUESTS.labels(table, "miss").inc()
+        else:
+            CACHE_REQUESTS.labels(table, "hit").inc()
+            return value
 
-        async with self.__conn.execute(query, args) as cursor:
-            row = await cursor.fetchone()
+        with SQLITE_QUERY.labels("select").time():
+            async with self.__conn.execute(query, args) as cursor:
+                row = await cursor.fetchone()
 
         self.bot.need_commit = True
 
@@ -101,10 +107,12 @@ class Cache:
 
         assert operation == "UPDATE"
 
-        await self.__conn.execute(query, args)
+        with SQLITE_QUERY.labels("update").time():
+            await self.__conn.execute(query, args)
         self.bot.need_commit = True
 
         self.__setitem__((f"{table}.{column}", identifier), args[0])
+        await self.publish([(f"{table}.{column}", identifier, args[0])])
 
     async def put(self, query: str, args: tuple) -> None:
         match = INSERT_REGEX.match(query)
@@ -117,22 +125,30 @@ class Cache:
             table: Literal["GUILDS", "USERS"]
             columns: str
 
-        cols_iter = map(lambda s: s.strip(), columns.split(","))
+        cols = [column.strip() for column in columns.split(",")]
 
         assert operation == "INSERT"
 
-        await self.__conn.execute(query, args)
+        with SQLITE_QUERY.labels("insert").time():
+            await self.__conn.execute(query, args)
         self.bot.need_commit = True
 
-        index = 0
+        index = cols.index("ID") if "ID" in cols else 0
+
+        entries = [(f"{table}.{column}", args[index], value) for column, value in zip(cols, args)]
+        for key, identifier, value in entries:
+            self.__setitem__((key, identifier), value)
+
+        await self.publish(entries)
 
-        for i, column in enumerate(cols_iter):
-            if column == "ID":
-                index = i
-                break
+    async def publish(self, entries: list[tuple[str, int, Any]]) -> None:
+        """Send cache writes to the other clusters, so they never serve a stale value."""
+        if self.bot.ipc is not None:
+            await self.bot.ipc.broadcast("cache_set", entries)
 
-        for column, value in zip(columns, args):
-            self.__setitem__((f"{table}.{column}", args[index]), value)
+    def apply(self, entries: list[tuple[str, int, Any]]) -> None:
+        for key, identifier, value in entries:
+            self.__setitem__((key, identifier), value)
 
     @copy_method_signature(get)
     async def select(self, *args, **kwargs):
@@ -1,22 +1,144 @@
 from __future__ import annotations
 
+import asyncio
+import inspect
 import json
-from dataclasses import dataclass
+import os
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, TypeVar
 
-with open(r"config.json", "r") as f:
-    config = json.load(f)
+T = TypeVar("T")
+
+# Called with the old and the new value of a section when it changes
+Subscriber = Callable[[Any, Any], Awaitable[None] | None]
+
+
+def section(build: Callable[[Config], T]) -> property:
+    """A setting built once for every version of the config, rather than on every access."""
+    name = build.__name__
+
+    @wraps(build)
+    def getter(self: Config) -> T:
+        sections = self._sections
+        try:
+            return sections[name]
+        except KeyError:
+            value = sections[name] = build(self)
+            return value
+
+    getter.__section__ = True  # type: ignore
+    return property(getter)
 
 
 class Config:
-    def __init__(self, **kwargs):
-        self.__kwargs = kwargs
+    """The settings of ``config.json``.
+
+    The file is read on first use and every section is validated and built once.
+    :meth:`watch` polls the file and :meth:`reload` applies a new version only if
+    all of its sections are valid, then calls the subscribers of every section
+    which changed.
+    """
+
+    def __init__(self, path: str = r"config.json", **kwargs):
+        self.__path = path
+        self.__data: dict[str, Any] | None = kwargs or None
         self.__schema: str | None = None
 
+        self._sections: dict[str, Any] = {}
+        self._subscribers: defaultdict[str, list[Subscriber]] = defaultdict(list)
+
     @property
+    def __kwargs(self) -> dict[str, Any]:
+        # Read on first use rather than when the module is imported
+        if self.__data is None:
+            with open(self.__path, "r") as f:
+                self.__data = json.load(f)
+        return self.__data
+
+    @classmethod
+    def section_names(cls) -> list[str]:
+        return [
+            name
+            for name, value in vars(cls).items()
+            if isinstance(value, property) and getattr(value.fget, "__section__", False)
+        ]
+
+    def subscribe(self, name: str, callback: Subscriber) -> None:
+        self._subscribers[name].append(callback)
+
+    def unsubscribe(self, name: str, callback: Subscriber) -> None:
+        try:
+            self._subscribers[name].remove(callback)
+        except ValueError:
+            pass
+
+    def _read(self) -> Config:
+        with open(self.__path, "r") as f:
+            config = Config(self.__path, **json.load(f))
+
+        # Building every section is what validates them
+        for name in self.section_names():
+            getattr(config, name)
+        return config
+
+    async def reload(self) -> set[str]:
+        """Switch to the current version of the file, returns the sections which changed.
+
+        Nothing changes when the file is not valid.
+        """
+        try:
+            config = await asyncio.to_thread(self._read)
+        except (OSError, ValueError, TypeError, KeyError) as e:
+            print(f"[CONFIG] {self.__path} was not reloaded: {e!r}")
+            return set()
+
+        names = self.section_names()
+        old = {name: getattr(self, name) for name in names}
+        changed = {name for name in names if old[name] != getattr(config, name)}
+
+        # Swapped at once, nothing reads a mix of both versions
+        self.__data, self._sections = config.__data, config._sections
+
+        if changed:
+            print(f"[CONFIG] Reloaded {self.__path}, changed: {', '.join(sorted(changed))}")
+
+        for name in changed:
+            for callback in list(self._subscribers[name]):
+                try:
+                    result = callback(old[name], getattr(self, name))
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as e:
+                    print(f"[CONFIG] Failed applying `{name}`: {e!r}")
+
+        return changed
+
+    async def watch(self, interval: float) -> None:
+        """Reload the config whenever the file is modified."""
+
+        def stamp() -> tuple[int, int] | None:
+            try:
+                stat = os.stat(self.__path)
+            except OSError:
+                return None
+            return stat.st_mtime_ns, stat.st_size
+
+        last = stamp()
+        while True:
+            await asyncio.sleep(interval)
+            current = stamp()
+            if current is not None and current != last:
+                last = current
+                await self.reload()
+
+    @section
     def cogs(self) -> list[str]:
         return [cog["path"] for cog in self.__kwargs["cogs"]]
 
-    @property
+    @section
     def database_file(self) -> str:
         return self.__kwargs["database_file"]
 
@@ -32,14 +154,217 @@ class Config:
         host: str
         port: int
         password: str
+        identifier: str = "MAIN"
 
-    @property
+        @property
+        def uri(self) -> str:
+            return f"ws://{self.host}:{self.port}"
+
+    @section
+    def nodes(self) -> list[Lavalink]:
+        """Every Lavalink node, `lavalink` is either a node or a list of them."""
+        nodes = self.__kwargs["lavalink"]
+        nodes = [Config.Lavalink(**node) for node in (nodes if isinstance(nodes, list) else [nodes])]
+
+        identifiers = {node.identifier for node in nodes}
+        if not nodes or len(identifiers) != len(nodes):
+            raise ValueError("`lavalink` needs at least a node, and distinct identifiers for every node.")
+        return nodes
+
+    @section
     def lavalink(self) -> Lavalink:
-        return Config.Lavalink(**self.__kwargs["lavalink"])
+        return self.nodes[0]
 
-    @property
+    @section
     def default_prefixes(self) -> list[str]:
         return self.__kwargs["default_prefixes"]
 
+    @dataclass
+    class Idle:
+        timeout: float = 180.0
+        alone_timeout: float = 60.0
+
+    @section
+    def idle(self) -> Idle:
+        return Config.Idle(**self.__kwargs.get("idle", {}))
+
+    @dataclass
+    class Queue:
+        page_size: int = 10
+        # 0 for no limit, DJs are never limited
+        max_per_requester: int = 0
+        # Round robin between requesters instead of first come first served, DJs get `dj_weight` turns per round
+        fair: bool = False
+        dj_weight: float = 1.0
+
+    @section
+    def queue(self) -> Queue:
+        return Config.Queue(**self.__kwargs.get("queue", {}))
+
+    @dataclass
+    class History:
+        retention_days: int = 30
+        flush_interval: float = 30.0
+        batch_size: int = 500
+        # Rolled up totals kept per guild once plays are past the retention period
+        max_tracks_per_guild: int = 1000
+
+    @section
+    def history(self) -> History:
+        return Config.History(**self.__kwargs.get("history", {}))
+
+    @dataclass
+    class Playback:
+        # Seconds before the end of a track when the next one is resolved, 0 to wait for Lavalink instead
+        preload: float = 15.0
+        # Seconds of fade out and fade in between two tracks, 0 to disable
+        crossfade: float = 0.0
+        # Sources handing out stream URLs which expire, their tracks are resolved again before they play
+        refresh_sources: list[str] = field(default_factory=lambda: ["http"])
+
+    @section
+    def playback(self) -> Playback:
+        return Config.Playback(**self.__kwargs.get("playback", {}))
+
+    @dataclass
+    class Controls:
+        # Seconds changes to a player are gathered for, before they are sent to Lavalink in a single request
+        tick: float = 0.25
+
+    @section
+    def controls(self) -> Controls:
+        return Config.Controls(**self.__kwargs.get("controls", {}))
+
+    @dataclass
+    class AppCommands:
+        # Whether the command tree is synced on startup, only when it changed since the last sync
+        sync: bool = True
+        # Guilds the commands are synced to instead of globally, for testing
+        guild_ids: list[int] = field(default_factory=list)
+        # Searches kept for the autocomplete of `play`
+        search_cache: int = 1000
+
+    @section
+    def app_commands(self) -> AppCommands:
+        return Config.AppCommands(**self.__kwargs.get("app_commands", {}))
+
+    @dataclass
+    class Logging:
+        file: str = "logs/bot.log"
+        level: str = "INFO"
+        # Rotated past this size, or every `when` ("midnight", "h", ...) when it is set
+        max_bytes: int = 10 * 1024 * 1024
+        backup_count: int = 5
+        when: str | None = None
+        # One JSON object per line instead of text
+        structured: bool = False
+        # Records waiting to be written, past which new ones are dropped
+        queue_size: int = 10_000
+        # Logger prefix -> records below WARNING let through per second
+        sample: dict[str, int] = field(default_factory=lambda: {"discord": 100, "wavelink": 100})
+
+    @section
+    def logging(self) -> Logging:
+        return Config.Logging(**self.__kwargs.get("logging", {}))
+
+    @dataclass
+    class Outbound:
+        # Calls of a route in a channel running at once
+        concurrency: int = 2
+        # Calls waiting in a lane past which cosmetic reactions are dropped
+        backlog: int = 5
+
+    @section
+    def outbound(self) -> Outbound:
+        return Config.Outbound(**self.__kwargs.get("outbound", {}))
+
+    @dataclass
+    class Reload:
+        enabled: bool = True
+        # Seconds between two checks of the modification time of the file
+        interval: float = 2.0
+
+    @section
+    def reload_config(self) -> Reload:
+        return Config.Reload(**self.__kwargs.get("reload_config", {}))
+
+    @dataclass
+    class Intents:
+        profile: str = "all"
+        member_cache: str = "intents"
+
+    @section
+    def intents(self) -> Intents:
+        return Config.Intents(**self.__kwargs.get("intents", {}))
+
+    @dataclass
+    class Sharding:
+        enabled: bool = False
+        shard_count: int | None = None
+        shard_ids: list[int] | None = None
+
+        def __post_init__(self) -> None:
+            if self.shard_ids is not None and self.shard_count is None:
+                raise ValueError("`sharding.shard_ids` requires an explicit `sharding.shard_count`.")
+
+            if self.shard_ids is not None and self.shard_count is not None:
+                invalid = [shard_id for shard_id in self.shard_ids if not 0 <= shard_id < self.shard_count]
+                if invalid:
+                    raise ValueError(f"Shard IDs {invalid} are out of range for {self.shard_count} shards.")
+
+    @section
+    def sharding(self) -> Sharding:
+        kwargs = dict(self.__kwargs.get("sharding", {}))
+
+        # Set by the cluster launcher for every bot process it spawns
+        if shard_ids := os.environ.get("PARROT_SHARD_IDS"):
+            kwargs["enabled"] = True
+            kwargs["shard_ids"] = [int(shard_id) for shard_id in shard_ids.split(",")]
+            kwargs["shard_count"] = int(os.environ["PARROT_SHARD_COUNT"])
+
+        return Config.Sharding(**kwargs)
+
+    @dataclass
+    class Metrics:
+        enabled: bool = False
+        host: str = "127.0.0.1"
+        port: int = 9100
+
+        def cluster_port(self, cluster_id: int) -> int:
+            # The launcher serves the merged metrics of the clusters on `port`, each cluster on the ports after it
+            return self.port + 1 + cluster_id
+
+    @section
+    def metrics(self) -> Metrics:
+        metrics = Config.Metrics(**self.__kwargs.get("metrics", {}))
+        if self.cluster_id is not None:
+            metrics.port = metrics.cluster_port(self.cluster_id)
+        return metrics
+
+    @dataclass
+    class Watchdog:
+        enabled: bool = True
+        interval_ms: int = 100
+        budget_ms: int = 100
+
+    @section
+    def watchdog(self) -> Watchdog:
+        return Config.Watchdog(**self.__kwargs.get("watchdog", {}))
+
+    @dataclass
+    class Cluster:
+        clusters: int | None = None
+        ipc_path: str = "/tmp/parrot-music.sock"
+
+    @section
+    def cluster(self) -> Cluster:
+        return Config.Cluster(**self.__kwargs.get("cluster", {}))
+
+    @property
+    def cluster_id(self) -> int | None:
+        """ID of this process when it was spawned by the cluster launcher."""
+        cluster_id = os.environ.get("PARROT_CLUSTER_ID")
+        return None if cluster_id is None else int(cluster_id)
+
 
-CONFIG = Config(**config)
+CONFIG = Config()
@@ -8,7 +8,7 @@ from discord.ext import commands
 if TYPE_CHECKING:
     from discord.ext.commands._types import Check
 
-    from cogs.music import Player
+    from cogs.music import Music, Player
     from core import Context
 
 
@@ -49,12 +49,26 @@ def try_connect(*, cls: Type[Player]) -> Check[Context]:
             )
 
         if ctx.author.voice.channel:
-            try:
-                player = await ctx.author.voice.channel.connect(cls=cls)
+            channel = ctx.author.voice.channel
+
+            async def connect() -> None:
+                # Commands run concurrently, another one may have connected meanwhile
+                if ctx.voice_client is not None:
+                    return
+                player = await channel.connect(cls=cls)
                 player.home = ctx.channel
                 player.ctx = ctx
+
+            music: Music = ctx.bot.get_cog("Music")  # type: ignore
+            try:
+                await music.actor(ctx.guild.id).run(connect)
             except discord.ClientException as e:
                 raise commands.CheckFailure("Failed connecting to channel") from e
+
+            if ctx.voice_client is not None and ctx.voice_client.channel != channel:
+                raise commands.CheckFailure(
+                    f"Bot is already in a voice channel ({ctx.voice_client.channel.mention})."
+                )
         return True
 
     return commands.check(predicate)
@@ -1,28 +1,39 @@
-import subprocess
+from __future__ import annotations
 
+import asyncio
 
-def check_java_installed():
-    try:
-        # Run the java -version command and capture the output
-        result = subprocess.run(
-            ["java", "-version"],
-            stderr=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            text=True,
-        )
-        output = result.stderr.splitlines()[0]  # The version info is in stderr
+__all__ = ("MIN_JAVA_VERSION", "java_version", "ensure_java")
 
-        # Parse the Java version from the output
-        if "version" in output:
-            version_str: str = output.split('"')[1]
-            major_version = int(version_str.split(".")[0])  # Get the major version number
-            return major_version
+MIN_JAVA_VERSION = 17
 
-        return None
+
+async def java_version() -> int | None:
+    """The major version of the installed Java, if any.
+
+    Only the process running Lavalink needs Java, so it is checked there rather than when the bot is imported.
+    """
+    try:
+        process = await asyncio.create_subprocess_exec(
+            "java",
+            "-version",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
     except FileNotFoundError:
         return None
 
+    _, stderr = await process.communicate()
+    lines = stderr.decode(errors="replace").splitlines()  # The version info is in stderr
+
+    # Parse the Java version from the output, e.g. `openjdk version "17.0.2" 2022-01-18`
+    if lines and "version" in lines[0]:
+        version_str = lines[0].split('"')[1]
+        return int(version_str.split(".")[0])  # Get the major version number
+
+    return None
 
-java_version = check_java_installed()
 
-JAVA_INSTALLED = java_version is not None and java_version >= 17
+async def ensure_java() -> None:
+    version = await java_version()
+    if version is None or version < MIN_JAVA_VERSION:
+        raise EnvironmentError(f"Java {MIN_JAVA_VERSION} or higher is required to run Lavalink.")
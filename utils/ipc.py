@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from core import Bot
+
+# Stats of a cluster with hundreds of shards can get large, default limit is 64 KiB
+LINE_LIMIT = 2**22
+
+
+async def _send(writer: asyncio.StreamWriter, payload: dict[str, Any]) -> None:
+    writer.write(json.dumps(payload, separators=(",", ":")).encode() + b"\n")
+    await writer.drain()
+
+
+class IPCServer:
+    """Control plane of the cluster launcher.
+
+    Every bot process connects to this Unix socket and identifies itself with its
+    cluster ID. Events broadcast by one cluster are relayed to all the others, and
+    stats pushed by the clusters are kept here so they can be aggregated in one place.
+
+    Messages are newline delimited JSON objects with an ``op`` key:
+
+    - ``identify`` - ``{"cluster": int}``, first message of every connection.
+    - ``broadcast`` - ``{"event": str, "data": Any}``, relayed to the other clusters as ``event``.
+    - ``stats`` - ``{"data": dict}``, latest stats of the sending cluster.
+    - ``request`` - ``{"nonce": int, "event": str, "data": Any}``, answered with a ``response``.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+        self.clusters: dict[int, asyncio.StreamWriter] = {}
+        self.stats: dict[int, dict[str, Any]] = {}
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)
+
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path, limit=LINE_LIMIT)
+        os.chmod(self.path, 0o600)
+
+    async def close(self) -> None:
+        for writer in self.clusters.values():
+            writer.close()
+
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)
+
+    async def broadcast(self, event: str, data: Any = None, *, source: int | None = None) -> None:
+        payload = {"op": "event", "event": event, "data": data, "cluster": source}
+        for cluster_id, writer in list(self.clusters.items()):
+            if cluster_id == source:
+                continue
+            try:
+                await _send(writer, payload)
+            except ConnectionError:
+                self.clusters.pop(cluster_id, None)
+
+    def aggregate(self) -> dict[str, Any]:
+        shards = [shard for stats in self.stats.values() for shard in stats.get("shards", [])]
+        return {
+            "clusters": {
+                cluster_id: {**stats, "connected": cluster_id in self.clusters}
+                for cluster_id, stats in sorted(self.stats.items())
+            },
+            "guilds": sum(stats.get("guilds", 0) for stats in self.stats.values()),
+            "players": sum(stats.get("players", 0) for stats in self.stats.values()),
+            "shards": sorted(shards, key=lambda shard: shard["id"]),
+        }
+
+    async def _respond(self, event: str, data: Any) -> Any:
+        if event == "cluster_stats":
+            return self.aggregate()
+
+        raise ValueError(f"Unknown IPC request {event!r}")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        cluster_id: int | None = None
+
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                op = message["op"]
+
+                if op == "identify":
+                    cluster_id = int(message["cluster"])
+                    self.clusters[cluster_id] = writer
+                    print(f"[IPC] Cluster {cluster_id} connected")
+
+                elif op == "broadcast":
+                    await self.broadcast(message["event"], message.get("data"), source=cluster_id)
+
+                elif op == "stats" and cluster_id is not None:
+                    self.stats[cluster_id] = {**message["data"], "updated_at": time.time()}
+
+                elif op == "request":
+                    try:
+                        data = await self._respond(message["event"], message.get("data"))
+                        payload = {"op": "response", "nonce": message["nonce"], "data": data}
+                    except Exception as e:
+                        payload = {"op": "response", "nonce": message["nonce"], "error": str(e)}
+                    await _send(writer, payload)
+        except (ConnectionError, ValueError) as e:
+            print(f"[IPC] Cluster {cluster_id} connection error: {e}")
+        finally:
+            if cluster_id is not None and self.clusters.get(cluster_id) is writer:
+                del self.clusters[cluster_id]
+                print(f"[IPC] Cluster {cluster_id} disconnected")
+            writer.close()
+
+
+class IPCClient:
+    """Connection of a bot process to the cluster launcher.
+
+    Events received from other clusters are dispatched on the bot as
+    ``on_ipc_<event>(data)`` so cogs can subscribe to them with a listener.
+    """
+
+    def __init__(self, bot: Bot, *, path: str, cluster_id: int) -> None:
+        self.bot = bot
+        self.path = path
+        self.cluster_id = cluster_id
+
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task[None] | None = None
+        self._nonce = itertools.count()
+        self._pending: dict[int, asyncio.Future[Any]] = {}
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self) -> None:
+        reader, self._writer = await asyncio.open_unix_connection(self.path, limit=LINE_LIMIT)
+        await _send(self._writer, {"op": "identify", "cluster": self.cluster_id})
+        self._reader_task = asyncio.create_task(self._read(reader))
+
+    async def close(self) -> None:
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+
+    async def _reconnect(self) -> None:
+        delay = 1.0
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self.connect()
+            except OSError:
+                delay = min(delay * 2, 30.0)
+            else:
+                print(f"[IPC] Reconnected to {self.path}")
+                return
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+
+                if message["op"] == "event":
+                    self.bot.dispatch(f"ipc_{message['event']}", message.get("data"))
+
+                elif message["op"] == "response":
+                    future = self._pending.pop(message["nonce"], None)
+                    if future is None or future.done():
+                        continue
+                    if "error" in message:
+                        future.set_exception(RuntimeError(message["error"]))
+                    else:
+                        future.set_result(message.get("data"))
+        except (ConnectionError, ValueError) as e:
+            print(f"[IPC] Connection to the launcher failed: {e}")
+
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+
+        if not self.bot.is_closed():
+            asyncio.create_task(self._reconnect())
+
+    async def _send(self, payload: dict[str, Any]) -> None:
+        if not self.connected:
+            return
+        assert self._writer is not None
+        try:
+            await _send(self._writer, payload)
+        except ConnectionError:
+            pass
+
+    async def broadcast(self, event: str, data: Any = None) -> None:
+        """Send an event to every other cluster."""
+        await self._send({"op": "broadcast", "event": event, "data": data})
+
+    async def push_stats(self, data: dict[str, Any]) -> None:
+        await self._send({"op": "stats", "data": data})
+
+    async def request(self, event: str, data: Any = None, *, timeout: float = 5.0) -> Any:
+        if not self.connected:
+            raise RuntimeError("Not connected to the cluster launcher.")
+
+        nonce = next(self._nonce)
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._pending[nonce] = future
+
+        await self._send({"op": "request", "nonce": nonce, "event": event, "data": data})
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        finally:
+            self._pending.pop(nonce, None)
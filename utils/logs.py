@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from typing import Any
+
+from .metrics import LOG_RECORDS_DROPPED
+
+__all__ = ("JSONFormatter", "LogPipeline", "SamplingFilter")
+
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Let at most ``limit`` records a second through per logger, warnings and errors excepted.
+
+    The limits are keyed by logger prefix, ``{"discord": 50}`` caps ``discord.gateway``
+    and ``discord.voice_state`` separately. Dropped records are counted in the metrics.
+    """
+
+    def __init__(self, limits: dict[str, int]) -> None:
+        super().__init__()
+        self.limits = limits
+        # logger name -> (second, records let through during it)
+        self._windows: dict[str, tuple[int, int]] = {}
+        self._limit_of: dict[str, int | None] = {}
+
+    def _limit(self, name: str) -> int | None:
+        try:
+            return self._limit_of[name]
+        except KeyError:
+            pass
+
+        limit = None
+        prefix = name
+        while prefix:
+            if prefix in self.limits:
+                limit = self.limits[prefix]
+                break
+            prefix = prefix.rpartition(".")[0]
+
+        self._limit_of[name] = limit
+        return limit
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        limit = self._limit(record.name)
+        if limit is None:
+            return True
+
+        second = int(record.created)
+        window, count = self._windows.get(record.name, (second, 0))
+        if window != second:
+            window, count = second, 0
+
+        if count >= limit:
+            LOG_RECORDS_DROPPED.labels(record.name, "sampled").inc()
+            return False
+
+        self._windows[record.name] = (window, count + 1)
+        return True
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the arguments, which may change later, are merged here, the writing thread does the formatting
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # A stalled disk fills the queue, records are lost rather than the event loop blocked
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.labels(record.name, "full").inc()
+
+
+class LogPipeline:
+    """Logging which never writes to the disk from the thread that logs.
+
+    The root logger only puts records on a bounded queue, a background thread
+    formats them and writes them to a file rotated by size, or by time when
+    ``when`` is set. With ``structured``, every record is written as a line of JSON.
+    """
+
+    def __init__(
+        self,
+        *,
+        file: str,
+        level: str = "INFO",
+        max_bytes: int = 0,
+        backup_count: int = 0,
+        when: str | None = None,
+        structured: bool = False,
+        queue_size: int = 10_000,
+        sample: dict[str, int] | None = None,
+    ) -> None:
+        directory = os.path.dirname(file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if when is not None:
+            handler: logging.Handler = logging.handlers.TimedRotatingFileHandler(
+                file, when=when, backupCount=backup_count, encoding="utf-8", delay=True
+            )
+        else:
+            handler = logging.handlers.RotatingFileHandler(
+                file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+            )
+        handler.setFormatter(JSONFormatter() if structured else logging.Formatter(FORMAT))
+
+        self.queue: queue.Queue[logging.LogRecord] = queue.Queue(queue_size)
+        self.handler = _DroppingQueueHandler(self.queue)
+        if sample:
+            self.handler.addFilter(SamplingFilter(sample))
+
+        self.listener = logging.handlers.QueueListener(self.queue, handler, respect_handler_level=True)
+        self.level = logging.getLevelName(level.upper())
+
+    def start(self) -> None:
+        root = logging.getLogger()
+        root.setLevel(self.level)
+        root.addHandler(self.handler)
+        self.listener.start()
+
+    def stop(self) -> None:
+        """Write the records still queued and close the file."""
+        logging.getLogger().removeHandler(self.handler)
+        self.listener.stop()
+        for handler in self.listener.handlers:
+            handler.close()
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import asyncio
+import gc
+import sys
+import time
+import types
+import weakref
+from collections import Counter, deque
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+import discord
+import wavelink
+from discord.ext import commands
+
+from .metrics import LEAKED_OBJECTS, TRACKED_STRUCTURE_ITEMS
+
+if TYPE_CHECKING:
+    from core import Bot
+
+# Objects owned by the client as a whole, sizing a structure stops at them
+SHARED: tuple[type, ...] = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    types.CodeType,
+    types.FrameType,
+    asyncio.AbstractEventLoop,
+    discord.Client,
+    discord.Guild,
+    discord.ClientUser,
+    discord.Role,
+    discord.abc.GuildChannel,
+    discord.http.HTTPClient,
+    discord.state.ConnectionState,
+    commands.Cog,
+    wavelink.Node,
+)
+
+# Bounds the cost of sizing a single structure
+MAX_OBJECTS = 1_000_000
+# Objects sized between two yields to the event loop when reporting
+WALK_CHUNK = 2_000
+
+GuildOf = Callable[[Any, Any], "int | None"]
+
+
+def _walk(obj: Any, seen: set[int]) -> Iterator[int]:
+    """The size of ``obj`` and of everything it references, one object at a time."""
+    stack = [obj]
+
+    while stack and len(seen) < MAX_OBJECTS:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, SHARED):
+            continue
+
+        seen.add(id(current))
+        yield sys.getsizeof(current)
+
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset, deque)):
+            stack.extend(current)
+        elif not isinstance(current, (str, bytes, int, float, bool)):
+            attributes = getattr(current, "__dict__", None)
+            if attributes is not None:
+                stack.append(attributes)
+            for cls in type(current).__mro__:
+                for slot in getattr(cls, "__slots__", ()):
+                    value = getattr(current, slot, None)
+                    if value is not None:
+                        stack.append(value)
+
+
+def deep_sizeof(obj: Any, *, seen: set[int] | None = None) -> int:
+    """Size of ``obj`` and of everything it references, shared objects excluded."""
+    return sum(_walk(obj, set() if seen is None else seen))
+
+
+def _entries(container: Any) -> Iterable[tuple[Any, Any]]:
+    if isinstance(container, dict):
+        return container.items()
+    return ((None, value) for value in container)
+
+
+@dataclass
+class Structure:
+    name: str
+    items: int
+    size: int
+
+
+@dataclass
+class Suspect:
+    guild_id: int
+    kind: str
+    ref: weakref.ref
+    since: float
+
+
+class MemoryTracker:
+    """Accounts the memory of long lived structures and detects objects outliving their player.
+
+    Structures are registered by whoever owns them, with a function telling which
+    guild an entry belongs to. Their length is exported as a metric, their deep
+    size is only computed on demand. When a player disconnects, it is watched with
+    weak references along with its context and views: whatever is still alive after
+    ``grace`` seconds is reported as leaked, with the objects referring to it.
+    """
+
+    def __init__(self, *, grace: float = 300.0) -> None:
+        self.grace = grace
+
+        self.suspects: list[Suspect] = []
+        self.leaked: list[Suspect] = []
+
+        self._structures: dict[str, tuple[Callable[[], Any], GuildOf | None]] = {}
+        # Objects sized since the report last yielded to the event loop
+        self._walked = 0
+
+        LEAKED_OBJECTS.set_function(lambda: len(self.leaked))
+
+    def register(self, name: str, getter: Callable[[], Any], *, guild: GuildOf | None = None) -> None:
+        """Track the container returned by ``getter``, ``guild`` maps an entry (key, value) to its guild ID."""
+        self._structures[name] = (getter, guild)
+        TRACKED_STRUCTURE_ITEMS.labels(name).set_function(lambda: len(getter()))
+
+    def unregister(self, name: str) -> None:
+        self._structures.pop(name, None)
+        TRACKED_STRUCTURE_ITEMS.labels(name).set_function(lambda: 0)
+
+    async def _sizeof(self, obj: Any) -> int:
+        # Structures may hold millions of objects, the event loop must not wait for all of them
+        total = 0
+        for size in _walk(obj, set()):
+            total += size
+            self._walked += 1
+            if self._walked >= WALK_CHUNK:
+                self._walked = 0
+                await asyncio.sleep(0)
+        return total
+
+    async def structures(self) -> list[Structure]:
+        structures = []
+        for name, (getter, _) in list(self._structures.items()):
+            container = getter()
+            structures.append(Structure(name, len(container), await self._sizeof(container)))
+            await asyncio.sleep(0)
+
+        return sorted(structures, key=lambda structure: structure.size, reverse=True)
+
+    async def guilds(self, limit: int = 10) -> list[tuple[int, int]]:
+        """The guilds taking the most memory in the tracked structures, as (guild ID, bytes)."""
+        footprint: Counter[int] = Counter()
+        for getter, guild_of in list(self._structures.values()):
+            if guild_of is None:
+                continue
+
+            # Every guild is sized on its own, an object shared by two guilds is counted twice
+            for key, value in list(_entries(getter())):
+                guild_id = guild_of(key, value)
+                if guild_id is not None:
+                    footprint[guild_id] += await self._sizeof(key) + await self._sizeof(value)
+            await asyncio.sleep(0)
+
+        return footprint.most_common(limit)
+
+    def watch(self, guild_id: int, **objects: Any) -> None:
+        """Expect ``objects`` to be freed soon, they are reported if they are still alive after the grace period."""
+        now = time.monotonic()
+        for kind, obj in objects.items():
+            if obj is None:
+                continue
+
+            try:
+                ref = weakref.ref(obj)
+            except TypeError:
+                continue
+            self.suspects.append(Suspect(guild_id, kind, ref, now))
+
+    def check(self, *, collect: bool = False) -> list[Suspect]:
+        """Move the suspects which outlived the grace period to ``leaked``, returns the new ones.
+
+        A suspect is only moved once it survived a full collection, which runs whenever
+        one is due or ``collect`` is True.
+        """
+        deadline = time.monotonic() - self.grace
+        due = any(suspect.since <= deadline and suspect.ref() is not None for suspect in self.suspects)
+        if collect or due:
+            # A player is part of reference cycles, the oldest generation holding it is collected rarely
+            gc.collect()
+
+        self.leaked = [suspect for suspect in self.leaked if suspect.ref() is not None]
+
+        alive, leaked = [], []
+        for suspect in self.suspects:
+            if suspect.ref() is None:
+                continue
+            if suspect.since <= deadline:
+                leaked.append(suspect)
+            else:
+                alive.append(suspect)
+
+        self.suspects = alive
+        self.leaked.extend(leaked)
+        return leaked
+
+    @staticmethod
+    def referrers(obj: Any, limit: int = 5) -> list[str]:
+        """Describe what keeps ``obj`` alive, frames and the tracker bookkeeping excluded."""
+        names = []
+        for referrer in gc.get_referrers(obj):
+            if isinstance(referrer, (types.FrameType, weakref.ref)):
+                continue
+
+            if isinstance(referrer, dict):
+                # Most of the time, the __dict__ of the object holding the reference
+                owner = next((o for o in gc.get_referrers(referrer) if getattr(o, "__dict__", None) is referrer), None)
+                names.append(f"{type(owner).__qualname__}.__dict__" if owner is not None else "dict")
+            else:
+                names.append(type(referrer).__qualname__)
+
+            if len(names) >= limit:
+                break
+        return names
+
+    async def report(self, limit: int = 10) -> str:
+        lines = ["Structures:"]
+        for structure in await self.structures():
+            lines.append(f"  {structure.name:<24} {structure.items:>8} items {structure.size / 1024:>10.1f} KiB")
+
+        lines.append("Guilds:")
+        for guild_id, size in await self.guilds(limit):
+            lines.append(f"  {guild_id:<24} {size / 1024:>10.1f} KiB")
+
+        lines.append(f"Leaked: {len(self.leaked)} objects, {len(self.suspects)} waiting for the grace period")
+        for suspect in self.leaked[:limit]:
+            obj = suspect.ref()
+            if obj is None:
+                continue
+            age = time.monotonic() - suspect.since
+            lines.append(
+                f"  {suspect.kind} of guild {suspect.guild_id} ({type(obj).__qualname__}), "
+                f"{age / 60:.0f} min after disconnect, held by: {', '.join(self.referrers(obj)) or 'N/A'}"
+            )
+
+        return "\n".join(lines)
@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name!r} is already registered")
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Metric | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    type: str
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        *,
+        registry: Registry | None = REGISTRY,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+        self._children: dict[tuple[str, ...], Metric] = {}
+
+        if registry is not None:
+            registry.register(self)
+
+    def _child(self) -> Metric:
+        return type(self)(self.name, self.documentation, registry=None)
+
+    def labels(self, *values: object):
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+
+        key = tuple(map(str, values))
+        try:
+            return self._children[key]
+        except KeyError:
+            child = self._children[key] = self._child()
+            return child
+
+    def samples(self) -> Iterator[str]:
+        if not self.labelnames:
+            yield from self._samples((), ())
+            return
+
+        for values, child in list(self._children.items()):
+            yield from child._samples(self.labelnames, values)
+
+    def _samples(self, names: tuple[str, ...], values: tuple[str, ...]) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.value = 0.0
+        super().__init__(*args, **kwargs)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def _samples(self, names: tuple[str, ...], values: tuple[str, ...]) -> Iterator[str]:
+        yield f"{self.name}{_format_labels(names, values)} {_format_value(self.value)}"
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def __init__(self, *args, **kwargs) -> None:
+        self.value = 0.0
+        self._function: Callable[[], float] | None = None
+        super().__init__(*args, **kwargs)
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the value at scrape time instead of on every change."""
+        self._function = function
+
+    def _samples(self, names: tuple[str, ...], values: tuple[str, ...]) -> Iterator[str]:
+        value = self.value
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception:
+                value = math.nan
+        yield f"{self.name}{_format_labels(names, values)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, *args, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **kwargs) -> None:
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+        super().__init__(*args, **kwargs)
+
+    def _child(self) -> Histogram:
+        return Histogram(self.name, self.documentation, buckets=self.buckets[:-1], registry=None)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def _samples(self, names: tuple[str, ...], values: tuple[str, ...]) -> Iterator[str]:
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            labels = _format_labels(names, values, f'le="{_format_value(bound)}"')
+            yield f"{self.name}_bucket{labels} {cumulative}"
+
+        labels = _format_labels(names, values)
+        yield f"{self.name}_sum{labels} {_format_value(self.sum)}"
+        yield f"{self.name}_count{labels} {self.count}"
+
+
+class MetricsServer:
+    """Serve the registry on ``http://host:port/metrics``."""
+
+    def __init__(self, *, host: str, port: int, registry: Registry = REGISTRY) -> None:
+        self.host = host
+        self.port = port
+        self.registry = registry
+
+        self._runner: web.AppRunner | None = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        from aiohttp import web
+
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self) -> None:
+        # aiohttp.web is only imported when metrics are enabled
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+def _with_label(sample: str, label: str) -> str:
+    name, brace, rest = sample.partition("{")
+    if brace:
+        return f"{name}{{{label},{rest}"
+    name, _, value = sample.partition(" ")
+    return f"{name}{{{label}}} {value}"
+
+
+def merge_expositions(expositions: dict[int, str | None]) -> str:
+    """Merge the metrics of every cluster into one exposition, labelled with the cluster they come from.
+
+    A cluster which could not be scraped is None, only ``parrot_cluster_up`` tells about it then.
+    """
+    headers: dict[str, list[str]] = {}
+    samples: dict[str, list[str]] = {}
+
+    for cluster_id, text in sorted(expositions.items()):
+        label = f'cluster="{cluster_id}"'
+        family = ""
+        for line in (text or "").splitlines():
+            if line.startswith("#"):
+                parts = line.split(" ", 3)
+                if len(parts) >= 3 and parts[1] in {"HELP", "TYPE"}:
+                    family = parts[2]
+                    # Every cluster exposes the same families, described once
+                    if line not in headers.setdefault(family, []):
+                        headers[family].append(line)
+            elif line:
+                samples.setdefault(family, []).append(_with_label(line, label))
+
+    lines = [
+        "# HELP parrot_cluster_up Whether the metrics of the cluster could be scraped.",
+        "# TYPE parrot_cluster_up gauge",
+    ]
+    for cluster_id, text in sorted(expositions.items()):
+        lines.append(f'parrot_cluster_up{{cluster="{cluster_id}"}} {int(text is not None)}')
+    for family, header in headers.items():
+        lines.extend(header)
+        lines.extend(samples.get(family, []))
+    return "\n".join(lines) + "\n"
+
+
+class ClusterMetricsServer(MetricsServer):
+    """Serve the metrics of every cluster on one endpoint, scraped from their own when it is requested."""
+
+    def __init__(self, *, host: str, port: int, clusters: dict[int, int], timeout: float = 5.0) -> None:
+        super().__init__(host=host, port=port)
+        # Cluster ID -> port its metrics are served on
+        self.clusters = clusters
+        self.timeout = timeout
+
+    async def _scrape(self, port: int) -> str | None:
+        import aiohttp
+
+        try:
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+                async with session.get(f"http://{self.host}:{port}/metrics") as response:
+                    response.raise_for_status()
+                    return await response.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        from aiohttp import web
+
+        scraped = await asyncio.gather(*(self._scrape(port) for port in self.clusters.values()))
+        text = merge_expositions(dict(zip(self.clusters, scraped)))
+        return web.Response(text=text, content_type="text/plain", charset="utf-8")
+
+
+COMMAND_LATENCY = Histogram(
+    "parrot_command_duration_seconds",
+    "Time spent invoking a command, checks and converters included.",
+    ("command",),
+)
+CACHE_REQUESTS = Counter(
+    "parrot_cache_requests_total",
+    "Lookups of the settings cache by result.",
+    ("table", "result"),
+)
+SQLITE_QUERY = Histogram(
+    "parrot_sqlite_query_duration_seconds",
+    "Time spent executing a SQLite statement.",
+    ("operation",),
+)
+SQLITE_COMMIT = Histogram(
+    "parrot_sqlite_commit_duration_seconds",
+    "Time spent committing the SQLite connection.",
+)
+LAVALINK_REQUEST = Histogram(
+    "parrot_lavalink_request_duration_seconds",
+    "Round trip time of Lavalink REST requests.",
+    ("endpoint",),
+)
+LAVALINK_WEBSOCKET_DELAY = Histogram(
+    "parrot_lavalink_websocket_delay_seconds",
+    "Delay between Lavalink emitting a player update and the bot receiving it.",
+)
+LAVALINK_VOICE_PING = Histogram(
+    "parrot_lavalink_voice_ping_seconds",
+    "Ping between Lavalink and the Discord voice servers.",
+)
+ACTIVE_PLAYERS = Gauge(
+    "parrot_active_players",
+    "Players currently connected to a voice channel.",
+)
+QUEUED_TRACKS = Gauge(
+    "parrot_queued_tracks",
+    "Tracks waiting in the queues of all players.",
+)
+TRACK_START_LATENCY = Histogram(
+    "parrot_track_start_latency_seconds",
+    "Time between asking Lavalink to play a track and the track starting.",
+)
+EVENT_LOOP_LAG = Histogram(
+    "parrot_event_loop_lag_seconds",
+    "How late the event loop ran a callback scheduled for a fixed time.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+TRACKED_STRUCTURE_ITEMS = Gauge(
+    "parrot_tracked_structure_items",
+    "Entries of the long lived structures registered to the memory tracker.",
+    ("structure",),
+)
+LEAKED_OBJECTS = Gauge(
+    "parrot_leaked_objects",
+    "Objects of disconnected players still reachable after the grace period.",
+)
+LOG_RECORDS_DROPPED = Counter(
+    "parrot_log_records_dropped_total",
+    "Log records dropped by sampling or because the queue to the log file was full.",
+    ("logger", "reason"),
+)
+OUTBOUND_ACTIONS = Counter(
+    "parrot_outbound_actions_total",
+    "REST calls in channels, by route and whether they were sent, merged, dropped or failed.",
+    ("route", "outcome"),
+)
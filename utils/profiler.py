@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class SamplingProfiler:
+    """Statistical profiler of the event loop thread.
+
+    A thread snapshots the stack of the event loop thread every ``interval``
+    seconds, the cost is a few microseconds per sample and nothing is hooked into
+    the profiled code. Samples are grouped under the name of what the running task
+    was doing: the command invoked through :meth:`Bot.invoke` or the event being
+    dispatched (``on_wavelink_track_end``...).
+
+    When a ``target`` is given only the samples of that command or event are kept.
+    Results are written in the collapsed stack format, which flamegraph.pl,
+    inferno and speedscope all read.
+    """
+
+    def __init__(self, *, directory: str = "profiles", interval: float = 0.005) -> None:
+        self.directory = directory
+        self.interval = interval
+
+        self.target: str | None = None
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        self.started_at: float | None = None
+
+        self._labels: dict[asyncio.Task, str] = {}
+        self._names: dict[tuple[str, str], str] = {}
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: int | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, *, target: str | None = None) -> None:
+        if self.running:
+            raise RuntimeError("The profiler is already running.")
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+
+        self.target = target
+        self.samples.clear()
+        self.started_at = time.monotonic()
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        """Stop sampling and write the collapsed stacks, returns the path of the file."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._labels.clear()
+
+        os.makedirs(self.directory, exist_ok=True)
+        suffix = f"-{self.target}" if self.target else ""
+        path = os.path.join(self.directory, f"profile-{time.strftime('%Y%m%d-%H%M%S')}{suffix}.collapsed")
+
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+        return path
+
+    def label(self, task: asyncio.Task, name: str) -> None:
+        """Attribute the samples of ``task`` to ``name`` until :meth:`unlabel` is called."""
+        self._labels[task] = name
+
+    def unlabel(self, task: asyncio.Task) -> None:
+        self._labels.pop(task, None)
+
+    def _frame_name(self, frame: FrameType) -> str:
+        code = frame.f_code
+        key = (code.co_filename, code.co_name)
+        try:
+            return self._names[key]
+        except KeyError:
+            pass
+
+        filename = code.co_filename
+        if filename.startswith(ROOT):
+            filename = os.path.relpath(filename, ROOT)
+        else:
+            filename = os.path.basename(filename)
+
+        name = self._names[key] = f"{code.co_name} ({filename})"
+        return name
+
+    def _task_label(self, task: asyncio.Task | None) -> str:
+        if task is None:
+            return "(no task)"
+
+        label = self._labels.get(task)
+        if label is not None:
+            return label
+
+        # discord.py names its event tasks "discord.py: on_<event>"
+        return task.get_name().removeprefix("discord.py: ")
+
+    def _sample(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._loop_thread)  # type: ignore
+            if frame is None:
+                continue
+
+            task = asyncio.tasks._current_tasks.get(self._loop)  # type: ignore
+            label = self._task_label(task)
+            if self.target is not None and label != self.target:
+                continue
+
+            stack: list[str] = []
+            while frame is not None:
+                stack.append(self._frame_name(frame))
+                frame = frame.f_back
+
+            stack.append(label)
+            stack.reverse()
+            self.samples[tuple(stack)] += 1
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import enum
+import gzip
+import hashlib
+import os
+import struct
+import time
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, BinaryIO
+
+import wavelink
+
+from .config import CONFIG
+
+if TYPE_CHECKING:
+    from core import Bot
+
+MAGIC = b"PTRACE"
+VERSION = 1
+
+# Header: magic, version, unix time of the first record
+HEADER = struct.Struct("<6sBd")
+# Record: kind, milliseconds since the start, guild, channel (track length for Lavalink events),
+# user and length of the payload
+RECORD = struct.Struct("<BIQQQH")
+
+FLUSH_SIZE = 1 << 16
+
+
+class Kind(enum.IntEnum):
+    MESSAGE = 1
+    VOICE_STATE = 2
+    TRACK_START = 3
+    TRACK_END = 4
+
+
+@dataclass(slots=True)
+class Record:
+    kind: Kind
+    offset: float
+    guild_id: int
+    channel_id: int
+    user_id: int
+    payload: str = ""
+
+
+class Anonymizer:
+    """Replaces IDs and words with salted hashes, consistently within one trace."""
+
+    def __init__(self) -> None:
+        self._salt = os.urandom(16)
+        self._ids: dict[int, int] = {}
+
+    def id(self, value: int | None) -> int:
+        if not value:
+            return 0
+
+        try:
+            return self._ids[value]
+        except KeyError:
+            digest = hashlib.blake2b(value.to_bytes(8, "little"), digest_size=8, key=self._salt).digest()
+            # Kept positive and non-zero, the replay uses them as snowflakes
+            anonymized = self._ids[value] = (int.from_bytes(digest, "little") >> 1) or 1
+            return anonymized
+
+    def word(self, value: str) -> str:
+        return hashlib.blake2b(value.encode(), digest_size=4, key=self._salt).hexdigest()
+
+    def content(self, content: str, prefixes: Iterable[str]) -> str:
+        """Keep the first word if it starts with one of ``prefixes``, and hash everything else."""
+        words = content.split()
+        if not words:
+            return ""
+
+        head = words[0]
+        # Any other message may start with a word the author would not want to leave the guild
+        if len(head) > 32 or not any(prefix and head.startswith(prefix) for prefix in prefixes):
+            head = self.word(head)
+        return " ".join([head, *map(self.word, words[1:])])
+
+
+class TraceWriter:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.records = 0
+        self.started_at = time.time()
+
+        self._start = time.monotonic()
+        self._file: BinaryIO = gzip.open(path, "wb")  # type: ignore
+        self._buffer = bytearray(HEADER.pack(MAGIC, VERSION, self.started_at))
+
+    def write(self, kind: Kind, guild_id: int, channel_id: int = 0, user_id: int = 0, payload: str = "") -> None:
+        data = payload.encode()[:0xFFFF]
+        offset = int((time.monotonic() - self._start) * 1000)
+
+        self._buffer += RECORD.pack(kind, offset, guild_id, channel_id, user_id, len(data))
+        self._buffer += data
+        self.records += 1
+
+        if len(self._buffer) >= FLUSH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        self._file.write(self._buffer)
+        self._buffer.clear()
+
+    def close(self) -> None:
+        self.flush()
+        self._file.close()
+
+
+def read_trace(path: str) -> Iterator[Record]:
+    with gzip.open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) != HEADER.size:
+            raise ValueError(f"{path} is not a trace file")
+
+        magic, version, _ = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a trace file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported trace version {version}")
+
+        while chunk := f.read(RECORD.size):
+            if len(chunk) != RECORD.size:
+                raise ValueError(f"{path} is truncated")
+
+            kind, offset, guild_id, channel_id, user_id, length = RECORD.unpack(chunk)
+            payload = f.read(length).decode() if length else ""
+            yield Record(Kind(kind), offset / 1000, guild_id, channel_id, user_id, payload)
+
+
+class TraceRecorder:
+    """Records anonymized gateway and Lavalink events in a compact binary trace.
+
+    Guild messages and voice state updates are captured by wrapping the gateway
+    parsers, track starts and ends through wavelink listeners. Every ID is replaced
+    by a salted hash and only the prefix and command of messages are kept, so a trace can be
+    replayed by ``python -m benchmarks.replay`` without leaking anything.
+    """
+
+    PARSERS = ("MESSAGE_CREATE", "VOICE_STATE_UPDATE")
+
+    def __init__(self, bot: Bot, *, directory: str = "traces") -> None:
+        self.bot = bot
+        self.directory = directory
+
+        self.writer: TraceWriter | None = None
+        self._anonymizer = Anonymizer()
+        self._parsers: dict[str, Callable[[Any], None]] = {}
+
+    @property
+    def recording(self) -> bool:
+        return self.writer is not None
+
+    def start(self) -> str:
+        if self.writer is not None:
+            raise RuntimeError("A trace is already being recorded.")
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"trace-{time.strftime('%Y%m%d-%H%M%S')}.ptrace.gz")
+
+        self._anonymizer = Anonymizer()
+        self.writer = TraceWriter(path)
+
+        parsers = self.bot._connection.parsers
+        for event in self.PARSERS:
+            original = self._parsers[event] = parsers[event]
+            parsers[event] = self._wrap(event, original)
+
+        self.bot.add_listener(self._on_track_start, "on_wavelink_track_start")
+        self.bot.add_listener(self._on_track_end, "on_wavelink_track_end")
+        return path
+
+    def stop(self) -> TraceWriter:
+        writer = self.writer
+        if writer is None:
+            raise RuntimeError("No trace is being recorded.")
+
+        self.bot._connection.parsers.update(self._parsers)
+        self._parsers.clear()
+
+        self.bot.remove_listener(self._on_track_start, "on_wavelink_track_start")
+        self.bot.remove_listener(self._on_track_end, "on_wavelink_track_end")
+
+        writer.close()
+        self.writer = None
+        return writer
+
+    def _wrap(self, event: str, parser: Callable[[Any], None]) -> Callable[[Any], None]:
+        record = self._record_message if event == "MESSAGE_CREATE" else self._record_voice_state
+
+        def wrapped(data: Any) -> None:
+            try:
+                record(data)
+            finally:
+                parser(data)
+
+        return wrapped
+
+    def _record_message(self, data: dict[str, Any]) -> None:
+        if "guild_id" not in data or data["author"].get("bot"):
+            return
+
+        assert self.writer is not None
+        anonymize = self._anonymizer
+        self.writer.write(
+            Kind.MESSAGE,
+            anonymize.id(int(data["guild_id"])),
+            anonymize.id(int(data["channel_id"])),
+            anonymize.id(int(data["author"]["id"])),
+            anonymize.content(data.get("content", ""), self._prefixes(int(data["guild_id"]))),
+        )
+
+    def _prefixes(self, guild_id: int) -> list[str]:
+        # Parsers are synchronous, only the prefix the cache holds is known, the defaults otherwise like get_prefix
+        prefix: str | None = self.bot.cache.cache.get(("GUILDS.BOT_PREFIX", guild_id))
+        prefixes = [prefix] if prefix is not None else list(CONFIG.default_prefixes)
+        if self.bot.user is not None:
+            prefixes += [f"<@{self.bot.user.id}>", f"<@!{self.bot.user.id}>"]
+        return prefixes
+
+    def _record_voice_state(self, data: dict[str, Any]) -> None:
+        user_id = int(data["user_id"])
+        if "guild_id" not in data or user_id == self.bot.user.id:  # type: ignore
+            return
+
+        assert self.writer is not None
+        anonymize = self._anonymizer
+        self.writer.write(
+            Kind.VOICE_STATE,
+            anonymize.id(int(data["guild_id"])),
+            anonymize.id(int(data["channel_id"] or 0)),
+            anonymize.id(user_id),
+        )
+
+    async def _on_track_start(self, payload: wavelink.TrackStartEventPayload) -> None:
+        if self.writer is None or payload.player is None or payload.player.guild is None:
+            return
+
+        guild_id = self._anonymizer.id(payload.player.guild.id)
+        self.writer.write(Kind.TRACK_START, guild_id, payload.track.length)
+
+    async def _on_track_end(self, payload: wavelink.TrackEndEventPayload) -> None:
+        if self.writer is None or payload.player is None or payload.player.guild is None:
+            return
+
+        guild_id = self._anonymizer.id(payload.player.guild.id)
+        self.writer.write(Kind.TRACK_END, guild_id, payload.track.length, payload=payload.reason)
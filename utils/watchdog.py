@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+
+from .metrics import EVENT_LOOP_LAG
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass
+class SlowSite:
+    site: str
+    count: int = 0
+    total: float = 0.0
+    worst: float = 0.0
+    task: str | None = None
+    stack: list[str] = field(default_factory=list)
+
+
+@dataclass
+class _Capture:
+    beat: int
+    task: str | None
+    stack: traceback.StackSummary
+
+
+class LoopWatchdog:
+    """Detects callbacks blocking the event loop and records where they were blocking.
+
+    A coroutine wakes up every ``interval`` seconds and measures how late it was
+    woken up, which is the event loop lag. Meanwhile a thread checks that the
+    heartbeat keeps moving. Once it is ``budget`` seconds late, the thread captures
+    the stack of the event loop thread, which is the stack of the callback that is
+    blocking it. When the loop catches up, the stall is attributed to that call site.
+    """
+
+    def __init__(self, *, interval: float = 0.1, budget: float = 0.1) -> None:
+        self.interval = interval
+        self.budget = budget
+
+        self.sites: dict[str, SlowSite] = {}
+
+        self._beat = 0
+        self._beat_at = time.monotonic()
+        self._capture: _Capture | None = None
+
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: int | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    def reset(self) -> None:
+        self.sites.clear()
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+
+            EVENT_LOOP_LAG.observe(lag)
+
+            capture = self._capture
+            if capture is not None and capture.beat == self._beat:
+                self._record(capture, lag)
+            self._capture = None
+
+            self._beat += 1
+            self._beat_at = time.monotonic()
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.budget / 2):
+            beat = self._beat
+            if time.monotonic() - self._beat_at - self.interval < self.budget:
+                continue
+
+            capture = self._capture
+            if capture is not None and capture.beat == beat:
+                # Already captured this stall
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread)  # type: ignore
+            if frame is None:
+                continue
+
+            task = asyncio.tasks._current_tasks.get(self._loop)  # type: ignore
+            self._capture = _Capture(
+                beat=beat,
+                task=task.get_name() if task is not None else None,
+                stack=traceback.extract_stack(frame),
+            )
+
+    @staticmethod
+    def _site(stack: traceback.StackSummary) -> str:
+        # The innermost frame of our own code is the most useful place to look at
+        for frame in reversed(stack):
+            if frame.filename.startswith(ROOT) and not frame.filename.endswith("watchdog.py"):
+                return f"{os.path.relpath(frame.filename, ROOT)}:{frame.lineno} in {frame.name}"
+
+        frame = stack[-1]
+        return f"{frame.filename}:{frame.lineno} in {frame.name}"
+
+    def _record(self, capture: _Capture, lag: float) -> None:
+        key = self._site(capture.stack)
+        site = self.sites.get(key)
+        if site is None:
+            site = self.sites[key] = SlowSite(site=key)
+
+        site.count += 1
+        site.total += lag
+        if lag >= site.worst:
+            site.worst = lag
+            site.task = capture.task
+            site.stack = capture.stack.format()
+
+    def slowest(self, limit: int = 10) -> list[SlowSite]:
+        return sorted(self.sites.values(), key=lambda site: site.total, reverse=True)[:limit]
+
+    def report(self, limit: int = 10) -> str:
+        sites = self.slowest(limit)
+        if not sites:
+            return f"No callback blocked the event loop for more than {self.budget * 1000:.0f}ms."
+
+        lines = []
+        for site in sites:
+            lines.append(
+                f"{site.site}\n"
+                f"    {site.count} stall(s), total {site.total * 1000:.0f}ms, worst {site.worst * 1000:.0f}ms"
+                f" (task: {site.task or 'N/A'})"
+            )
+        return "\n".join(lines)